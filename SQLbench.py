@@ -0,0 +1,641 @@
+"""
+MIT License
+
+Copyright (c) 2025 Kyle Ciechowicz
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+"""
+Benchmarks for the SQLviewer module.
+
+    python SQLbench.py parser [--scale 1000] [--repeat 3]
+    python SQLbench.py render [--rows 100000] [--repeat 3]
+    python SQLbench.py generate --db bench.db [--rows 10000]
+    python SQLbench.py suite --db bench.db [--rows 10000] [--out results.json]
+    python SQLbench.py compare old.json new.json
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+
+from SQLviewer import SqlInfos, DatabaseSystem, Interpreter, Terminal
+
+EXAMPLE_QUERY = """
+SELECT HEROS.Titre,
+(
+    SELECT COUNT(*)
+    FROM (
+        SELECT DISTINCT ENNEMIS.Ville
+        FROM ENNEMIS
+        WHERE ENNEMIS.Age > (
+            SELECT AVG(E2.Age)
+            FROM ENNEMIS AS E2
+            WHERE E2.Rang IN (
+                SELECT R.Nom
+                FROM Rangs AS R
+                WHERE R.Niveau > (
+                    SELECT MIN(R2.Niveau)
+                    FROM Rangs AS R2
+                    WHERE R2.Niveau IS NOT NULL
+                )
+            )
+        )
+    ) AS villes_distinctes
+) AS nb_villes,
+(
+    SELECT SUM(ARMES.Puissance)
+    FROM ARMES
+    WHERE ARMES.Id_Heros = HEROS.Id
+    AND ARMES.Type IN (
+        SELECT T.Type
+        FROM TYPES AS T
+        WHERE T.Rarete = (
+            SELECT MAX(TR.Rarete)
+            FROM TYPES AS TR
+            WHERE TR.Categorie = "légendaire"
+        )
+    )
+) AS puissance_totale
+FROM HEROS
+WHERE HEROS.Id IN (
+    SELECT Id
+    FROM (
+        SELECT HEROS.Id
+        FROM HEROS
+        WHERE HEROS.Force > (
+            SELECT AVG(H2.Force)
+            FROM HEROS AS H2
+        )
+    )
+)
+ORDER BY puissance_totale DESC;
+"""
+
+# the example request, without the correlated sub-request (ARMES.Id_Heros = HEROS.Id).
+EXAMPLE_UNCORRELATED = EXAMPLE_QUERY.replace("WHERE ARMES.Id_Heros = HEROS.Id\n    AND ARMES.Type IN", "WHERE ARMES.Type IN")
+
+# name -> request, by nesting depth and length.
+CORPUS: dict[str, str] = {
+    "depth-0": """
+        SELECT HEROS.Titre, HEROS.Age FROM HEROS
+        WHERE HEROS.Age > 30 AND HEROS.Force < 50
+        ORDER BY HEROS.Age;
+    """,
+    "depth-1": """
+        SELECT ENNEMIS.Titre FROM ENNEMIS
+        WHERE ENNEMIS.Age < (
+            SELECT SUM(HEROS.Age) / count(HEROS.Titre) FROM HEROS
+        );
+    """,
+    "depth-2": """
+        SELECT ENNEMIS.Titre, ENNEMIS.Ville FROM ENNEMIS
+        WHERE ENNEMIS.Age > (
+            SELECT AVG(E2.Age) FROM ENNEMIS AS E2
+            WHERE E2.Rang IN (
+                SELECT R.Nom FROM Rangs AS R WHERE R.Niveau > 3
+            )
+        );
+    """,
+    "depth-4": """
+        SELECT COUNT(*) FROM (
+            SELECT DISTINCT ENNEMIS.Ville FROM ENNEMIS
+            WHERE ENNEMIS.Age > (
+                SELECT AVG(E2.Age) FROM ENNEMIS AS E2
+                WHERE E2.Rang IN (
+                    SELECT R.Nom FROM Rangs AS R
+                    WHERE R.Niveau > (
+                        SELECT MIN(R2.Niveau) FROM Rangs AS R2 WHERE R2.Niveau IS NOT NULL
+                    )
+                )
+            )
+        ) AS villes_distinctes;
+    """,
+    "example": EXAMPLE_UNCORRELATED,
+    "wide-x10": None, # filled below.
+    "in-list-1000": None,
+}
+
+def legacy_parse(element: str) -> dict[str, Any]:
+    """
+    The char by char parser of the first versions, kept as a reference
+    for the benchmarks.
+    """
+
+    def _separate_conditions(ast_dict: dict[str, str | list]) -> dict[str, str | list]:
+
+        request = ast_dict["request"]
+
+        for condition in SqlInfos.CONDITION:
+            c_idx = request.upper().find(condition)
+
+            if c_idx != -1 and request.upper()[c_idx-1] == " ":
+                og_request = request[0:c_idx]
+                co_request = request[c_idx:]
+                co_requests = []
+
+                a_idx = request.upper().find("AND")
+
+                while a_idx != -1:
+                    co_requests.append(request[c_idx:a_idx])
+                    a_idx = request.upper().find("AND", a_idx+1)
+
+                co_requests.append(co_request)
+                ast_dict["request"] = og_request
+                ast_dict["condition"] = co_requests
+
+                break
+
+        return ast_dict
+
+    def _parse(element: str, index_pos: int, n_sub_request: int = 0):
+
+        ast_dict: dict[str, str | list] = {
+                            "name": f"@{n_sub_request}",
+                            "request": "",
+                            "condition": [],
+                            "sub-request": []
+                         }
+
+        in_func = False
+        index_pos += 1
+        is_insert = False
+        is_values = False
+
+        while index_pos < len(element):
+            e = element[index_pos]
+            e_upper = e.upper()
+
+            if e in ["\n", "\t", ";"]:
+                ast_dict["request"] += " "
+                index_pos += 1
+                continue
+
+            if e == "-" and element[index_pos+1] == "-":
+                e = ")"
+
+            if e_upper == "I" and not is_insert:
+                for idx, letter in enumerate(("N", "S", "E", "R", "T")):
+                    if element[index_pos+idx+1].upper() != letter:
+                        is_insert = False
+                        break
+                    is_insert = True
+
+            if e_upper == "V" and not is_values:
+                for idx, letter in enumerate(("A", "L", "U", "E", "S")):
+                    if element[index_pos+idx+1].upper() != letter:
+                        is_values = False
+                        break
+                    is_values = True
+
+            if e == "(" and not is_values:
+
+                if is_insert:
+                    is_insert = False
+                    ast_dict["request"] += e
+                    index_pos += 1
+                    in_func = True
+                    continue
+
+                request = ast_dict["request"].upper()
+
+                for func in SqlInfos.FUNCTIONS:
+                    if request[-len(func):] == func:
+                        in_func = True
+                        break
+
+                if in_func:
+                    ast_dict["request"] += e
+                    index_pos += 1
+                    continue
+
+                n_sub_request += 1
+
+                ast_dict["request"] += f"(@{n_sub_request})"
+                ast, index_pos, n_sub_request = _parse(
+                                                        element=element,
+                                                        index_pos=index_pos,
+                                                        n_sub_request=n_sub_request
+                                                      )
+                ast_dict["sub-request"].append(ast)
+                index_pos += 1
+                continue
+
+            if e == ")" and not is_values:
+
+                if in_func:
+                    ast_dict["request"] += e
+                    index_pos += 1
+                    in_func = False
+                    continue
+
+                ast_dict = _separate_conditions(ast_dict=ast_dict)
+                return ast_dict, index_pos, n_sub_request
+
+            ast_dict["request"] += e
+            index_pos += 1
+
+        ast_dict = _separate_conditions(ast_dict=ast_dict)
+        return ast_dict, index_pos, n_sub_request
+
+    return _parse(element, -1)[0]
+
+def legacy_print_table(values: list[tuple[Any, ...]], head: list[str], out: Any) -> None:
+    """
+    The `Terminal.print_table` of the first versions, kept as a reference
+    for the benchmarks.
+    """
+
+    all_vals: list[tuple] = values + [tuple(head)]
+    max_lens: list[int]   = [max(len(str(v[idx])) for v in all_vals) for idx in range(0, len(values[0]), 1)]
+
+    header: str = ""
+
+    for idx, h in enumerate(head):
+        str_h: str = str(h)
+        header += " " * (max_lens[idx] - len(str_h)) + str_h + " | "
+
+    header = header[:-3]
+    separation = "-" * len(header)
+
+    out.write(header + "\n" + separation + "\n")
+    to_print: str = ""
+
+    for v_idx, value in enumerate(values):
+        len_val: int = len(value)-1
+        for idx, element in enumerate(value):
+            str_element: str = str(element)
+
+            if idx != len_val:
+                to_print += " " * (max_lens[idx] - len(str_element)) + str_element + " | "
+            else:
+                to_print += " " * (max_lens[idx] - len(str_element)) + str_element + "\n"
+
+        if v_idx != len(values)-1:
+            to_print += separation + "\n"
+        else:
+            to_print += "\n"
+    out.write(to_print)
+
+class NullWriter:
+    """
+    A file that forgets everything, so the terminal speed doesn't count.
+    """
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+def wide_query(scale: int) -> str:
+    """
+    `scale` copies of the example query, as columns of one request.
+    """
+
+    example = EXAMPLE_QUERY.strip().rstrip(";")
+    columns = ",\n".join(f"({example}) AS c{idx}" for idx in range(scale))
+
+    return f"SELECT {columns}\nFROM HEROS;"
+
+def deep_query(depth: int) -> str:
+    """
+    A request with `depth` nested sub-requests.
+    """
+
+    head = "".join(f"SELECT H{idx}.Id FROM HEROS AS H{idx} WHERE H{idx}.Age > (\n" for idx in range(depth))
+
+    return head + "SELECT AVG(Age) FROM HEROS" + ")" * depth + ";"
+
+def in_list_query(length: int) -> str:
+    """
+    A request with a long IN list.
+    """
+
+    values = ", ".join(str(idx) for idx in range(length))
+
+    return f"SELECT HEROS.Titre FROM HEROS WHERE HEROS.Id IN ({values}) AND HEROS.Age > 20;"
+
+# wide_query() is only parsed (its sub-requests return 3 columns), this one runs.
+CORPUS["wide-x10"] = "SELECT " + ",\n".join(
+    f"(SELECT COUNT(*) FROM ARMES WHERE ARMES.Puissance > {10 * idx} AND ARMES.Type IN "
+    f"(SELECT T.Type FROM TYPES AS T WHERE T.Rarete = {idx % 5})) AS c{idx}"
+    for idx in range(10)
+) + ";"
+CORPUS["in-list-1000"] = in_list_query(1000)
+
+def generate_database(path: str, rows: int = 10_000) -> None:
+    """
+    Create (or replace) the tables of the example request in `path`:
+    `rows` HEROS and ENNEMIS, 3 * `rows` ARMES, and small TYPES and Rangs.
+    The values are computed from the ids, so two databases with the same
+    `rows` are the same.
+    """
+
+    db = sqlite3.connect(path)
+    db.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+
+        DROP TABLE IF EXISTS HEROS;
+        DROP TABLE IF EXISTS ENNEMIS;
+        DROP TABLE IF EXISTS ARMES;
+        DROP TABLE IF EXISTS TYPES;
+        DROP TABLE IF EXISTS Rangs;
+
+        CREATE TABLE HEROS (Id INTEGER PRIMARY KEY, Titre TEXT, Age INTEGER, Force INTEGER, Ville TEXT);
+        CREATE TABLE ENNEMIS (Id INTEGER PRIMARY KEY, Titre TEXT, Age INTEGER, Ville TEXT, Rang TEXT);
+        CREATE TABLE ARMES (Id INTEGER PRIMARY KEY, Id_Heros INTEGER, Type TEXT, Puissance INTEGER);
+        CREATE TABLE TYPES (Type TEXT PRIMARY KEY, Rarete INTEGER, Categorie TEXT);
+        CREATE TABLE Rangs (Nom TEXT PRIMARY KEY, Niveau INTEGER);
+    """)
+
+    villes = "CASE i % 5 WHEN 0 THEN 'Gotham' WHEN 1 THEN 'Metropolis' WHEN 2 THEN 'Paris' WHEN 3 THEN 'Lyon' ELSE 'Star City' END"
+
+    def _insert(table: str, count: int, values: str) -> None:
+        db.execute(f"""
+            INSERT INTO {table}
+            WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < {count})
+            SELECT {values} FROM seq
+        """)
+
+    _insert("HEROS", rows, f"i, 'Hero' || i, 18 + (i * 7919) % 63, 1 + (i * 104729) % 100, {villes}")
+    _insert("ENNEMIS", rows, f"i, 'Vilain' || i, 18 + (i * 6007) % 63, {villes}, 'R' || (1 + (i * 31) % 10)")
+    _insert("ARMES", 3 * rows, f"i, 1 + (i * 7727) % {rows}, 'T' || (1 + (i * 13) % 20), 1 + (i * 4409) % 500")
+    _insert("TYPES", 20, "'T' || i, i % 5, CASE WHEN i % 3 = 0 THEN 'légendaire' ELSE 'commun' END")
+    _insert("Rangs", 10, "'R' || i, CASE WHEN i = 10 THEN NULL ELSE i END")
+
+    db.commit()
+    db.close()
+
+def timeit(func: Callable[[], Any], repeat: int = 3) -> float | str:
+    """
+    Return the best time of `repeat` runs of `func`, or the name of the
+    error if it failed.
+    """
+
+    best = None
+
+    for _ in range(repeat):
+        start = perf_counter()
+
+        try:
+            func()
+        except (RecursionError, IndexError) as e:
+            return type(e).__name__
+
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+def bench_parser(scale: int = 1000, repeat: int = 3) -> list[dict[str, Any]]:
+    """
+    Compare the legacy parser with `Interpreter.__parse`.
+    """
+
+    parse = Interpreter(None, None)._Interpreter__parse
+
+    queries = {
+        "example": EXAMPLE_QUERY,
+        f"wide x{scale}": wide_query(scale),
+        f"deep x{scale}": deep_query(6 * scale),
+        f"in-list x{scale}": in_list_query(100 * scale),
+    }
+
+    results = []
+
+    for name, query in queries.items():
+        legacy = timeit(lambda: legacy_parse(query), repeat)
+        new = timeit(lambda: parse(query), repeat)
+
+        results.append({"query": name, "size": len(query), "legacy": legacy, "new": new})
+
+    return results
+
+def bench_render(n_rows: int = 100_000, repeat: int = 3) -> list[dict[str, Any]]:
+    """
+    Rows per second of the legacy `print_table` and `Terminal.print_table`.
+    """
+
+    head = ["Id", "Titre", "Age", "Force", "Ville"]
+    rows = [(idx, f"Hero{idx}", 18 + idx % 60, (idx * 37) % 100 / 3, None if idx % 11 == 0 else "Gotham")
+            for idx in range(n_rows)]
+    null = NullWriter()
+    term = Terminal(out=null)
+
+    results = []
+
+    for name, func in (("legacy", lambda: legacy_print_table(rows, head, null)),
+                       ("new", lambda: term.print_table(rows, head))):
+        elapsed = timeit(func, repeat)
+        results.append({"renderer": name, "rows": n_rows, "time": elapsed, "rows/s": n_rows / elapsed})
+
+    return results
+
+def bench_suite(db_path: str, repeat: int = 3, preview: int = 1000,
+                queries: dict[str, str] = None) -> dict[str, Any]:
+    """
+    Time each request of the corpus by phase: parse, __getCommands,
+    execute (with the fetch of every row) and Terminal rendering (of the
+    first `preview` rows of each step). The output goes to a NullWriter.
+    """
+
+    queries = CORPUS if queries is None else queries
+
+    db = DatabaseSystem(cache_rows=0)
+    db.connect(db_path)
+
+    null = NullWriter()
+    term = Terminal(out=null)
+    interpreter = Interpreter(db, term)
+
+    parse = interpreter._Interpreter__parse
+    get_commands = interpreter._Interpreter__getCommands
+
+    results = []
+
+    for name, query in queries.items():
+        tree = parse(query)
+        steps = get_commands(tree)
+        outputs: list[tuple[list[str], list[tuple]]] = []
+
+        def _execute() -> None:
+            outputs.clear()
+
+            for step in steps:
+                columns, result = db.execute(step.sql, use_cache=False)
+                rows = [row for idx, row in zip(range(preview), result)]
+                result.row_count # the rows left.
+                outputs.append((columns, rows))
+
+        def _render() -> None:
+            old_command = None
+
+            for step, (columns, rows) in zip(steps, outputs):
+                if step.first:
+                    old_command = None
+
+                sub_request = str(step.sub_request) if step.sub_request is not None else None
+                old_command = term.print_step(str(step.request), step.sql, old_command, sub_request, step.caret)
+                term.print_table(rows, columns)
+
+        record = {
+            "query": name,
+            "size": len(query),
+            "steps": len(steps),
+            "parse": timeit(lambda: parse(query), repeat),
+            "getCommands": timeit(lambda: get_commands(tree), repeat),
+            "execute": timeit(_execute, repeat),
+            "render": timeit(_render, repeat),
+        }
+        record["rows"] = sum(len(rows) for _, rows in outputs)
+        results.append(record)
+
+    heros = next(iter(db.execute("SELECT COUNT(*) FROM HEROS", use_cache=False)[1]))[0]
+    db.close()
+
+    return {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "database": str(db_path),
+            "rows": heros,
+            "repeat": repeat,
+            "preview": preview,
+        },
+        "results": results
+    }
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> list[str]:
+    """
+    Return one line per request and phase: old time, new time and ratio.
+    """
+
+    phases = ("parse", "getCommands", "execute", "render")
+    old_results = {record["query"]: record for record in old["results"]}
+    lines = []
+
+    for record in new["results"]:
+        before = old_results.get(record["query"])
+
+        if before is None:
+            continue
+
+        for phase in phases:
+            if not isinstance(before.get(phase), float) or not isinstance(record.get(phase), float):
+                continue
+
+            ratio = record[phase] / before[phase] if before[phase] else float("inf")
+            flag = "  <-- slower" if ratio > 1.10 else ""
+            lines.append(f"{record['query']:>14} {phase:>12}: {_fmt_time(before[phase]):>12} -> "
+                         f"{_fmt_time(record[phase]):>12} (x{ratio:.2f}){flag}")
+
+    return lines
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _fmt_time(value: float | str) -> str:
+    return f"{value * 1000:.3f} ms" if isinstance(value, float) else value
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLviewer benchmarks.")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p_parser = sub.add_parser("parser", help="legacy parser vs tokenizer parser.")
+    p_parser.add_argument("--scale", type=int, default=1000)
+    p_parser.add_argument("--repeat", type=int, default=3)
+
+    p_render = sub.add_parser("render", help="legacy print_table vs columnar renderer.")
+    p_render.add_argument("--rows", type=int, default=100_000)
+    p_render.add_argument("--repeat", type=int, default=3)
+
+    p_generate = sub.add_parser("generate", help="create the synthetic database.")
+    p_generate.add_argument("--db", required=True)
+    p_generate.add_argument("--rows", type=int, default=10_000)
+
+    p_suite = sub.add_parser("suite", help="time the corpus by phase, write the results as json.")
+    p_suite.add_argument("--db", required=True)
+    p_suite.add_argument("--rows", type=int, default=None, help="(re)generate the database with this size first.")
+    p_suite.add_argument("--repeat", type=int, default=3)
+    p_suite.add_argument("--preview", type=int, default=1000)
+    p_suite.add_argument("--out", default=None)
+
+    p_compare = sub.add_parser("compare", help="compare two results of the suite.")
+    p_compare.add_argument("old")
+    p_compare.add_argument("new")
+
+    args = parser.parse_args()
+
+    if args.bench == "parser":
+        for result in bench_parser(args.scale, args.repeat):
+            speedup = ""
+
+            if isinstance(result["legacy"], float) and isinstance(result["new"], float):
+                speedup = f"x{result['legacy'] / result['new']:.2f}"
+
+            print(f"{result['query']:>16} ({result['size']:>9} chars): "
+                  f"legacy {_fmt_time(result['legacy']):>14} | new {_fmt_time(result['new']):>14} {speedup}")
+
+    elif args.bench == "render":
+        for result in bench_render(args.rows, args.repeat):
+            print(f"{result['renderer']:>8}: {result['rows']} rows in {_fmt_time(result['time'])} "
+                  f"({result['rows/s']:,.0f} rows/s)")
+
+    elif args.bench == "generate":
+        start = perf_counter()
+        generate_database(args.db, args.rows)
+        print(f"{args.db}: {args.rows} rows per table in {perf_counter() - start:.2f} s")
+
+    elif args.bench == "suite":
+        if args.rows is not None or not Path(args.db).exists():
+            generate_database(args.db, args.rows or 10_000)
+
+        report = bench_suite(args.db, args.repeat, args.preview)
+
+        for record in report["results"]:
+            print(f"{record['query']:>14}: parse {_fmt_time(record['parse']):>11} | "
+                  f"getCommands {_fmt_time(record['getCommands']):>11} | "
+                  f"execute {_fmt_time(record['execute']):>12} | render {_fmt_time(record['render']):>12}")
+
+        if args.out is not None:
+            Path(args.out).write_text(json.dumps(report, indent=4), encoding="utf-8")
+
+    elif args.bench == "compare":
+        old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+        new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+        print("\n".join(compare(old, new)))
+
+if __name__ == "__main__":
+    main()
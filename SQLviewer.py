@@ -22,9 +22,24 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import re
+import asyncio
+import csv
+import json
 import sqlite3 as sql
+from hashlib import sha1
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from queue import Queue
+from threading import Lock
+from time import perf_counter, sleep
 from warnings import warn
 from typing import Any
+from io import StringIO
+from itertools import chain
+from multiprocessing import Pool
 from sys import stdout # faster print
 
 class SqlInfos:
@@ -56,552 +71,4500 @@ class SqlInfos:
         "WHERE", "ON"
     }
 
-class File:
+    SUB_REQUEST: set[str] = {
+        "SELECT", "WITH"
+    }
+
+    # first words of a statement, to find the query logs (one per line).
+    STATEMENTS: set[str] = {
+        "SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE", "VALUES",
+        "CREATE", "DROP", "ALTER", "PRAGMA", "EXPLAIN", "ANALYZE", "VACUUM",
+        "BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE", "ATTACH", "DETACH"
+    }
+
+    # words that can't be an alias after a table name.
+    CLAUSES: set[str] = {
+        "WHERE", "ON", "JOIN", "INNER", "LEFT", "RIGHT", "FULL",
+        "OUTER", "CROSS", "NATURAL", "GROUP", "HAVING", "ORDER",
+        "LIMIT", "OFFSET", "UNION", "EXCEPT", "INTERSECT", "USING",
+        "WINDOW", "AS", "SET", "VALUES", "SELECT", "RETURNING"
+    }
+
+    # words starting a join in a FROM clause, and the words ending the clause.
+    JOINS: set[str] = {
+        "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL"
+    }
+
+    FROM_END: set[str] = {
+        "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "WINDOW", "UNION",
+        "EXCEPT", "INTERSECT", "RETURNING"
+    }
+
+    COMPARISON: set[str] = {
+        "=", "==", "<", ">", "<=", ">=", "!=", "<>",
+        "IN", "LIKE", "GLOB", "IS", "BETWEEN"
+    }
+
+    # words making the row count of a request not proportional to its tables.
+    AGGREGATES: set[str] = {
+        "COUNT", "SUM", "AVG", "MIN", "MAX", "TOTAL", "GROUP_CONCAT", "GROUP", "DISTINCT", "LIMIT"
+    }
+
+class Tokenizer:
     """
-    A file system class (with sql system).
+    A single pass tokenizer for sql requests.
+
+    A token is a tuple `(kind, start, end)`, with the offsets of the token
+    in the original request. kinds are: "space", "comment", "string",
+    "quoted", "number", "param", "word", "op", "lparen", "rparen",
+    "comma", "semicolon" and "other".
     """
 
-    def __init__(self) -> None:
+    TOKEN_RE = re.compile(r"""
+         (?P<space>\s+)
+        |(?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+        |(?P<string>'(?:[^']|'')*(?:'|\Z))
+        |(?P<quoted>"(?:[^"]|"")*(?:"|\Z)|`(?:[^`]|``)*(?:`|\Z)|\[[^\]]*(?:\]|\Z))
+        |(?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+        |(?P<param>\?\d*|[:@$][A-Za-z_][A-Za-z_0-9]*)
+        |(?P<word>[^\W\d][\w$]*)
+        |(?P<op>\|\||<<|>>|<=|>=|==|!=|<>|[-+*/%<>=~&|.])
+        |(?P<lparen>\()
+        |(?P<rparen>\))
+        |(?P<comma>,)
+        |(?P<semicolon>;)
+        |(?P<other>.)
+    """, re.S | re.X)
+
+    SKIPPED: set[str] = {
+        "space", "comment"
+    }
+
+    @classmethod
+    def tokenize(cls, text: str, skip: set[str] = SKIPPED) -> list[tuple[str, int, int]]:
         """
-        init.
+        Return the list of tokens of `text`, without the kinds in `skip`.
         """
-    
-        self.mydb: sql.Connection = None
 
-    def ConnectToDatabase(self, path: str = None) -> None:
+        return [(m.lastgroup, m.start(), m.end()) for m in cls.TOKEN_RE.finditer(text)
+                if m.lastgroup not in skip]
+
+    @classmethod
+    def clean(cls, text: str, tokens: list[tuple[str, int, int]] = None) -> str:
         """
-        Connect to a sql table. (Create one if not exist.)
+        Return `text` with the same length and offsets, but with the comments,
+        new lines, tabs and `;` (outside of strings) replaced by spaces.
         """
 
-        if path is None:
-            warn("path of File.ConnectToDatabase is None !")
-            return
-        
-        if path == "":
-            warn("path of File.ConnectToDatabase is empty !")
-            return
+        if tokens is None:
+            tokens = cls.tokenize(text, skip=set())
 
-        self.mydb = sql.connect(
-            database=path
-        )
+        pieces: list[str] = []
 
-    def GetDatabase(self) -> sql.Connection | None:
-        """
-        return the Connection system. (return None if not connected.)
-        """
+        for kind, start, end in tokens:
+            if kind in {"space", "comment", "semicolon"}:
+                pieces.append(" " * (end - start))
+            else:
+                pieces.append(text[start:end])
 
-        return self.mydb
-    
-class DatabaseSystem:
-    """
-    Database Connection system.
-    """
+        return "".join(pieces)
 
-    def __init__(self):
+    @classmethod
+    def normalize(cls, text: str) -> str:
         """
-        init.
+        Return `text` with the tokens separated by one space, the words in
+        upper case, without the comments and the `;`.
         """
 
-        self.mydb: sql.Connection = None # db Connection instance
-        self.cursor: sql.Cursor   = None # directly to db for command.
-        self.command: sql.Cursor  = None # Cursor instance of the last command.
-        self.last_result: tuple   = None # last result: colums, result
+        parts: list[str] = []
 
-        # File instance.
-        self.classFile = File()
+        for kind, start, end in cls.tokenize(text):
+            if kind == "semicolon":
+                continue
 
-    def __call_func(self, *arg):
+            token = text[start:end]
+            parts.append(token.upper() if kind == "word" else token)
+
+        return " ".join(parts)
+
+    @classmethod
+    def split(cls, text: str) -> tuple[list[str], str]:
         """
-        Create an internal sql function for the interpreter.
-        for the interpreter to get some infos from the og request.
+        Split `text` on the `;` outside of strings and comments.
+
+        return the statements (stripped, without the empty ones) and the
+        text after the last `;`.
         """
-        from base64 import b64decode
 
-        return b64decode(b'TWFkZSBieSBLeWxlQ2llIChnaXRodWIgYWNjb3VudCku').decode("ascii")
+        statements: list[str] = []
+        start = 0
+
+        for kind, s_start, s_end in cls.tokenize(text):
+            if kind == "semicolon":
+                statement = text[start:s_start].strip()
+                start = s_end
+
+                if any(kind not in cls.SKIPPED for kind, _, _ in cls.tokenize(statement, skip=set())):
+                    statements.append(statement)
 
-    def connect(self, path: str = None) -> None:
+        return statements, text[start:]
+
+    @classmethod
+    def bind(cls, text: str, params: Any) -> tuple[str, dict[str, Any]]:
         """
-        Connect to the sql database from `path`.
+        Return `text` with its positional parameters (`?`, `?NNN`) renamed
+        `:_1`, `:_2`, ..., and `params` as a dict of the names: a step only
+        uses some of the parameters of the request, they are bound by name.
+        (`params` can be a dict for the `:name` parameters.)
         """
 
-        self.classFile.ConnectToDatabase(path=path)
-        self.mydb = self.classFile.GetDatabase()
+        if isinstance(params, dict):
+            return text, dict(params)
 
-        if self.mydb is not None: # init for command.
-            self.mydb.create_function("credits", 0, self.__call_func)
-            self.cursor = self.mydb.cursor()
+        params = list(params)
+        names: dict[str, Any] = {}
+        pieces: list[str] = []
+        last = 0
+        number = 0
 
-    def close(self) -> None:
+        for kind, start, end in cls.tokenize(text):
+            if kind != "param" or text[start] != "?":
+                continue
+
+            number = int(text[start + 1:end]) if end - start > 1 else number + 1 # as sqlite numbers them.
+            pieces.append(text[last:start] + f":_{number}")
+            last = end
+
+            if number <= len(params):
+                names[f"_{number}"] = params[number - 1]
+
+        pieces.append(text[last:])
+
+        return "".join(pieces), names
+
+    @classmethod
+    def values_rows(cls, text: str) -> tuple[str, list[tuple]] | None:
         """
-        Disconnect from the sql database.
+        Split an `INSERT ... VALUES (...), (...)` of literals into one
+        prepared statement (with a `?` per value) and its rows, for
+        `executemany`. return None for any other request (sub-requests,
+        expressions, parameters, `ON CONFLICT`, ...).
         """
 
-        self.cursor.close()
-        self.mydb.close()
+        tokens = cls.tokenize(text)
+
+        if not tokens or tokens[0][0] != "word" or text[tokens[0][1]:tokens[0][2]].upper() not in {"INSERT", "REPLACE"}:
+            return None
+
+        idx = next((idx for idx, (kind, start, end) in enumerate(tokens)
+                    if kind == "word" and text[start:end].upper() == "VALUES"), None)
+
+        if idx is None or any(kind == "param" for kind, _, _ in tokens[:idx]):
+            return None
+
+        rows: list[tuple] = []
+        row: list[Any] = []
+        n_tokens = len(tokens)
+        t_idx = idx + 1
+
+        while t_idx < n_tokens:
+            kind, start, end = tokens[t_idx]
+
+            if kind == "semicolon" and not row:
+                t_idx += 1
+                continue
+
+            if kind != "lparen" or row:
+                return None
+
+            t_idx += 1
+
+            while True: # the literals of a row.
+                if t_idx >= n_tokens:
+                    return None
+
+                kind, start, end = tokens[t_idx]
+                word = text[start:end].upper() if kind == "word" else None
+                sign = 1
+
+                if kind == "op" and text[start:end] in {"-", "+"} and t_idx + 1 < n_tokens \
+                   and tokens[t_idx + 1][0] == "number":
+                    sign = -1 if text[start:end] == "-" else 1
+                    t_idx += 1
+                    kind, start, end = tokens[t_idx]
+
+                if kind == "number":
+                    number = text[start:end]
+
+                    if number[:2].lower() == "0x":
+                        value = int(number, 16)
+                    elif number.isdigit():
+                        value = int(number)
+                    else:
+                        value = float(number)
+
+                    row.append(sign * value)
+                elif kind == "string":
+                    row.append(text[start + 1:end - 1].replace("''", "'"))
+                elif word in {"NULL", "TRUE", "FALSE"}:
+                    row.append({"NULL": None, "TRUE": 1, "FALSE": 0}[word])
+                elif word == "X" and t_idx + 1 < n_tokens and tokens[t_idx + 1][0] == "string" \
+                     and tokens[t_idx + 1][1] == end: # blob, X'0A1B'.
+                    t_idx += 1
+
+                    try:
+                        row.append(bytes.fromhex(text[end + 1:tokens[t_idx][2] - 1]))
+                    except ValueError:
+                        return None
+                else:
+                    return None
+
+                t_idx += 1
+
+                if t_idx < n_tokens and tokens[t_idx][0] == "comma":
+                    t_idx += 1
+                    continue
+
+                if t_idx < n_tokens and tokens[t_idx][0] == "rparen":
+                    t_idx += 1
+                    break
+
+                return None
+
+            if rows and len(row) != len(rows[0]):
+                return None
+
+            rows.append(tuple(row))
+            row = []
+
+            if t_idx < n_tokens and tokens[t_idx][0] == "comma":
+                t_idx += 1
+
+                if t_idx >= n_tokens:
+                    return None
+
+        if not rows:
+            return None
+
+        template = text[:tokens[idx][2]] + " (" + ", ".join("?" * len(rows[0])) + ")"
 
-    def execute(self, command: str = None) -> tuple[list[str | Any], Any | list[Any]]:
+        return template, rows
+
+    @classmethod
+    def statements(cls, lines: Any, per_line: bool = None) -> Any:
         """
-        Execute the sql command from `command`.
+        Yield the statements of `lines` (a file, ...), one at a time.
+        The last one may have no `;`.
 
-        return the columns names (from the result), `list[str | Any]`,
-        and the command result, `Any` or a `list[Any]`.
+        `per_line`: a query log, one statement per line (the `;` are
+        optional). None to find it from the first two lines (not empty nor
+        comments): both start a statement, and the first one is complete.
         """
 
-        result = self.cursor.execute(command).fetchall() # can't do sql=command.
-        self.last_result = ([desc[0] for desc in self.cursor.description] if self.cursor.description else [], result)
+        lines = iter(lines)
+        head: list[str] = [] # the lines read to find the kind of file.
 
-        return self.last_result
+        if per_line is None:
+            firsts: list[tuple[str, list[tuple[str, int, int]]]] = [] # first two lines, and their tokens.
 
-    def last_result(self) -> tuple[list[str | Any], Any | list[Any]]:
+            for line in lines:
+                head.append(line)
+                tokens = cls.tokenize(line + ";")
+
+                if len(tokens) > 1:
+                    firsts.append((line, tokens))
+
+                if len(firsts) == 2:
+                    break
+
+            per_line = len(firsts) == 2 and all(
+                tokens[0][0] == "word" and line[tokens[0][1]:tokens[0][2]].upper() in SqlInfos.STATEMENTS
+                for line, tokens in firsts
+            )
+
+            if per_line: # the first line is a whole statement.
+                line, tokens = firsts[0]
+                depth = sum((kind == "lparen") - (kind == "rparen") for kind, _, _ in tokens)
+                per_line = depth == 0 and [kind for kind, _, _ in tokens].count("semicolon") == 1 \
+                           and tokens[-1][0] == "semicolon"
+
+        if per_line:
+            for line in chain(head, lines):
+                yield from cls.split(line + ";")[0]
+            return
+
+        pending: list[str] = [] # lines of the statements not ended yet.
+        scanned = 0 # offset in the pending text where the tokens are not known yet.
+
+        for line in chain(head, lines):
+            pending.append(line)
+
+            if ";" not in line:
+                continue
+
+            text = "".join(pending)
+            tokens = cls.tokenize(text[scanned:], skip=set())
+            ends = [scanned + end for kind, _, end in tokens if kind == "semicolon"]
+
+            if not ends: # the `;` are in a string or a comment, the last token may go on.
+                scanned += tokens[-1][1] if tokens else 0
+                pending = [text]
+                continue
+
+            statements, _ = cls.split(text[:ends[-1]])
+            yield from statements
+
+            pending = [text[ends[-1]:]]
+            scanned = 0
+
+        statements, rest = cls.split("".join(pending) + ";")
+        yield from statements
+
+class ResultCache:
+    """
+    A LRU cache of the results of the steps, keyed by the normalized sql
+    command. Evicts the oldest results when the total of rows or bytes is
+    too big, and clears itself when the database version changes.
+    """
+
+    def __init__(self, max_rows: int = 100_000, max_bytes: int = 64 * 1024 * 1024) -> None:
         """
-        Return the last result of a command.
+        init. (`max_rows` or `max_bytes` to 0 disable the cache.)
         """
 
-        return self.last_result
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
 
-    def get_raw_tables(self) -> tuple | list[tuple]:
+        self.entries: OrderedDict[str, tuple[list[str], list[tuple], int]] = OrderedDict()
+        self.rows: int = 0
+        self.bytes: int = 0
+        self.version: Any = None
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self.lock = Lock() # results can be added from the threads of the pool.
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def normalize(command: str) -> str:
         """
-        Return the raw values of the table's names in the database.
+        Return the key of `command`. (see `Tokenizer.normalize`.)
         """
 
-        return self.cursor.execute("""SELECT name FROM sqlite_schema
-                                      WHERE type = "table" AND
-                                      name NOT LIKE "sqlite_%";
-                                   """ # problems with ' and ".
-                                  ).fetchall()
+        return Tokenizer.normalize(command)
 
-    def get_tables(self) -> list[str]:
+    @staticmethod
+    def size_of(rows: list[tuple]) -> int:
         """
-        Return a usable list of the table's names.
+        Return an estimation of the size in bytes of `rows`.
         """
 
-        raw_data: list[tuple[str]] = self.get_raw_tables()
-        data = [element[0] for element in raw_data]
+        size = 0
 
-        return data
+        for row in rows:
+            size += 56 + 8 * len(row)
+            for value in row:
+                size += len(value) if isinstance(value, (str, bytes)) else 8
 
-class Terminal:
-    """
-    A class for cool printing in the terminal.
-    """
+        return size
 
-    def __init__(self) -> None:
+    def check_version(self, version: Any) -> None:
         """
-        init.
+        Clear the cache if the database `version` has changed.
         """
 
-        self.WHITE  = "\033[97m"
-        self.BLUE = "\033[96m"
-        self.PURPLE = "\033[95m"
-        self.GREEN = "\033[92m"
-        self.YELLOW = "\033[93m"
-        self.RESET = "\033[0m"
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.rows = 0
+                self.bytes = 0
+                self.version = version
 
-    def print_table(self, values: list[tuple[Any, ...]], head: list[str] = None) -> None:
+    def clear(self) -> None:
         """
-        Print a table from the values and a header.
+        Remove every result.
         """
 
-        if values is None or values == []:
-            warn("The variable values from Terminal.print_table is None !")
-            return
+        with self.lock:
+            self.entries.clear()
+            self.rows = 0
+            self.bytes = 0
 
-        if head is None or head == []:
-            warn("The variable head from Terminal.print_table is None !")
-            return
+    def get(self, key: str) -> tuple[list[str], list[tuple]] | None:
+        """
+        Return the columns and the rows of `key`, or None. (count hits and misses.)
+        """
 
-        all_vals: list[tuple] = values + [tuple(head)]
-        max_lens: list[int]   = [max(len(str(v[idx])) for v in all_vals) for idx in range(0, len(values[0]), 1)]
+        with self.lock:
+            entry = self.entries.get(key)
 
-        header: str = ""
+            if entry is None:
+                self.misses += 1
+                return None
 
-        for idx, h in enumerate(head):
-            str_h: str = str(h)
-            header += " " * (max_lens[idx] - len(str_h)) + str_h + " | "
+            self.entries.move_to_end(key)
+            self.hits += 1
 
-        header = header[:-3]
-        separation = "-" * len(header)
+            return entry[0], entry[1]
 
-        stdout.write(header + "\n" + separation + "\n")
-        to_print: str = ""
+    def put(self, key: str, columns: list[str], rows: list[tuple]) -> None:
+        """
+        Add a result, and evict the least recently used ones if needed.
+        """
 
-        for v_idx, value in enumerate(values):
-            len_val: int = len(value)-1
-            for idx, element in enumerate(value):
-                str_element: str = str(element)
+        if not self.enabled:
+            return
 
-                if idx != len_val:
-                    to_print += " " * (max_lens[idx] - len(str_element)) + str_element + " | "
-                else:
-                    to_print += " " * (max_lens[idx] - len(str_element)) + str_element + "\n"
+        size = self.size_of(rows)
 
-            if v_idx != len(values)-1:
-                to_print += separation + "\n"
-            else:
-                to_print += "\n"
-        stdout.write(to_print)
+        if len(rows) > self.max_rows or size > self.max_bytes:
+            return # would evict everything for nothing.
 
-    def print_request(self, request: str, old_request: str = None, difference_request_name: str = None, request_name_pos: tuple = None, 
-                      old_req_adder: int = 0) -> str:
-        """
-        Print a SQL request with color highlighting:
-        - keywords, and functions in blue
-        - table names in green
-        - values and constants in white
-        - others (columns, etc.) in purple
+        with self.lock:
+            if key in self.entries:
+                self.discard(key)
 
-        return the "cleaned" request.
-        """
+            self.entries[key] = (columns, rows, size)
+            self.rows += len(rows)
+            self.bytes += size
 
-        tokens = request.strip().replace(",", " , ").replace("(", " ( ").replace(")", " ) ").split()
-        colored = []
-        next_is_table = False  # flag to color table names in green.
+            while self.rows > self.max_rows or self.bytes > self.max_bytes:
+                self.discard(next(iter(self.entries)))
 
-        for word in tokens:
-            upper = word.upper()
+    def discard(self, key: str) -> None:
+        """
+        Remove the result of `key`. (the lock must be held.)
+        """
 
-            if upper in SqlInfos.WORDS:
-                colored.append(f"{self.BLUE}{upper}{self.RESET}")
-                if upper in {"FROM", "JOIN", "INTO", "UPDATE"}:
-                    next_is_table = True
-                else:
-                    next_is_table = False
+        _, rows, size = self.entries.pop(key)
+        self.rows -= len(rows)
+        self.bytes -= size
 
-            elif upper in SqlInfos.FUNCTIONS:
-                colored.append(f"{self.BLUE}{upper}{self.RESET}")
-                next_is_table = False
+class ResultStream:
+    """
+    A lazy result of a sql command. The rows are pulled from the cursor
+    with `fetchmany`, only the first `keep_limit` rows are kept (for the
+    result cache), and the iteration stops after `preview_limit` rows.
+    `row_count` gives the real number of rows, without keeping them.
 
-            elif next_is_table and word not in {",", "(", ")"}:
-                colored.append(f"{self.GREEN}{word}{self.RESET}")
-                next_is_table = False
+    (can be iterated only once when it reads a cursor.)
+    """
 
-            elif word in {",", "(", ")", ">=", ">", "<", "<=", "/", "+", "-", "*", "=", "%"} or "0" <= word <= "9":
-                colored.append(f"{self.WHITE}{word}{self.RESET}")
+    def __init__(self, columns: list[str], cursor: sql.Cursor = None, rows: list[tuple] = None,
+                 preview_limit: int = None, fetch_size: int = 1000, keep_limit: int = 0,
+                 on_done: Any = None, row_count: int = None, max_rows: int = None) -> None:
+        """
+        init. (from a `cursor`, or from already fetched `rows`, `row_count`
+        is the real number of rows when `rows` is only a preview.)
 
-            else:
-                colored.append(f"{self.PURPLE}{word}{self.RESET}")
-                next_is_table = False
+        `max_rows`: the fetch stops after that many rows (the step is
+        then aborted), see `ResourceGovernor`.
+        """
 
-        stdout.write(" ".join(colored) + "\n")
-        joined_tokens = " ".join(tokens)
+        self.columns = columns
+        self.cursor = cursor
+        self.preview_limit = preview_limit
+        self.fetch_size = max(1, fetch_size)
+        self.on_done = on_done # called with the stream when every row has been fetched.
+
+        self.rows: list[tuple] = [] if rows is None else rows
+        self.keep_limit = keep_limit if cursor is not None else len(self.rows)
+        self.fetched: int = 0 if cursor is not None else len(self.rows)
+        self.total: int | None = None if cursor is not None else len(self.rows)
+        self.cache_hit: bool | None = None # None if the cache was not used.
+        self.max_rows = max_rows
+        self.governor: ResourceGovernor | None = None
+        self.limits: tuple | None = None # of the monitor, see `StepMonitor.limit`.
+        self.aborted: str | None = None # why the fetch has been stopped by the governor.
+
+        if cursor is None and row_count is not None:
+            self.total = row_count
+
+        # measures, for the profiling.
+        self.exec_time: float = 0.0
+        self.fetch_time: float = 0.0
+        self.statement_hit: bool | None = None
+        self.vm_steps: int = 0
+        self.monitor: StepMonitor | None = None
+        self.vm_start: int = 0
+        self.changes: int | None = None # rows written, see `DatabaseSystem.execute_many`.
+
+    def _fetchmany(self, size: int) -> list[tuple]:
+        if self.aborted is not None:
+            return []
+
+        if self.max_rows is not None:
+            size = min(size, self.max_rows - self.fetched)
+
+        start = perf_counter()
+        armed = self.limits is not None and self.monitor is not None
+
+        if armed:
+            self.monitor.arm(self.limits)
+
+        try:
+            if size > 0:
+                batch = self.cursor.fetchmany(size)
+            elif self.cursor.fetchone() is not None: # one row too many.
+                self.aborted = f"more than {self.max_rows} row(s)"
+                batch = []
+            else:
+                batch = []
+        except (sql.Error, MemoryError) as e:
+            self.aborted = ResourceGovernor.reason(e, self.monitor) if self.governor is not None else None
 
-        if old_request is None:
-            print()
-            return joined_tokens
+            if self.aborted is None:
+                raise
+            batch = []
+        finally:
+            if armed:
+                self.monitor.disarm()
 
-        idx_pos = None if old_request == joined_tokens else (len(old_request), len(joined_tokens))
+        self.fetch_time += perf_counter() - start
 
-        if idx_pos is None:
-            print()
-            return joined_tokens
+        return batch
 
-        to_print: str = ""
+    def _keep(self, batch: list[tuple]) -> None:
+        self.fetched += len(batch)
 
-        if difference_request_name is not None and request_name_pos is not None:
-            to_print += " " * (idx_pos[0] + old_req_adder + 1) + "^" * (request_name_pos[0] - idx_pos[0])
-            to_print += self.YELLOW + "^"*((idx_pos[1] - idx_pos[0]) - (request_name_pos[0] - idx_pos[0] +1)) + self.RESET + "^" + "\n"
-            to_print += " " * (idx_pos[0] + old_req_adder + (request_name_pos[0] - idx_pos[0]) + 
-                        int(((idx_pos[1] - idx_pos[0]) - (request_name_pos[0] - idx_pos[0] + 13))/2)) \
-                        + self.YELLOW + "FROM REQUEST " + difference_request_name + self.RESET
+        if self.keep_limit and len(self.rows) + len(batch) <= self.keep_limit:
+            self.rows.extend(batch)
         else:
-            to_print += " " * (idx_pos[0] + old_req_adder + 1) + "^" * (idx_pos[1] - idx_pos[0])
+            self.keep_limit = 0 # too big, keep nothing.
+            self.rows = []
 
-        stdout.write(to_print + "\n")
+    def _done(self) -> None:
+        if self.total is not None:
+            return
 
-        return joined_tokens
+        self.total = self.fetched
+        self.cursor.close()
 
-class Interpreter:
-    """
-    An interpreter to serperate commands and run it.
-    """
+        if self.monitor is not None:
+            self.vm_steps = self.monitor.vm_steps - self.vm_start
 
-    def __init__(self, my_db: DatabaseSystem, term: Terminal):
+        if self.on_done is not None and self.keep_limit and self.aborted is None:
+            self.on_done(self)
+
+    def chunks(self):
         """
-        init.
+        Yield the rows to show, by lists of at most `fetch_size` rows.
         """
 
-        self.my_db = my_db
-        self.term = term
-        self.commands = []
+        limit = self.preview_limit
 
-    def __parse(self, element) -> dict[str, dict[str, dict | str] | str]:
-        """
-        Create a dict with the parsing elements.
-        """
+        if self.cursor is None:
+            rows = self.rows if limit is None else self.rows[:limit]
 
-        def _separate_conditions(ast_dict: dict[str, str | list]) -> dict[str, str | list]:
+            for idx in range(0, len(rows), self.fetch_size):
+                yield rows[idx:idx + self.fetch_size]
+            return
 
-            request = ast_dict["request"]
+        shown = 0
 
-            for condition in SqlInfos.CONDITION:
-                c_idx = request.upper().find(condition)
+        while limit is None or shown < limit:
+            size = self.fetch_size if limit is None else min(self.fetch_size, limit - shown)
+            batch = self._fetchmany(size)
 
-                if c_idx != -1 and request.upper()[c_idx-1] == " ":
-                    og_request = request[0:c_idx]
-                    co_request = request[c_idx:]
-                    co_requests = []
+            if not batch:
+                self._done()
+                return
 
-                    a_idx = request.upper().find("AND")
+            self._keep(batch)
+            shown += len(batch)
 
-                    while a_idx != -1:
-                        co_requests.append(request[c_idx:a_idx])
-                        a_idx = request.upper().find("AND", a_idx+1)
+            yield batch
 
-                    co_requests.append(co_request)
-                    ast_dict["request"] = og_request
-                    ast_dict["condition"] = co_requests
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
 
-                    break
-                
-            return ast_dict
-
-        def _parse(element: str, index_pos: int, n_sub_request: int = 0) :
-            """
-            Only god knows how this thing work, ask him if you have
-            questions. \n
-            -- Kyle, 14/10/25 at 23:50
-
-            just to know, the old system was running 10 to 15 times slower.
-            """
-
-            ast_dict: dict[str, str | list] = {
-                                "name": f"@{n_sub_request}",
-                                "request": "",
-                                "condition": [],
-                                "sub-request": []
-                             }
-
-            in_func = False
-            index_pos += 1
-            is_insert = False
-            is_values = False
-
-            while index_pos < len(element):
-                e = element[index_pos]
-                e_upper = e.upper()
-
-                if e in ["\n", "\t", ";"]:
-                    ast_dict["request"] += " "
-                    index_pos += 1
-                    continue
+    @property
+    def row_count(self) -> int:
+        """
+        The number of rows of the result (fetch and count the rows left).
+        """
 
-                if e == "-" and element[index_pos+1] == "-":
-                    e = ")"
+        while self.total is None:
+            batch = self._fetchmany(self.fetch_size)
 
-                if e_upper == "I" and not is_insert:
-                    for idx, letter in enumerate(("N", "S", "E", "R", "T")):
-                        if element[index_pos+idx+1].upper() != letter:
-                            is_insert = False
-                            break
-                        is_insert = True
+            if not batch:
+                self._done()
+                break
 
-                if e_upper == "V" and not is_values:
-                    for idx, letter in enumerate(("A", "L", "U", "E", "S")):
-                        if element[index_pos+idx+1].upper() != letter:
-                            is_values = False
-                            break
-                        is_values = True
+            self._keep(batch)
 
-                if e == "(" and not is_values:
+        return self.total
 
-                    if is_insert:
-                        is_insert = False
-                        ast_dict["request"] += e
-                        index_pos += 1
-                        in_func = True
-                        continue
+    @property
+    def truncated(self) -> bool:
+        """
+        True if the preview doesn't show every row.
+        """
 
-                    request = ast_dict["request"].upper()
+        return self.preview_limit is not None and self.row_count > self.preview_limit
 
-                    for func in SqlInfos.FUNCTIONS:
-                        if request[-len(func):] == func:
-                            in_func = True
-                            break
+class StepMonitor:
+    """
+    Count the instructions of the sqlite virtual machine of a connection,
+    with `set_progress_handler` (called every `period` instructions), and
+    stop the statement when it is over its limits (see `limit`).
+    """
 
-                    if in_func:
-                        ast_dict["request"] += e
-                        index_pos += 1
-                        continue
+    ATTACHED: dict[int, "StepMonitor"] = {} # id of the connection -> monitor, see `attach`.
 
-                    n_sub_request += 1
+    def __init__(self, connection: sql.Connection, period: int = 100) -> None:
+        """
+        init. (install the handler on `connection`.)
+        """
 
-                    ast_dict["request"] += f"(@{n_sub_request})"
-                    ast, index_pos, n_sub_request = _parse(
-                                                            element=element, 
-                                                            index_pos=index_pos,
-                                                            n_sub_request=n_sub_request
-                                                          )
-                    ast_dict["sub-request"].append(ast)
-                    index_pos += 1
-                    continue
+        self.period = period
+        self.calls: int = 0
+
+        # limits of the running statement: deadline (perf_counter() time),
+        # max calls, VM budget; None when nothing is limited.
+        self.limits: tuple[float | None, int | None, int | None] | None = None
+        self.aborted: str | None = None # why the statement has been stopped.
 
-                if e == ")" and not is_values:
+        connection.set_progress_handler(self._tick, period)
 
-                    if in_func:
-                        ast_dict["request"] += e
-                        index_pos += 1
-                        in_func = False
-                        continue
-                    
-                    ast_dict = _separate_conditions(ast_dict=ast_dict)
-                    return ast_dict, index_pos, n_sub_request
+    def limit(self, timeout: float = None, vm_steps: int = None) -> tuple[float | None, int | None, int | None]:
+        """
+        Return the limits of `timeout` seconds and `vm_steps` VM instructions
+        from now (None for no limit), for `arm`.
+        """
 
-                ast_dict["request"] += e
-                index_pos += 1
+        deadline = perf_counter() + timeout if timeout is not None else None
+        max_calls = self.calls + vm_steps // self.period if vm_steps is not None else None
 
-            ast_dict = _separate_conditions(ast_dict=ast_dict)
-            return ast_dict, index_pos, n_sub_request
+        return deadline, max_calls, vm_steps
 
-        index_pos = -1
+    def arm(self, limits: tuple[float | None, int | None, int | None] | None) -> None:
+        """
+        Apply `limits` (from `limit`) until `disarm`.
+        """
 
-        return _parse(element, index_pos)[0]
+        self.limits = limits
+        self.aborted = None
 
-    def __getCommands(self, ast: dict[str, dict[str, dict | str] | str]) -> list[str]:
+    def disarm(self) -> None:
         """
-        traduct the dict to a executable list of sql commands.
+        Remove the limits (the other statements of the connection are free).
         """
 
-        def _tree_flattener(node, placeholder_map = None):
-            """
-            Yeah, seriously don't ask me how. \n
-            -- Kyle, 21:36 16/10/25
-            """
+        self.limits = None
 
-            if placeholder_map is None:
-                placeholder_map = {}
+    @classmethod
+    def attach(cls, connection: sql.Connection, period: int = 100) -> "StepMonitor":
+        """
+        Return the monitor of `connection`, created if needed (a connection
+        has only one progress handler, the shared ones have one monitor).
+        """
 
-            steps = []
+        monitor = cls.ATTACHED.get(id(connection))
 
-            for sub in node.get('sub-request', []):
-                steps.extend(_tree_flattener(sub, placeholder_map))
-        
-            req = node['request'].strip()
-            placeholder_map[node['name']] = req
-            steps.append([node["name"], req])
+        if monitor is None:
+            monitor = cls.ATTACHED[id(connection)] = cls(connection, period)
 
-            for cond in node.get('condition', []):
-                cond_expanded = cond
+        return monitor
 
+    @classmethod
+    def detach(cls, connection: sql.Connection) -> None:
+        """
+        Forget the monitor of `connection` (closed).
+        """
 
+        cls.ATTACHED.pop(id(connection), None)
 
-                steps.append([node["name"], f"{req} {cond_expanded.strip()}"])
+    def _tick(self) -> int:
+        self.calls += 1
 
-            return steps
-    
-        commands = _tree_flattener(ast)
-        request_commands: dict[str, str] = {}
-        clean_commands = []
-
-        idx_infos: str = ""
-        old_idx: str = ""
-        last_sub_req: str = ""
-        last_sub_pos: tuple = ()
-
-        for idx, command in commands:
-            if idx_infos != idx:
-                clean_commands.append("NEW_REQUEST")
-                idx_infos = idx
-
-            if old_idx != idx:
-                clean_commands.append("IDX_" + idx[1:])
-                old_idx = idx
-
-            a_idx = command.find("@")
-
-            while a_idx != -1:
-                key_el = "@"
-                idx_adder = a_idx + 1
-
-                while command[idx_adder] != ")":
-                    key_el += command[idx_adder]
-                    idx_adder += 1
-                
-                try:
-                    sub_com = request_commands[key_el]
-                except Exception as e:
-                    print(f"ERROR while running the {command} at {idx}, key = {key_el} !")
-                    exit()
+        if self.limits is None:
+            return 0
 
-                command = command[0:a_idx] + sub_com + command[idx_adder:]
-                last_sub_req = key_el[1:]
-                last_sub_pos = (str(a_idx), str(a_idx + len(sub_com)))
-                a_idx = command.find("@")
+        deadline, max_calls, vm_budget = self.limits
 
-            if last_sub_req != "":
-                clean_commands.append("SUB_REQ_" + last_sub_req)
-                last_sub_req = ""
+        if max_calls is not None and self.calls > max_calls:
+            self.aborted = f"more than {vm_budget} VM steps"
+            return 1
 
-            if last_sub_pos != ():
-                clean_commands.append("SUB_POS_" + "_".join(last_sub_pos))
-                last_sub_pos = ()
+        if deadline is not None and perf_counter() > deadline:
+            self.aborted = "timeout"
+            return 1
 
-            request_commands[idx] = command
-            clean_commands.append(command)
+        return 0 # 0 to continue.
 
-        return clean_commands
+    @property
+    def vm_steps(self) -> int:
+        """
+        Number of VM instructions since the creation (precision of `period`).
+        """
+
+        return self.calls * self.period
+
+class StepAborted(Exception):
+    """
+    A step stopped by the `ResourceGovernor` (the message is the reason).
+    """
+
+class ResourceGovernor:
+    """
+    Budgets of the steps (and of a whole run), for `DatabaseSystem`:
+    - `timeout`, `vm_steps`: seconds and VM instructions of a step,
+      `run_timeout`, `run_vm_steps`: of a run (see `start_run`), both
+      enforced by the progress handler (`StepMonitor`) every `period`
+      instructions.
+    - `max_rows`: rows fetched per step.
+    - `heap_limit`: bytes of the sqlite heap (`PRAGMA hard_heap_limit`,
+      for the whole process), `length_limit`: max length of a string or
+      blob (`Connection.setlimit`).
+
+    A step over its budget is stopped and reported as aborted, the other
+    steps go on.
+    """
 
-    def __run(self, commands: list[str]) -> None:
+    def __init__(self, timeout: float = None, vm_steps: int = None, max_rows: int = None,
+                 run_timeout: float = None, run_vm_steps: int = None, heap_limit: int = None,
+                 length_limit: int = None, period: int = 1000) -> None:
         """
-        Run the commands and show in the terminal.
+        init. (None for no limit.)
         """
 
-        old_command = None
-        request_idx = ""
-        idx_sub_req = ""
-        sub_req_pos = None
+        self.timeout = timeout
+        self.vm_steps = vm_steps
+        self.max_rows = max_rows
+        self.run_timeout = run_timeout
+        self.run_vm_steps = run_vm_steps
+        self.heap_limit = heap_limit
+        self.length_limit = length_limit
+        self.period = period
 
-        for command in commands:
+        self.run_deadline: float | None = None
+        self.run_vm_start: int = 0
 
-            if command == "NEW_REQUEST":
-                old_command = None
-                continue
+    def apply(self, connection: sql.Connection) -> None:
+        """
+        Set the heap and length limits on `connection`.
+        """
 
-            if command.startswith("IDX_"):
-                request_idx = command[4:]
-                continue
+        if self.heap_limit is not None:
+            connection.execute(f"PRAGMA hard_heap_limit = {int(self.heap_limit)}")
 
-            if command.startswith("SUB_REQ_"):
-                idx_sub_req = command[8:]
-                continue
+        if self.length_limit is not None:
+            if hasattr(connection, "setlimit"): # python 3.11+
+                connection.setlimit(sql.SQLITE_LIMIT_LENGTH, int(self.length_limit))
+            else:
+                warn("Connection.setlimit needs python 3.11+, the length limit is not set.")
 
-            if command.startswith("SUB_POS_"):
-                sub_req_pos = tuple([int(i) for i in command[8:].split("_")])
-                continue
+    def start_run(self, vm_steps: int = 0) -> None:
+        """
+        Start the budget of a run (`vm_steps`: VM instructions already counted).
+        """
 
-            print(f"FOR REQUEST {request_idx}: ", end="")
-            old_command = self.term.print_request(command, old_command, idx_sub_req, sub_req_pos,
-                                             13 + len(request_idx))
-            colums, result = self.my_db.execute(command=command)
-            self.term.print_table(result, colums)
+        self.run_deadline = perf_counter() + self.run_timeout if self.run_timeout is not None else None
+        self.run_vm_start = vm_steps
 
-    def run(self) -> None:
+    def step_limits(self, vm_steps: int = 0) -> tuple[float | None, int | None]:
         """
-        Run the sql command.
+        Return the timeout and the VM budget of the next step, within what is
+        left of the run (`vm_steps`: VM instructions counted until now).
         """
 
-        if self.commands == []:
-            warn("The Interpreter.command is empty ! Because it has received" \
-            " nothing to interpret first.")
-            return
+        timeout, budget = self.timeout, self.vm_steps
+
+        if self.run_deadline is not None:
+            left = max(0.0, self.run_deadline - perf_counter())
+            timeout = left if timeout is None else min(timeout, left)
+
+        if self.run_vm_steps is not None:
+            left = max(0, self.run_vm_steps - (vm_steps - self.run_vm_start))
+            budget = left if budget is None else min(budget, left)
 
-        self.__run(commands=self.commands)
+        return timeout, budget
 
-    def interpret(self, arg: str) -> None:
+    @staticmethod
+    def reason(error: Exception, monitor: StepMonitor | None) -> str | None:
         """
-        interpret a sql command.
+        Return why `error` comes from a limit, or None if it is a real error.
         """
 
-        if arg is None or arg == "":
-            warn("The variable arg from Interpreter.interpret is None or empty !")
-            return
+        if monitor is not None and monitor.aborted is not None:
+            return monitor.aborted
 
-        parsed_dict = self.__parse(arg)
-        commands = self.__getCommands(parsed_dict)
-        self.commands = commands
+        if isinstance(error, MemoryError):
+            return "heap limit"
+
+        if isinstance(error, sql.DataError) or "too big" in str(error):
+            return "length limit"
+
+        return None
+
+class ConnectionProfile:
+    """
+    The settings of a connection, see `File.PROFILES`:
+    - `mode`: of the URI, "rwc" (creates the database), "rw" or "ro",
+      and `immutable` (the file never changes, no locks).
+    - the pragmas `mmap_size`, `cache_size`, `temp_store` and `query_only`
+      (None to keep the default of sqlite).
+    - `warm_up`: bytes of the file read at the connection, to have the
+      pages in the cache (0 for none, -1 for the whole file), see
+      `DatabaseSystem.connect(warm_up=...)`.
+    - `shared`: one connection for all the `DatabaseSystem` of a path.
+    """
+
+    def __init__(self, mode: str = "rw", immutable: bool = False, mmap_size: int = None, cache_size: int = None,
+                 temp_store: str = None, query_only: bool = False, warm_up: int = 0, shared: bool = False) -> None:
+        """
+        init.
+        """
+
+        self.mode = mode
+        self.immutable = immutable
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.temp_store = temp_store
+        self.query_only = query_only
+        self.warm_up = warm_up
+        self.shared = shared
+
+    def uri(self, path: str) -> str:
+        """
+        Return the URI of `path` with the mode (and immutable).
+        """
+
+        return Path(path).resolve().as_uri() + f"?mode={self.mode}" + ("&immutable=1" if self.immutable else "")
+
+    def open(self, path: str, check_same_thread: bool = True, cached_statements: int = 128) -> sql.Connection:
+        """
+        Return a new connection to `path` with this profile (`cached_statements`:
+        size of the cache of compiled statements of the connection).
+        """
+
+        if path == ":memory:":
+            connection = sql.connect(path, check_same_thread=check_same_thread, cached_statements=cached_statements)
+        else:
+            connection = sql.connect(self.uri(path), uri=True, check_same_thread=check_same_thread,
+                                     cached_statements=cached_statements)
+
+        self.apply(connection)
+
+        return connection
+
+    def apply(self, connection: sql.Connection) -> None:
+        """
+        Set the pragmas of the profile on `connection`.
+        """
+
+        for pragma, value in (("mmap_size", self.mmap_size), ("cache_size", self.cache_size),
+                              ("temp_store", self.temp_store)):
+            if value is not None:
+                connection.execute(f"PRAGMA {pragma} = {value}")
+
+        if self.query_only: # also forbids the TEMP tables (materialize).
+            connection.execute("PRAGMA query_only = 1")
+
+    def warm(self, path: str, chunk_size: int = 1024 * 1024, warm_up: int = None) -> int:
+        """
+        Read the first `warm_up` (by default the one of the profile) bytes
+        of `path` (for the page cache of the system, used by mmap). return
+        the number of bytes read.
+        """
+
+        warm_up = self.warm_up if warm_up is None else warm_up
+
+        if not warm_up or path == ":memory:":
+            return 0
+
+        left = warm_up if warm_up > 0 else None
+        read = 0
+
+        with open(path, "rb") as file:
+            while left is None or read < left:
+                size = chunk_size if left is None else min(chunk_size, left - read)
+                block = file.read(size)
+
+                if not block:
+                    break
+
+                read += len(block)
+
+        return read
+
+class File:
+    """
+    A file system class (with sql system).
+    """
+
+    # name -> profile, see `register_profile`.
+    PROFILES: dict[str, ConnectionProfile] = {
+        "default": ConnectionProfile(mode="rw"),
+        "create": ConnectionProfile(mode="rwc"),
+        "readonly": ConnectionProfile(mode="ro", mmap_size=256 * 1024 * 1024, cache_size=-64 * 1024,
+                                      temp_store="MEMORY", shared=True),
+        "analytics-readonly": ConnectionProfile(mode="ro", immutable=True, mmap_size=1 << 40,
+                                                cache_size=-512 * 1024, temp_store="MEMORY", query_only=True,
+                                                shared=True),
+    }
+
+    # (path, profile) -> [connection, users], for the shared profiles.
+    SHARED: dict[tuple[str, Any], list] = {}
+    SHARED_LOCK = Lock()
+
+    def __init__(self) -> None:
+        """
+        init.
+        """
+    
+        self.mydb: sql.Connection = None
+        self.shared_key: tuple[str, Any] | None = None
+        self.path: str = None
+        self.profile: ConnectionProfile = None
+        self.check_same_thread: bool = True # False: the connection can be used by another thread.
+
+    @classmethod
+    def register_profile(cls, name: str, profile: ConnectionProfile) -> None:
+        """
+        Add (or replace) the connection profile `name`.
+        """
+
+        cls.PROFILES[name] = profile
+
+    def ConnectToDatabase(self, path: str = None, read_only: bool = False,
+                          profile: str | ConnectionProfile = None, cached_statements: int = 128,
+                          warm_up: int = None) -> None:
+        """
+        Connect to a sql table, with `profile` (a name of `PROFILES`, by
+        default "default", or "readonly" with `read_only`). The database is
+        created only with a "rwc" profile, as "create". (`cached_statements`:
+        see `ConnectionProfile.open`, a shared connection keeps the one of
+        its first user. `warm_up`: replaces the one of the profile.)
+        """
+
+        if path is None:
+            warn("path of File.ConnectToDatabase is None !")
+            return
+        
+        if path == "":
+            warn("path of File.ConnectToDatabase is empty !")
+            return
+
+        name = profile if not isinstance(profile, ConnectionProfile) else None
+
+        if name is not None or profile is None:
+            name = name or ("readonly" if read_only else "default")
+            profile = self.PROFILES.get(name)
+
+            if profile is None:
+                warn(f"Unknown connection profile {name!r} in File.ConnectToDatabase !")
+                return
+
+        if path != ":memory:" and "c" not in profile.mode and not Path(path).exists():
+            warn(f"The database {path!r} from File.ConnectToDatabase doesn't exist (use the \"create\" profile) !")
+            return
+
+        self.path = path
+        self.profile = profile
+
+        if not profile.shared or path == ":memory:":
+            self.mydb = profile.open(path, check_same_thread=self.check_same_thread, cached_statements=cached_statements)
+            profile.warm(path, warm_up=warm_up)
+            return
+
+        key = (str(Path(path).resolve()), name if name is not None else id(profile))
+
+        with self.SHARED_LOCK:
+            entry = self.SHARED.get(key)
+
+            if entry is None:
+                entry = self.SHARED[key] = [profile.open(path, check_same_thread=False,
+                                                         cached_statements=cached_statements), 0]
+                profile.warm(path, warm_up=warm_up)
+
+            entry[1] += 1
+
+        self.mydb = entry[0]
+        self.shared_key = key
+
+    def Unshare(self, cached_statements: int = 128) -> bool:
+        """
+        Use a connection of its own instead of a shared one, with the same
+        profile (the last user of a shared connection keeps it). return True
+        if the connection has changed.
+        """
+
+        if self.shared_key is None:
+            return False
+
+        with self.SHARED_LOCK:
+            entry = self.SHARED[self.shared_key]
+
+            if entry[1] == 1:
+                del self.SHARED[self.shared_key]
+                self.shared_key = None
+                return False
+
+            entry[1] -= 1
+
+        self.mydb = self.profile.open(self.path, check_same_thread=self.check_same_thread,
+                                      cached_statements=cached_statements)
+        self.shared_key = None
+
+        return True
+
+    def GetDatabase(self) -> sql.Connection | None:
+        """
+        return the Connection system. (return None if not connected.)
+        """
+
+        return self.mydb
+
+    def Close(self) -> None:
+        """
+        Close the connection (a shared one when its last user closes it).
+        """
+
+        if self.mydb is None:
+            return
+
+        if self.shared_key is not None:
+            with self.SHARED_LOCK:
+                entry = self.SHARED[self.shared_key]
+                entry[1] -= 1
+
+                if entry[1] > 0:
+                    self.mydb = None
+                    self.shared_key = None
+                    return
+
+                del self.SHARED[self.shared_key]
+
+        StepMonitor.detach(self.mydb)
+        SchemaCatalog.forget(self.mydb)
+        self.mydb.close()
+        self.mydb = None
+        self.shared_key = None
+    
+class ConnectionPool:
+    """
+    A pool of read only connections (`file:...?mode=ro`) to the same
+    database, usable from other threads.
+    """
+
+    def __init__(self, path: str, size: int = 4, functions: dict[str, tuple[int, Any]] = None,
+                 profile: ConnectionProfile = None, cached_statements: int = 128) -> None:
+        """
+        init. (`functions`: name -> (number of args, function) to create
+        on every connection, `profile`: its pragmas are used, in "ro" mode.)
+        """
+
+        self.path = path
+        self.size = size
+        self.connections: list[sql.Connection] = []
+        self.free: Queue = Queue()
+
+        settings = vars(profile) if profile is not None else {}
+        profile = ConnectionProfile(**{**settings, "mode": "ro", "warm_up": 0, "shared": False})
+
+        for _ in range(size):
+            connection = profile.open(path, check_same_thread=False, cached_statements=cached_statements)
+
+            for name, (n_args, func) in (functions or {}).items():
+                connection.create_function(name, n_args, func)
+
+            self.connections.append(connection)
+            self.free.put(connection)
+
+    def acquire(self) -> sql.Connection:
+        """
+        Return a free connection (wait for one if needed).
+        """
+
+        return self.free.get()
+
+    def release(self, connection: sql.Connection) -> None:
+        """
+        Give back a connection from `acquire`.
+        """
+
+        self.free.put(connection)
+
+    def close(self) -> None:
+        """
+        Close every connection.
+        """
+
+        for connection in self.connections:
+            connection.close()
+
+        self.connections = []
+
+class SchemaCatalog:
+    """
+    The schema of a connection: tables and views, their columns and
+    indexes, and the row estimates (`sqlite_stat1`). Built once, and again
+    only when `PRAGMA schema_version` changes (see `refresh`), so the
+    lookups need no query.
+
+    The names are keys in UPPER case.
+    """
+
+    CATALOGS: dict[int, "SchemaCatalog"] = {} # id of the connection -> catalog, see `of`.
+
+    def __init__(self, connection: sql.Connection) -> None:
+        """
+        init. (empty until `refresh`.)
+        """
+
+        self.connection = connection
+        self.version: int | None = None
+
+        self.tables: dict[str, str] = {} # UPPER name -> name, tables and views.
+        self.kinds: dict[str, str] = {} # UPPER name -> "table" or "view".
+        self.columns: dict[str, dict[str, str]] = {} # UPPER table -> UPPER column -> declared type.
+        self.indexes: dict[str, dict[str, list[str]]] = {} # UPPER table -> index -> UPPER columns.
+        self.first_columns: dict[str, set[str]] = {} # UPPER table -> first column of each index (and rowid).
+        self.stats: dict[str, int] = {} # UPPER table -> rows, from sqlite_stat1 or counted.
+
+    @classmethod
+    def of(cls, connection: sql.Connection) -> "SchemaCatalog":
+        """
+        Return the catalog of `connection`, up to date.
+        """
+
+        catalog = cls.CATALOGS.get(id(connection))
+
+        if catalog is None:
+            catalog = cls.CATALOGS[id(connection)] = cls(connection)
+
+        return catalog.refresh()
+
+    @classmethod
+    def forget(cls, connection: sql.Connection) -> None:
+        """
+        Forget the catalog of `connection` (closed).
+        """
+
+        cls.CATALOGS.pop(id(connection), None)
+
+    def refresh(self) -> "SchemaCatalog":
+        """
+        Rebuild the catalog if the schema has changed.
+        """
+
+        version = self.connection.execute("PRAGMA schema_version").fetchone()[0]
+
+        if version != self.version:
+            self.__build()
+            self.version = version
+
+        return self
+
+    def __build(self) -> None:
+        execute = self.connection.execute
+
+        self.tables, self.kinds, self.columns, self.indexes, self.first_columns, self.stats = {}, {}, {}, {}, {}, {}
+
+        for kind, name in execute("""SELECT type, name FROM sqlite_schema
+                                     WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'"""):
+            self.tables[name.upper()] = name
+            self.kinds[name.upper()] = kind
+            self.columns[name.upper()] = {}
+            self.indexes[name.upper()] = {}
+            self.first_columns[name.upper()] = set()
+
+        for table, column, column_type, pk in execute("""SELECT m.name, p.name, p.type, p.pk
+                                                         FROM sqlite_schema AS m, pragma_table_info(m.name) AS p
+                                                         WHERE m.type IN ('table', 'view')"""):
+            if table.upper() not in self.columns:
+                continue
+
+            self.columns[table.upper()][column.upper()] = column_type
+
+            if pk == 1 and column_type.upper() == "INTEGER": # INTEGER PRIMARY KEY, the rowid.
+                self.first_columns[table.upper()].add(column.upper())
+
+        for table, index, column in execute("""SELECT m.name, il.name, ii.name
+                                               FROM sqlite_schema AS m, pragma_index_list(m.name) AS il,
+                                                    pragma_index_info(il.name) AS ii
+                                               WHERE m.type = 'table' ORDER BY m.name, il.name, ii.seqno"""):
+            if table.upper() not in self.indexes or column is None: # expression index.
+                continue
+
+            columns = self.indexes[table.upper()].setdefault(index, [])
+
+            if not columns:
+                self.first_columns[table.upper()].add(column.upper())
+
+            columns.append(column.upper())
+
+        try:
+            for table, stat in execute("SELECT tbl, stat FROM sqlite_stat1"):
+                if stat:
+                    self.stats.setdefault(table.upper(), int(stat.split()[0]))
+        except sql.Error:
+            pass # no ANALYZE.
+
+    def table(self, name: str) -> str | None:
+        """
+        Return the name of the table (or view) `name`, or None.
+        """
+
+        return self.tables.get(name.strip('"`[]').upper())
+
+    def columns_of(self, table: str) -> set[str]:
+        """
+        Return the UPPER names of the columns of `table`.
+        """
+
+        return set(self.columns.get(table.upper(), ()))
+
+    def indexed_columns(self, table: str) -> set[str]:
+        """
+        Return the UPPER names of the first column of each index of `table`.
+        """
+
+        return self.first_columns.get(table.upper(), set())
+
+    def row_estimate(self, table: str) -> int:
+        """
+        Return the number of rows of `table` (sqlite_stat1, or max rowid or
+        count, computed once).
+        """
+
+        key = table.upper()
+
+        if key in self.stats:
+            return self.stats[key]
+
+        count = None
+
+        for query in (f'SELECT MAX(rowid) FROM main."{table}"', f'SELECT COUNT(*) FROM main."{table}"'):
+            if count is not None:
+                break
+            try:
+                count = self.connection.execute(query).fetchone()[0] or 0
+            except sql.Error:
+                pass # WITHOUT ROWID table, or a view.
+
+        self.stats[key] = count or 0
+
+        return self.stats[key]
+
+class StatementTicket:
+    """
+    The connection running a submitted statement, to interrupt it.
+
+    A statement shared by several callers (see `DatabaseSystem.submit`) has
+    one ticket counting them, it is interrupted when the last one cancels.
+    """
+
+    __slots__ = ("connection", "cancelled", "lock", "waiters", "target")
+
+    def __init__(self) -> None:
+        """
+        init.
+        """
+
+        self.connection: sql.Connection = None
+        self.cancelled = False
+        self.lock = Lock()
+        self.waiters = 1 # callers waiting for the statement.
+        self.target: StatementTicket = self # the ticket of the statement (another one when shared).
+
+    def join(self, ticket: "StatementTicket | None") -> None:
+        """
+        One more caller waits for the statement of this ticket (`ticket`:
+        its own ticket, None if it can't cancel).
+        """
+
+        with self.lock:
+            self.waiters += 1
+
+        if ticket is not None:
+            ticket.target = self
+
+    def attach(self, connection: sql.Connection) -> bool:
+        """
+        The statement starts on `connection`. return False if cancelled.
+        """
+
+        with self.lock:
+            if self.cancelled:
+                return False
+
+            self.connection = connection
+            return True
+
+    def detach(self) -> None:
+        """
+        The statement is done, its connection goes back to the pool.
+        """
+
+        with self.lock:
+            self.connection = None
+
+    def interrupt(self) -> None:
+        """
+        Cancel the statement: interrupt it if it runs (`Connection.interrupt`)
+        and no other caller waits for it.
+        """
+
+        target = self.target
+
+        with target.lock:
+            if target.cancelled:
+                return
+
+            target.waiters -= 1
+
+            if target.waiters > 0:
+                return
+
+            target.cancelled = True
+
+            if target.connection is not None:
+                target.connection.interrupt()
+
+class DatabaseSystem:
+    """
+    Database Connection system.
+    """
+
+    def __init__(self, cache_rows: int = 100_000, cache_bytes: int = 64 * 1024 * 1024,
+                 preview_limit: int = None, fetch_size: int = 1000, cached_statements: int = 128):
+        """
+        init. (`cache_rows` or `cache_bytes` to 0 disable the result cache.)
+
+        `preview_limit`: max number of rows shown per step (None for all),
+        `fetch_size`: number of rows pulled at once from the cursor,
+        `cached_statements`: compiled statements kept by each connection
+        (a parameterized request is compiled once).
+        """
+
+        self.mydb: sql.Connection = None # db Connection instance
+        self.cursor: sql.Cursor   = None # directly to db for command.
+        self.command: sql.Cursor  = None # Cursor instance of the last command.
+        self.last_result: tuple   = None # last result: colums, result
+        self.last_cache_hit: bool | None = None # None if the cache was not used.
+        self.temp_changes: int = 0 # changes in the TEMP tables of the interpreter.
+
+        self.preview_limit = preview_limit
+        self.fetch_size = fetch_size
+
+        # read only connections for the parallel steps.
+        self.path: str = None
+        self.profile: ConnectionProfile = None
+        self.pool: ConnectionPool = None
+        self.executor: ThreadPoolExecutor = None
+        # normalized command -> Future and ticket of the running statements, for `submit`.
+        self.running: dict[str, tuple[Future, StatementTicket | None]] = {}
+
+        # profiling: VM instructions and statements of each connection (by id).
+        self.monitor_period: int = 0
+        self.monitors: dict[int, StepMonitor] = {}
+        self.cached_statements: int = cached_statements # size of the statements cache of sqlite3.
+        self.statements: dict[int, OrderedDict[str, None]] = {}
+
+        # budgets of the steps, see `set_governor`.
+        self.governor: ResourceGovernor = None
+
+        # results of the steps.
+        self.cache = ResultCache(max_rows=cache_rows, max_bytes=cache_bytes)
+
+        # File instance.
+        self.classFile = File()
+
+    def __call_func(self, *arg):
+        """
+        Create an internal sql function for the interpreter.
+        for the interpreter to get some infos from the og request.
+        """
+        from base64 import b64decode
+
+        return b64decode(b'TWFkZSBieSBLeWxlQ2llIChnaXRodWIgYWNjb3VudCku').decode("ascii")
+
+    def connect(self, path: str = None, read_only: bool = False, profile: str | ConnectionProfile = None,
+                warm_up: int = None) -> None:
+        """
+        Connect to the sql database from `path`, with the connection
+        `profile` (see `File.PROFILES`, the pool uses its pragmas too).
+        `warm_up`: bytes of the file read first (-1 for all), instead of
+        the ones of the profile.
+        """
+
+        self.classFile.ConnectToDatabase(path=path, read_only=read_only, profile=profile,
+                                         cached_statements=self.cached_statements, warm_up=warm_up)
+        self.mydb = self.classFile.GetDatabase()
+
+        if isinstance(profile, str):
+            profile = File.PROFILES.get(profile)
+
+        self.profile = profile
+
+        if self.mydb is not None: # init for command.
+            self.path = path
+            self.mydb.create_function("credits", 0, self.__call_func)
+            self.cursor = self.mydb.cursor()
+
+    def open_pool(self, size: int = 4) -> bool:
+        """
+        Open a pool of `size` read only connections and threads, for
+        `submit`. return False if the database can't have one (in memory).
+        """
+
+        if self.pool is not None and self.pool.size == size:
+            return True
+
+        self.close_pool()
+
+        if self.path is None or self.path == ":memory:" or not Path(self.path).exists():
+            warn("DatabaseSystem.open_pool needs a database file, the steps will run one by one.")
+            return False
+
+        self.pool = ConnectionPool(self.path, size, functions={"credits": (0, self.__call_func)},
+                                   profile=self.profile, cached_statements=self.cached_statements)
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sqlviewer")
+
+        if self.monitor_period:
+            self.enable_monitor(self.monitor_period)
+
+        if self.governor is not None:
+            for connection in self.pool.connections:
+                self.governor.apply(connection)
+
+        return True
+
+    def close_pool(self) -> None:
+        """
+        Close the pool of read only connections.
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        if self.pool is not None:
+            for connection in self.pool.connections:
+                self.monitors.pop(id(connection), None)
+                self.statements.pop(id(connection), None)
+                StepMonitor.detach(connection)
+
+            self.pool.close()
+            self.pool = None
+
+    def enable_monitor(self, period: int = 100) -> None:
+        """
+        Count the VM instructions of the steps (on every connection).
+        """
+
+        self.monitor_period = period
+        connections = [self.mydb] + (self.pool.connections if self.pool is not None else [])
+
+        for connection in connections:
+            if id(connection) not in self.monitors:
+                self.monitors[id(connection)] = StepMonitor.attach(connection, period)
+
+    def set_governor(self, governor: ResourceGovernor | None) -> None:
+        """
+        Enforce the budgets of `governor` on every step (None to remove them).
+        """
+
+        self.governor = governor
+
+        if governor is None:
+            return
+
+        if not self.monitor_period:
+            self.enable_monitor(governor.period)
+
+        for connection in [self.mydb] + (self.pool.connections if self.pool is not None else []):
+            governor.apply(connection)
+
+    def start_run(self) -> None:
+        """
+        Start the run budget of the governor (if any).
+        """
+
+        if self.governor is not None:
+            self.governor.start_run(sum(monitor.vm_steps for monitor in self.monitors.values()))
+
+    def __govern(self, connection: sql.Connection) -> tuple[StepMonitor | None, tuple | None]:
+        """
+        Return the monitor of `connection` and the limits of the next step.
+        """
+
+        monitor = self.monitors.get(id(connection))
+
+        if self.governor is None or monitor is None:
+            return monitor, None
+
+        vm_steps = sum(monitor.vm_steps for monitor in self.monitors.values())
+        return monitor, monitor.limit(*self.governor.step_limits(vm_steps))
+
+    def __run_statement(self, cursor: sql.Cursor | sql.Connection, command: str,
+                        monitor: StepMonitor | None, limits: tuple | None, params: Any = None,
+                        many: bool = False) -> sql.Cursor:
+        """
+        Execute `command` (with the bound `params`, or each row of `params`
+        with `many`) within `limits`, raise `StepAborted` if it goes over a
+        budget.
+        """
+
+        if limits is not None:
+            monitor.arm(limits)
+
+        try:
+            if many:
+                return cursor.executemany(command, params)
+            return cursor.execute(command, () if params is None else params)
+        except (sql.Error, MemoryError) as e:
+            reason = ResourceGovernor.reason(e, monitor) if self.governor is not None else None
+
+            if reason is None:
+                raise
+            raise StepAborted(reason) from e
+        finally:
+            if limits is not None:
+                monitor.disarm()
+
+    def __statement_hit(self, connection: sql.Connection, command: str) -> bool:
+        """
+        Follow the statements cache (LRU) of `connection`, return True if
+        `command` is already compiled in it.
+        """
+
+        statements = self.statements.setdefault(id(connection), OrderedDict())
+        hit = command in statements
+        statements[command] = None
+        statements.move_to_end(command)
+
+        if len(statements) > self.cached_statements:
+            statements.popitem(last=False)
+
+        return hit
+
+    def close(self) -> None:
+        """
+        Disconnect from the sql database.
+        """
+
+        self.close_pool()
+        self.cursor.close()
+        self.monitors.pop(id(self.mydb), None)
+        self.statements.pop(id(self.mydb), None)
+        self.classFile.Close()
+        self.mydb = None
+
+    def data_version(self) -> tuple[int, int]:
+        """
+        Return the version of the data: `PRAGMA data_version` (changes from
+        other connections) and the `total_changes` of this connection.
+        """
+
+        return self.mydb.execute("PRAGMA data_version").fetchone()[0], self.mydb.total_changes - self.temp_changes
+
+    def __private(self) -> None:
+        """
+        Leave a shared connection for one of its own, before writing TEMP
+        tables: on a shared one, they would be seen by the other users (or
+        collide with theirs) and change their `total_changes`.
+        """
+
+        shared = self.mydb
+
+        if not self.classFile.Unshare(self.cached_statements):
+            return
+
+        self.monitors.pop(id(shared), None)
+        self.statements.pop(id(shared), None)
+        self.cursor.close()
+
+        self.mydb = self.classFile.GetDatabase()
+        self.mydb.create_function("credits", 0, self.__call_func)
+        self.cursor = self.mydb.cursor()
+        self.temp_changes = 0
+
+        if self.monitor_period:
+            self.enable_monitor(self.monitor_period)
+
+        if self.governor is not None:
+            self.governor.apply(self.mydb)
+
+    def materialize(self, table: str, command: str, params: Any = None) -> None:
+        """
+        Create (or replace) the TEMP table `table` with the result of `command`
+        (and its bound `params`), on a connection of its own (see `__private`).
+        """
+
+        self.__private()
+        changes = self.mydb.total_changes
+        monitor, limits = self.__govern(self.mydb)
+
+        self.cursor.execute(f"DROP TABLE IF EXISTS temp.{table}")
+        self.__run_statement(self.cursor, f"CREATE TEMP TABLE {table} AS {command}", monitor, limits, params)
+
+        self.temp_changes += self.mydb.total_changes - changes
+
+    def shadow_sample(self, table: str, fraction: float = 0.01, cap: int = 10_000, method: str = "stride") -> int:
+        """
+        Create the TEMP table `table` with a sample of the table `table`: it
+        shadows it for the requests of this connection (the temp schema is
+        searched first), until `drop_temp`.
+
+        `method`: "stride" (every 1/`fraction` rowid) or "random", at most
+        `cap` rows. return the number of rows of the sample.
+        """
+
+        source = f'main."{table}"'
+        stride = f"SELECT * FROM {source} WHERE rowid % {max(1, round(1 / fraction))} = 0 LIMIT {int(cap)}"
+        randomly = f"SELECT * FROM {source} WHERE abs(random() % 1000000) < {int(fraction * 1_000_000)} LIMIT {int(cap)}"
+
+        try:
+            self.materialize(f'"{table}"', stride if method == "stride" else randomly)
+        except sql.OperationalError: # WITHOUT ROWID table.
+            self.materialize(f'"{table}"', randomly)
+
+        return self.mydb.execute(f'SELECT COUNT(*) FROM temp."{table}"').fetchone()[0]
+
+    def diff(self, before: str, after: str, cache_prefix: str = None, counts: tuple[int, int] = None,
+             params: dict[str, Any] = None) -> tuple[int, int, int, list[str], ResultStream]:
+        """
+        Compare the results of the commands `before` and `after` inside
+        sqlite (`EXCEPT` and `COUNT`), without fetching them.
+
+        return the number of rows of `before` and of `after`, the number of
+        distinct rows of `before` that are not in `after`, and the columns
+        and the stream of these rows (only the preview is fetched).
+        `cache_prefix`: added to the cache keys (sampled tables, ...).
+        `counts`: the rows of `before` and `after`, when already known.
+        `params`: bound by name in both commands.
+        """
+
+        removed = f"SELECT * FROM ({before}) EXCEPT SELECT * FROM ({after})"
+        count_params = params
+
+        if counts is None:
+            command = (f"SELECT (SELECT COUNT(*) FROM ({before})), (SELECT COUNT(*) FROM ({after})), "
+                       f"(SELECT COUNT(*) FROM ({removed}))")
+        else: # bound, the statement is compiled once.
+            command = f"SELECT :_rows_before, :_rows_after, (SELECT COUNT(*) FROM ({removed}))"
+            count_params = {**(params or {}), "_rows_before": counts[0], "_rows_after": counts[1]}
+
+        prefix = "" if cache_prefix is None else f"{cache_prefix} "
+
+        _, result = self.execute(command, cache_key=prefix + command, params=count_params)
+        row = list(result)[0]
+
+        if result.aborted is not None:
+            raise StepAborted(result.aborted)
+
+        columns, rows = self.execute(removed, cache_key=prefix + removed, params=params)
+
+        return row[0], row[1], row[2], columns, rows
+
+    def drop_temp(self, table: str) -> None:
+        """
+        Drop the TEMP table `table`.
+        """
+
+        changes = self.mydb.total_changes
+        self.cursor.execute(f"DROP TABLE IF EXISTS temp.{table}")
+        self.temp_changes += self.mydb.total_changes - changes
+
+    def execute(self, command: str = None, use_cache: bool = True, cache_key: str = None,
+                preview_limit: int = None, keep_rows: int = 0, params: Any = None) -> tuple[list[str | Any], ResultStream]:
+        """
+        Execute the sql command from `command`.
+
+        return the columns names (from the result), `list[str | Any]`,
+        and the command result, a `ResultStream` (lazy, the rows are
+        fetched when iterated). `preview_limit` replaces the default one.
+
+        When `use_cache` is True, the result of a read only command is
+        taken from / added to the result cache, under `cache_key` (a sql
+        command with the same result) or `command`. `keep_rows`: the rows
+        are kept in the result (`rows`) up to that number, even without
+        the cache. `params`: the bound parameters (`?` or `:name`), the
+        command is compiled once for all their values.
+        """
+
+        self.last_cache_hit = None
+        key = None
+
+        if preview_limit is None:
+            preview_limit = self.preview_limit
+
+        if use_cache and self.cache.enabled:
+            self.cache.check_version(self.data_version())
+            key = ResultCache.normalize(command if cache_key is None else cache_key) + self.__params_key(params)
+            cached = self.cache.get(key)
+            self.last_cache_hit = cached is not None
+
+            if cached is not None:
+                columns, rows = cached
+                self.last_result = (columns, ResultStream(columns, rows=rows, preview_limit=preview_limit,
+                                                          fetch_size=self.fetch_size))
+                self.last_result[1].cache_hit = True
+                return self.last_result
+
+        changes = self.mydb.total_changes
+        statement_hit = self.__statement_hit(self.mydb, command)
+        monitor, limits = self.__govern(self.mydb)
+        vm_start = monitor.vm_steps if monitor is not None else 0
+
+        start = perf_counter()
+        self.command = self.mydb.cursor() # one cursor per result, they are read lazily.
+        self.__run_statement(self.command, command, monitor, limits, params) # can't do sql=command.
+        exec_time = perf_counter() - start
+
+        columns = [desc[0] for desc in self.command.description] if self.command.description else []
+        keep_limit = 0
+        on_done = None
+
+        if key is not None:
+            if self.mydb.total_changes == changes and self.command.description:
+                keep_limit = self.cache.max_rows
+                on_done = lambda stream: self.cache.put(key, stream.columns, stream.rows)
+            else:
+                self.cache.check_version(self.data_version()) # a write, old results are wrong.
+
+        max_rows = self.governor.max_rows if self.governor is not None else None
+        self.last_result = (columns, ResultStream(columns, cursor=self.command, preview_limit=preview_limit,
+                                                  fetch_size=self.fetch_size, keep_limit=max(keep_limit, keep_rows),
+                                                  on_done=on_done, max_rows=max_rows))
+        result = self.last_result[1]
+        result.governor = self.governor
+        result.limits = limits
+        result.cache_hit = self.last_cache_hit
+        result.exec_time = exec_time
+        result.statement_hit = statement_hit
+        result.monitor = monitor
+        result.vm_start = vm_start
+
+        return self.last_result
+
+    def execute_many(self, command: str, rows: list[tuple]) -> tuple[list[str], ResultStream]:
+        """
+        Execute the prepared `command` once per row of `rows` (`executemany`,
+        the statement is compiled once), in one transaction.
+
+        return no columns and an empty `ResultStream`, its `changes` is
+        the number of rows changed.
+        """
+
+        changes = self.mydb.total_changes
+        statement_hit = self.__statement_hit(self.mydb, command)
+        monitor, limits = self.__govern(self.mydb)
+        vm_start = monitor.vm_steps if monitor is not None else 0
+
+        start = perf_counter()
+
+        with self.mydb: # commit, or rollback on an error.
+            self.__run_statement(self.cursor, command, monitor, limits, rows, many=True)
+
+        exec_time = perf_counter() - start
+        self.cache.check_version(self.data_version()) # a write, old results are wrong.
+
+        result = ResultStream([], rows=[], preview_limit=self.preview_limit, fetch_size=self.fetch_size)
+        result.exec_time = exec_time
+        result.statement_hit = statement_hit
+        result.vm_steps = monitor.vm_steps - vm_start if monitor is not None else 0
+        result.changes = self.mydb.total_changes - changes
+
+        self.last_result = ([], result)
+
+        return self.last_result
+
+    @staticmethod
+    def __params_key(params: Any) -> str:
+        """
+        Return the part of a cache key for the bound `params`.
+        """
+
+        if not params:
+            return ""
+
+        return " " + repr(sorted(params.items()) if isinstance(params, dict) else list(params))
+
+    def submit(self, command: str, cache_key: str = None, preview_limit: int = None,
+               ticket: StatementTicket = None, params: Any = None) -> Future:
+        """
+        Execute the read only `command` on the pool (see `open_pool`), with
+        the bound `params`.
+
+        return a Future of the columns names and of a `ResultStream` with
+        the preview rows already fetched, and the real row count.
+        `ticket.interrupt()` stops the statement (a statement shared with
+        the same command still running stops when all its callers cancel).
+        """
+
+        if preview_limit is None:
+            preview_limit = self.preview_limit
+
+        key = None
+
+        if self.cache.enabled: # the cache is checked here, data_version needs this thread.
+            self.cache.check_version(self.data_version())
+            key = ResultCache.normalize(command if cache_key is None else cache_key) + self.__params_key(params)
+
+            running = self.running.get(key)
+
+            if running is not None and running[1] is not None and running[1].cancelled:
+                running = None # being interrupted, run it again.
+
+            if running is not None: # same command already submitted, share its result.
+                with self.cache.lock:
+                    self.cache.hits += 1
+
+                if running[1] is not None:
+                    running[1].join(ticket)
+
+                return self.__shared(running[0])
+
+            cached = self.cache.get(key)
+
+            if cached is not None:
+                columns, rows = cached
+                result = ResultStream(columns, rows=rows, preview_limit=preview_limit, fetch_size=self.fetch_size)
+                result.cache_hit = True
+
+                future = Future()
+                future.set_result((columns, result))
+                return future
+
+        future = self.executor.submit(self.__fetch, command, key, preview_limit, ticket, params)
+
+        if key is not None:
+            self.running[key] = (future, ticket)
+
+            def _done(done: Future) -> None:
+                if self.running.get(key, (None,))[0] is done: # not another run of it.
+                    self.running.pop(key, None)
+
+            future.add_done_callback(_done)
+
+        return future
+
+    @staticmethod
+    def __shared(original: Future) -> Future:
+        """
+        A Future with a copy of the result of `original` (marked as a cache hit).
+        """
+
+        future = Future()
+
+        def _copy(done: Future) -> None:
+            if done.exception() is not None:
+                future.set_exception(done.exception())
+                return
+
+            columns, result = done.result()
+            copy = ResultStream(columns, rows=result.rows, preview_limit=result.preview_limit,
+                                fetch_size=result.fetch_size, row_count=result.total)
+            copy.cache_hit = True
+            future.set_result((columns, copy))
+
+        original.add_done_callback(_copy)
+
+        return future
+
+    def __fetch(self, command: str, key: str | None, preview_limit: int | None,
+                ticket: StatementTicket = None, params: Any = None) -> tuple[list[str], ResultStream]:
+        """
+        Run `command` on a connection of the pool (in a thread of the pool).
+        """
+
+        connection = self.pool.acquire()
+
+        try:
+            if ticket is not None and not ticket.attach(connection):
+                raise sql.OperationalError("interrupted")
+
+            statement_hit = self.__statement_hit(connection, command)
+            monitor, limits = self.__govern(connection)
+            vm_start = monitor.vm_steps if monitor is not None else 0
+
+            start = perf_counter()
+            cursor = self.__run_statement(connection, command, monitor, limits, params)
+            exec_time = perf_counter() - start
+
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+
+            stream = ResultStream(columns, cursor=cursor, preview_limit=preview_limit, fetch_size=self.fetch_size,
+                                  keep_limit=self.cache.max_rows if key is not None else 0,
+                                  max_rows=self.governor.max_rows if self.governor is not None else None)
+            stream.governor = self.governor
+            stream.limits = limits
+            stream.monitor = monitor
+            stream.vm_start = vm_start
+
+            preview = [row for chunk in stream.chunks() for row in chunk]
+            row_count = stream.row_count
+
+            if key is not None and stream.keep_limit and stream.aborted is None:
+                self.cache.put(key, columns, stream.rows)
+        finally:
+            if ticket is not None:
+                ticket.detach()
+
+            self.pool.release(connection)
+
+        result = ResultStream(columns, rows=preview, preview_limit=preview_limit, fetch_size=self.fetch_size,
+                              row_count=row_count)
+        result.cache_hit = False if key is not None else None
+        result.exec_time = exec_time
+        result.fetch_time = stream.fetch_time
+        result.statement_hit = statement_hit
+        result.vm_steps = stream.vm_steps
+        result.aborted = stream.aborted
+
+        return columns, result
+
+    def last_result(self) -> tuple[list[str | Any], Any | list[Any]]:
+        """
+        Return the last result of a command.
+        """
+
+        return self.last_result
+
+    def catalog(self) -> SchemaCatalog:
+        """
+        Return the schema catalog of the connection (up to date).
+        """
+
+        return SchemaCatalog.of(self.mydb)
+
+    def get_raw_tables(self) -> tuple | list[tuple]:
+        """
+        Return the raw values of the table's names in the database.
+        """
+
+        catalog = self.catalog()
+
+        return [(name,) for key, name in catalog.tables.items() if catalog.kinds[key] == "table"]
+
+    def get_tables(self) -> list[str]:
+        """
+        Return a usable list of the table's names.
+        """
+
+        raw_data: list[tuple[str]] = self.get_raw_tables()
+        data = [element[0] for element in raw_data]
+
+        return data
+
+class AsyncDatabaseSystem(DatabaseSystem):
+    """
+    A `DatabaseSystem` for asyncio: the statements run on the pool of read
+    only connections (see `open_pool`), the event loop only waits for them.
+    Without a pool (in memory), they run one by one on a thread of their
+    own, with the main connection.
+    """
+
+    def __init__(self, workers: int = 4, **options: Any) -> None:
+        """
+        init. (`workers`: size of the pool, `options`: see `DatabaseSystem`.)
+        """
+
+        super().__init__(**options)
+        self.workers = workers
+        self.classFile.check_same_thread = False # used by `serial` too.
+        self.serial: ThreadPoolExecutor | None = None # the thread of the statements without a pool.
+
+    def connect(self, path: str = None, read_only: bool = False, profile: str | ConnectionProfile = None,
+                warm_up: int = None) -> None:
+        """
+        Connect to the sql database from `path`, and open the pool (see
+        `DatabaseSystem.connect` for `profile` and `warm_up`).
+        """
+
+        super().connect(path, read_only, profile, warm_up)
+
+        if self.mydb is not None:
+            self.open_pool(self.workers)
+
+    def close(self) -> None:
+        """
+        Disconnect from the sql database (after the statements running).
+        """
+
+        if self.serial is not None:
+            self.serial.shutdown(wait=True)
+            self.serial = None
+
+        super().close()
+
+    async def execute_async(self, command: str, cache_key: str = None, preview_limit: int = None,
+                            params: Any = None) -> tuple[list[str], ResultStream]:
+        """
+        Execute the read only `command` on the pool, see `submit`.
+
+        When the task is cancelled, the running statement is interrupted
+        (`Connection.interrupt`).
+        """
+
+        if self.pool is None: # in memory, no pool: on the serial thread, the loop goes on.
+            if self.serial is None:
+                self.serial = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlviewer-serial")
+
+            def _execute() -> tuple[list[str], ResultStream]: # fetched on the thread, as `submit`.
+                columns, stream = self.execute(command, cache_key=cache_key, preview_limit=preview_limit,
+                                               params=params)
+                preview = [row for chunk in stream.chunks() for row in chunk]
+
+                result = ResultStream(columns, rows=preview, preview_limit=stream.preview_limit,
+                                      fetch_size=self.fetch_size, row_count=stream.row_count)
+                result.cache_hit = stream.cache_hit
+                result.exec_time = stream.exec_time
+                result.fetch_time = stream.fetch_time
+                result.statement_hit = stream.statement_hit
+                result.vm_steps = stream.vm_steps
+                result.aborted = stream.aborted
+
+                return columns, result
+
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self.serial, _execute)
+            except asyncio.CancelledError:
+                self.mydb.interrupt()
+                raise
+
+        ticket = StatementTicket()
+        future = self.submit(command, cache_key, preview_limit, ticket, params)
+
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            ticket.interrupt()
+            raise
+
+class Terminal:
+    """
+    A class for cool printing in the terminal.
+    """
+
+    HIGHLIGHTS_SIZE: int = 1024 # highlighted parts of requests kept.
+
+    def __init__(self, out: Any = None, buffer_size: int = 64 * 1024, colors: bool = None) -> None:
+        """
+        init. (`out`: the file to write in, stdout by default, `colors`:
+        by default only when `out` is a TTY.)
+        """
+
+        self.out = stdout if out is None else out
+        self.buffer_size = buffer_size
+        self.catalog: SchemaCatalog = None # set by the interpreter, for the table names.
+
+        # highlighted parts of the requests: text -> (cleaned, colored), for the catalog `highlights_version`.
+        self.highlights: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self.highlights_version: tuple | None = None
+        self.last_request: str = None # the last request printed.
+
+        if colors is None:
+            isatty = getattr(self.out, "isatty", None)
+            colors = isatty is not None and isatty()
+
+        self.WHITE  = "\033[97m" if colors else ""
+        self.BLUE = "\033[96m" if colors else ""
+        self.PURPLE = "\033[95m" if colors else ""
+        self.GREEN = "\033[92m" if colors else ""
+        self.YELLOW = "\033[93m" if colors else ""
+        self.RESET = "\033[0m" if colors else ""
+
+    def print_table(self, values: list[tuple[Any, ...]] | ResultStream, head: list[str] = None,
+                    chunk_size: int = 1000, width_rows: int = None) -> None:
+        """
+        Print a table from the values and a header.
+
+        Column by column: each value is converted once, and the width of a
+        column is computed in one pass over the first `width_rows` rows
+        (default: all the rows of a list, the first `chunk_size` rows of a
+        `ResultStream`, a wider value after them is not aligned). The rows
+        are rendered by chunks of `chunk_size` rows and written by blocks of
+        `buffer_size` chars.
+        """
+
+        if isinstance(values, ResultStream):
+            chunks = values.chunks()
+        elif values is not None:
+            chunks = (values[idx:idx + chunk_size] for idx in range(0, len(values), chunk_size))
+        else:
+            chunks = iter(())
+
+        if width_rows is None:
+            width_rows = chunk_size if isinstance(values, ResultStream) or values is None else len(values)
+
+        first: list[tuple] = []
+
+        for chunk in chunks: # the rows used for the widths.
+            first.extend(chunk)
+            if len(first) >= width_rows:
+                break
+
+        if first == []:
+            warn("The variable values from Terminal.print_table is None !")
+            return
+
+        if head is None or head == []:
+            warn("The variable head from Terminal.print_table is None !")
+            return
+
+        columns: list[list[str]] = [list(map(str, column)) for column in zip(*first)]
+        max_lens: list[int] = [max(len(str(h)), max(map(len, column))) for h, column in zip(head, columns)]
+
+        header = " | ".join(str(h).rjust(width) for h, width in zip(head, max_lens))
+        separation = "-" * len(header)
+        row_sep = "\n" + separation + "\n"
+
+        out = self.out
+        buffer: list[str] = [header, "\n", separation, "\n"]
+        buffered = len(header) * 2 + 2
+
+        def _render(str_columns: list[list[str]]) -> str:
+            padded = [[value.rjust(width) for value in column] for column, width in zip(str_columns, max_lens)]
+            return row_sep.join(map(" | ".join, zip(*padded)))
+
+        current = columns
+
+        while True:
+            chunk = next(chunks, None)
+            text = _render(current)
+
+            buffer.append(text)
+            buffered += len(text)
+
+            if chunk is None:
+                break
+
+            buffer.append(row_sep)
+            buffered += len(row_sep)
+
+            if buffered >= self.buffer_size:
+                out.write("".join(buffer))
+                buffer = []
+                buffered = 0
+
+            current = [list(map(str, column)) for column in zip(*chunk)]
+
+        buffer.append("\n\n")
+        out.write("".join(buffer))
+
+    def print_info(self, text: str) -> None:
+        """
+        Print an information line (in yellow).
+        """
+
+        self.out.write(self.YELLOW + text + self.RESET + "\n")
+
+    def print_profile(self, profile: dict[str, Any], sql_width: int = 60) -> None:
+        """
+        Print the steps of a profile (see `Interpreter.run`), slowest first.
+        """
+
+        def _ms(value: float) -> str:
+            return f"{value * 1000:.3f}"
+
+        steps = sorted(profile["steps"], key=lambda record: record["total"], reverse=True)
+        rows = []
+
+        for rank, record in enumerate(steps, 1):
+            request_sql = " ".join(record["sql"].split())
+
+            if len(request_sql) > sql_width:
+                request_sql = request_sql[:sql_width - 3] + "..."
+
+            rows.append((rank, record["step"], record["request"], _ms(record["total"]), _ms(record["execute"]),
+                         _ms(record["fetch"]), _ms(record["render"]), _ms(record["diff"]), record["rows"],
+                         record["vm_steps"], record["statement_cache_hit"], record["result_cache_hit"],
+                         record.get("aborted") or "", request_sql))
+
+        plan = "cached plan" if profile.get("plan_cached") else f"flatten {_ms(profile.get('flatten', 0.0))} ms"
+        self.print_info(f"PROFILE: parse {_ms(profile.get('parse', 0.0))} ms, {plan}, "
+                        f"{len(steps)} step(s), {_ms(sum(r['total'] for r in steps))} ms.")
+        self.print_table(rows, ["rank", "step", "request", "total ms", "execute ms", "fetch ms", "render ms",
+                                "diff ms", "rows", "vm steps", "stmt cache", "result cache", "aborted", "sql"])
+
+    def print_plan(self, explained: dict[str, list[str]]) -> None:
+        """
+        Print a plan from `Explainer.explain`, with its flags and suggestions.
+        """
+
+        lines = [self.BLUE + line + self.RESET for line in explained["tree"]]
+        lines += [self.YELLOW + "! " + flag + self.RESET for flag in explained["flags"]]
+        lines += [self.GREEN + "+ " + suggestion + self.RESET for suggestion in explained["suggestions"]]
+
+        self.out.write("\n".join(lines) + "\n\n")
+
+    def __highlight(self, text: str) -> tuple[str, str]:
+        """
+        Return the request `text` cleaned (its tokens separated by one
+        space) and colored, see `print_request`. Memoized: a step shows
+        the text of its sub-requests and of the step before it again.
+        """
+
+        version = (id(self.catalog), self.catalog.version) if self.catalog is not None else None
+
+        if version != self.highlights_version: # other tables.
+            self.highlights.clear()
+            self.highlights_version = version
+
+        done = self.highlights.get(text)
+
+        if done is not None:
+            self.highlights.move_to_end(text)
+            return done
+
+        tokens = [token for token in Tokenizer.tokenize(text) if token[0] != "semicolon"]
+        n_tokens = len(tokens)
+        cleaned: list[str] = []
+        colored: list[str] = []
+        next_is_table = False # flag to color table names in green (without catalog).
+        tables: set[str] = set() # UPPER tables and aliases (with catalog).
+
+        if self.catalog is not None:
+            tables = set(self.catalog.tables)
+            tables.update(alias for alias, table in Explainer.table_aliases(text).items()
+                          if self.catalog.table(table) is not None)
+
+        for t_idx, (kind, start, end) in enumerate(tokens):
+            word = text[start:end]
+            upper = word.upper()
+            dot = word == "." or (cleaned and cleaned[-1] == ".") # no spaces around a dot.
+            qualifier = t_idx + 1 < n_tokens and text[tokens[t_idx + 1][1]:tokens[t_idx + 1][2]] == "."
+
+            if kind == "word" and (upper in SqlInfos.WORDS or upper in SqlInfos.FUNCTIONS):
+                word, color = upper, self.BLUE
+                next_is_table = upper in {"FROM", "JOIN", "INTO", "UPDATE"}
+
+            elif kind in {"word", "quoted"} and (upper.strip('"`[]') in tables or (tables and qualifier)):
+                color = self.GREEN
+
+            elif next_is_table and not tables and kind in {"word", "quoted"}:
+                color = self.GREEN
+                next_is_table = False
+
+            elif kind in {"op", "lparen", "rparen", "comma", "number"}:
+                color = self.WHITE
+
+            else:
+                color = self.PURPLE
+                next_is_table = False
+
+            if cleaned and not dot:
+                cleaned.append(" ")
+                colored.append(" ")
+
+            cleaned.append(word)
+            colored.append(f"{color}{word}{self.RESET}")
+
+        done = self.highlights[text] = ("".join(cleaned), "".join(colored))
+
+        if len(self.highlights) > self.HIGHLIGHTS_SIZE:
+            self.highlights.popitem(last=False)
+
+        return done
+
+    def print_request(self, request: str, old_request: str = None, difference_request_name: str = None, request_name_pos: tuple = None, 
+                      old_req_adder: int = 0) -> str:
+        """
+        Print a SQL request with color highlighting:
+        - keywords, and functions in blue
+        - table names and their aliases in green (from `catalog` if set)
+        - values and constants in white
+        - others (columns, etc.) in purple
+
+        The part added since `old_request` (the request printed before)
+        is underlined, in yellow for the sub-request `difference_request_name`
+        at `request_name_pos` (offsets in `request`). The request is cut
+        there (and after the last request printed) in parts highlighted once,
+        only between two tokens not joined by a `.`.
+
+        return the "cleaned" request.
+        """
+
+        request = request.strip()
+        tokens = [token for token in Tokenizer.tokenize(request) if token[0] != "semicolon"]
+        starts = [start for _, start, _ in tokens]
+
+        def _boundary(offset: int) -> bool:
+            t_idx = bisect_left(starts, offset) # first token from `offset`.
+
+            if t_idx > 0 and tokens[t_idx - 1][2] > offset: # inside a token.
+                return False
+
+            before = request[tokens[t_idx - 1][1]:tokens[t_idx - 1][2]] if t_idx > 0 else None
+            after = request[tokens[t_idx][1]:tokens[t_idx][2]] if t_idx < len(tokens) else None
+            return before != "." and after != "."
+
+        cuts = {0, len(request)}
+
+        if self.last_request and request.startswith(self.last_request) and _boundary(len(self.last_request)):
+            cuts.add(len(self.last_request))
+
+        if request_name_pos is not None and 0 <= request_name_pos[0] <= request_name_pos[1] <= len(request) \
+           and _boundary(request_name_pos[0]) and _boundary(request_name_pos[1]):
+            cuts.update(request_name_pos)
+
+        cleaned: list[str] = []
+        colored: list[str] = []
+        spans: dict[int, int] = {} # offset in `request` -> offset in the cleaned request.
+        length = 0
+        cuts = sorted(cuts)
+
+        for c_start, c_end in zip(cuts, cuts[1:]):
+            part, part_colored = self.__highlight(request[c_start:c_end])
+            spans[c_start] = length + (1 if cleaned and part else 0)
+
+            if part:
+                if cleaned:
+                    cleaned.append(" ")
+                    colored.append(" ")
+                    length += 1
+
+                cleaned.append(part)
+                colored.append(part_colored)
+                length += len(part)
+
+        spans[len(request)] = length
+        joined_tokens = "".join(cleaned)
+        self.last_request = request
+
+        self.out.write("".join(colored) + "\n")
+
+        if old_request is None or old_request == joined_tokens or not joined_tokens.startswith(old_request):
+            self.out.write("\n")
+            return joined_tokens
+
+        start = len(old_request) + 1 # after the space.
+        to_print = " " * (start + old_req_adder) + "^" * (length - start)
+
+        if difference_request_name is not None and request_name_pos is not None and request_name_pos[0] in spans \
+           and request_name_pos[1] in spans and spans[request_name_pos[0]] >= start:
+            sub_start, sub_end = spans[request_name_pos[0]], spans[request_name_pos[1]]
+            label = "FROM REQUEST " + difference_request_name
+
+            to_print = (" " * (start + old_req_adder) + "^" * (sub_start - start) + self.YELLOW + "^" * (sub_end - sub_start)
+                        + self.RESET + "^" * (length - sub_end) + "\n")
+            to_print += " " * (old_req_adder + sub_start + max(0, (sub_end - sub_start - len(label)) // 2)) \
+                        + self.YELLOW + label + self.RESET
+
+        self.out.write(to_print + "\n")
+
+        return joined_tokens
+
+    def print_step(self, request_name: str, request: str, old_request: str = None,
+                   difference_request_name: str = None, request_name_pos: tuple = None) -> str:
+        """
+        Print the head of a step ("FOR REQUEST n: " and the request, see
+        `print_request`).
+
+        return the "cleaned" request.
+        """
+
+        head = f"FOR REQUEST {request_name}: "
+        self.out.write(head)
+
+        return self.print_request(request, old_request, difference_request_name, request_name_pos, len(head) - 1)
+
+    @classmethod
+    def auto(cls, out: Any = None, sink: str = "ndjson") -> "Terminal":
+        """
+        return a `Terminal` if `out` (stdout by default) is a TTY, else
+        the `sink` ("ndjson" or "csv") writing in `out`.
+        """
+
+        out = stdout if out is None else out
+        isatty = getattr(out, "isatty", None)
+
+        if isatty is not None and isatty():
+            return cls(out)
+
+        if sink not in SINKS:
+            warn(f"Unknown sink {sink!r} in Terminal.auto, ndjson is used.")
+            sink = "ndjson"
+
+        return SINKS[sink](out)
+
+class NdjsonSink(Terminal):
+    """
+    A `Terminal` writing json lines, for other tools:
+    - each step: `{"event": "step", "request", "sql", "sub_request", "span"}`
+    - each table: `{"event": "columns", "columns": [...]}`, then one json
+      array per row.
+    - `{"event": "info" | "plan" | "profile", ...}` for the rest.
+
+    No colors and no widths, the rows are written chunk by chunk.
+    """
+
+    def __init__(self, out: Any = None, buffer_size: int = 64 * 1024) -> None:
+        """
+        init.
+        """
+
+        super().__init__(out, buffer_size)
+        self.encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=self.__default)
+
+    @staticmethod
+    def __default(value: Any) -> Any:
+        if isinstance(value, bytes): # BLOB.
+            return value.hex()
+        return str(value)
+
+    def __event(self, event: str, **values: Any) -> None:
+        self.out.write(self.encoder.encode({"event": event, **values}) + "\n")
+
+    def print_table(self, values: list[tuple[Any, ...]] | ResultStream, head: list[str] = None,
+                    chunk_size: int = 1000, width_rows: int = None) -> None:
+        """
+        Write the header, then the rows, one json array per line.
+        """
+
+        if isinstance(values, ResultStream):
+            chunks = values.chunks()
+        elif values is not None:
+            chunks = (values[idx:idx + chunk_size] for idx in range(0, len(values), chunk_size))
+        else:
+            chunks = iter(())
+
+        self.__event("columns", columns=list(head) if head is not None else [])
+
+        out = self.out
+        encode = self.encoder.encode
+        buffer: list[str] = []
+        buffered = 0
+
+        for chunk in chunks:
+            text = "\n".join(map(encode, map(list, chunk))) + "\n"
+            buffer.append(text)
+            buffered += len(text)
+
+            if buffered >= self.buffer_size:
+                out.write("".join(buffer))
+                buffer = []
+                buffered = 0
+
+        out.write("".join(buffer))
+
+    def print_info(self, text: str) -> None:
+        """
+        Write an information line.
+        """
+
+        self.__event("info", text=text)
+
+    def print_profile(self, profile: dict[str, Any], sql_width: int = 60) -> None:
+        """
+        Write the profile (see `Interpreter.run`), as is.
+        """
+
+        self.__event("profile", **profile)
+
+    def print_plan(self, explained: dict[str, list[str]]) -> None:
+        """
+        Write a plan from `Explainer.explain`.
+        """
+
+        self.__event("plan", **explained)
+
+    def print_step(self, request_name: str, request: str, old_request: str = None,
+                   difference_request_name: str = None, request_name_pos: tuple = None) -> str:
+        """
+        Write the metadata of a step.
+        """
+
+        self.__event("step", request=request_name, sql=request, sub_request=difference_request_name,
+                     span=list(request_name_pos) if request_name_pos is not None else None)
+
+        return request
+
+class CsvSink(Terminal):
+    """
+    A `Terminal` writing csv, for other tools. Each step is a
+    `#step,request,sql,sub_request,span start,span end` row, each table a
+    header row and its rows, then an empty row. The other lines start
+    with `#info`, `#plan` or `#profile`.
+    """
+
+    def __init__(self, out: Any = None, buffer_size: int = 64 * 1024) -> None:
+        """
+        init.
+        """
+
+        super().__init__(out, buffer_size)
+        self.writer = csv.writer(self.out, lineterminator="\n")
+
+    def print_table(self, values: list[tuple[Any, ...]] | ResultStream, head: list[str] = None,
+                    chunk_size: int = 1000, width_rows: int = None) -> None:
+        """
+        Write the header, then the rows.
+        """
+
+        if isinstance(values, ResultStream):
+            chunks = values.chunks()
+        elif values is not None:
+            chunks = (values[idx:idx + chunk_size] for idx in range(0, len(values), chunk_size))
+        else:
+            chunks = iter(())
+
+        self.writer.writerow(head if head is not None else [])
+
+        for chunk in chunks:
+            self.writer.writerows(chunk)
+
+        self.writer.writerow([])
+
+    def print_info(self, text: str) -> None:
+        """
+        Write an information row.
+        """
+
+        self.writer.writerow(["#info", text])
+
+    def print_profile(self, profile: dict[str, Any], sql_width: int = 60) -> None:
+        """
+        Write the steps of a profile (see `Interpreter.run`), in order.
+        """
+
+        steps = profile["steps"]
+        head = list(steps[0]) if steps else []
+
+        self.writer.writerow(["#profile"] + [f"{key}={value}" for key, value in profile.items() if key != "steps"])
+        self.print_table([tuple(record.values()) for record in steps], head)
+
+    def print_plan(self, explained: dict[str, list[str]]) -> None:
+        """
+        Write a plan from `Explainer.explain`, one row per line.
+        """
+
+        for kind in ("tree", "flags", "suggestions"):
+            self.writer.writerows(["#plan", kind, line] for line in explained[kind])
+
+    def print_step(self, request_name: str, request: str, old_request: str = None,
+                   difference_request_name: str = None, request_name_pos: tuple = None) -> str:
+        """
+        Write the metadata of a step.
+        """
+
+        span = list(request_name_pos) if request_name_pos is not None else ["", ""]
+        self.writer.writerow(["#step", request_name, request,
+                              difference_request_name if difference_request_name is not None else ""] + span)
+
+        return request
+
+# sink name -> class, for Terminal.auto.
+SINKS: dict[str, type[Terminal]] = {"ndjson": NdjsonSink, "csv": CsvSink}
+
+class Explainer:
+    """
+    The EXPLAIN QUERY PLAN of the steps: the plan tree, the full scans of
+    big tables, the temp b-trees, and the indexes that could help.
+    """
+
+    # "SCAN TABLE x" and "SEARCH TABLE x" before sqlite 3.36.
+    SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\S+)")
+    AUTO_INDEX_RE = re.compile(r"^SEARCH (?:TABLE )?(\S+) USING AUTOMATIC (?:PARTIAL )?(?:COVERING )?INDEX \((.*)\)")
+
+    def __init__(self, my_db: DatabaseSystem, large_table: int = 10_000) -> None:
+        """
+        init. (`large_table`: from how many rows a full scan is flagged.)
+        """
+
+        self.my_db = my_db
+        self.large_table = large_table
+        self.catalog: SchemaCatalog = None # refreshed by each `explain`.
+
+    @staticmethod
+    def table_aliases(command: str) -> dict[str, str]:
+        """
+        Return the tables used by `command`: UPPER alias (or name) -> table.
+        """
+
+        tokens = Tokenizer.tokenize(command)
+        n_tokens = len(tokens)
+        aliases: dict[str, str] = {}
+
+        def _text(idx: int) -> str:
+            return command[tokens[idx][1]:tokens[idx][2]]
+
+        def _is_word(idx: int) -> bool:
+            return idx < n_tokens and tokens[idx][0] in {"word", "quoted"}
+
+        def _read_table(idx: int) -> int:
+            if not _is_word(idx):
+                return idx # a sub-request.
+
+            table = _text(idx)
+            idx += 1
+
+            if idx + 1 < n_tokens and _text(idx) == "." and _is_word(idx + 1): # schema.table
+                table = _text(idx + 1)
+                idx += 2
+
+            table = table.strip('"`[]')
+            aliases[table.upper()] = table
+
+            if idx < n_tokens and _text(idx).upper() == "AS":
+                idx += 1
+
+            if _is_word(idx) and _text(idx).upper() not in SqlInfos.CLAUSES:
+                aliases[_text(idx).strip('"`[]').upper()] = table
+                idx += 1
+
+            return idx
+
+        idx = 0
+
+        while idx < n_tokens:
+            if tokens[idx][0] == "word" and _text(idx).upper() in {"FROM", "JOIN", "UPDATE", "INTO"}:
+                idx = _read_table(idx + 1)
+
+                while idx < n_tokens and tokens[idx][0] == "comma":
+                    idx = _read_table(idx + 1)
+                continue
+
+            idx += 1
+
+        return aliases
+
+    @staticmethod
+    def join_stages(command: str) -> list[tuple[str, str]]:
+        """
+        Return the stages of the top level FROM clause of `command`, one
+        join added at a time: (FROM clause until the join, the join). Empty
+        if there is no join.
+        """
+
+        tokens = Tokenizer.tokenize(command)
+        depth = 0
+        start = None # end of the FROM.
+        end = len(command)
+        bounds: list[int] = [] # starts of the joins.
+        joining = False # in a LEFT OUTER JOIN, ...
+
+        for kind, t_start, t_end in tokens:
+            if kind == "lparen":
+                depth += 1
+                joining = False
+                continue
+
+            if kind == "rparen":
+                depth -= 1
+
+                if depth < 0: # end of the request.
+                    end = t_start
+                    break
+                continue
+
+            if depth != 0:
+                continue
+
+            word = command[t_start:t_end].upper() if kind == "word" else None
+
+            if start is None:
+                if word == "FROM":
+                    start = t_end
+                continue
+
+            if kind == "semicolon" or word in SqlInfos.FROM_END:
+                end = t_start
+                break
+
+            if kind == "comma" or word in SqlInfos.JOINS:
+                if not joining:
+                    bounds.append(t_start)
+
+                joining = word is not None and word != "JOIN"
+                continue
+
+            joining = False
+
+        if start is None or not bounds:
+            return []
+
+        bounds = [start] + bounds + [end]
+
+        return [(command[start:bounds[idx + 1]].strip(), command[bounds[idx]:bounds[idx + 1]].strip())
+                for idx in range(len(bounds) - 1)]
+
+    @staticmethod
+    def column_refs(command: str) -> list[tuple[str, str]]:
+        """
+        Return the qualified columns used by `command`: (UPPER qualifier, column).
+        (not the `schema.table` after a FROM / JOIN.)
+        """
+
+        tokens = Tokenizer.tokenize(command)
+        refs: list[tuple[str, str]] = []
+
+        def _text(idx: int) -> str:
+            return command[tokens[idx][1]:tokens[idx][2]]
+
+        for idx in range(len(tokens) - 2):
+            if tokens[idx][0] not in {"word", "quoted"} or _text(idx + 1) != "." \
+               or tokens[idx + 2][0] not in {"word", "quoted"}:
+                continue
+
+            if idx > 0 and (_text(idx - 1) == "." or _text(idx - 1).upper() in {"FROM", "JOIN", "INTO", "UPDATE"}):
+                continue
+
+            ref = (_text(idx).strip('"`[]').upper(), _text(idx + 2).strip('"`[]'))
+
+            if ref not in refs:
+                refs.append(ref)
+
+        return refs
+
+    @staticmethod
+    def condition_columns(command: str) -> list[tuple[str | None, str]]:
+        """
+        Return the columns compared in `command`: (UPPER qualifier or None, column).
+        """
+
+        tokens = Tokenizer.tokenize(command)
+        n_tokens = len(tokens)
+        columns: list[tuple[str | None, str]] = []
+
+        def _text(idx: int) -> str:
+            return command[tokens[idx][1]:tokens[idx][2]]
+
+        def _column(idx: int, step: int) -> tuple[str | None, str] | None:
+            # the column reference ending (step -1) or starting (step 1) at idx.
+            if not 0 <= idx < n_tokens or tokens[idx][0] not in {"word", "quoted"}:
+                return None
+
+            if step == -1:
+                name_idx, qual_idx = idx, idx - 2
+                has_dot = idx - 1 >= 0 and _text(idx - 1) == "."
+            else:
+                has_dot = idx + 2 < n_tokens and _text(idx + 1) == "."
+                name_idx, qual_idx = (idx + 2, idx) if has_dot else (idx, None)
+
+            name = _text(name_idx).strip('"`[]')
+
+            if name.upper() in SqlInfos.WORDS or name.upper() in SqlInfos.CLAUSES:
+                return None
+
+            qualifier = _text(qual_idx).strip('"`[]').upper() if has_dot and qual_idx is not None and qual_idx >= 0 else None
+
+            return qualifier, name
+
+        for idx, (kind, start, end) in enumerate(tokens):
+            text = command[start:end].upper()
+
+            if text not in SqlInfos.COMPARISON:
+                continue
+
+            for ref in (_column(idx - 1, -1), _column(idx + 1, 1)):
+                if ref is not None and ref not in columns:
+                    columns.append(ref)
+
+        return columns
+
+    def __catalog(self) -> SchemaCatalog:
+        if self.catalog is None:
+            self.catalog = self.my_db.catalog()
+
+        return self.catalog
+
+    def row_estimate(self, table: str) -> int:
+        """
+        Return the number of rows of `table` (see `SchemaCatalog.row_estimate`).
+        """
+
+        return self.__catalog().row_estimate(table)
+
+    def columns_of(self, table: str) -> set[str]:
+        """
+        Return the UPPER names of the columns of `table`.
+        """
+
+        return self.__catalog().columns_of(table)
+
+    def indexed_columns(self, table: str) -> set[str]:
+        """
+        Return the UPPER names of the first column of each index of `table`.
+        """
+
+        return self.__catalog().indexed_columns(table)
+
+    @staticmethod
+    def tree(plan: list[tuple]) -> list[str]:
+        """
+        Return the lines of the plan tree (like the sqlite3 shell).
+        """
+
+        children: dict[int, list[tuple]] = {}
+
+        for row in plan:
+            children.setdefault(row[1], []).append(row)
+
+        lines = ["QUERY PLAN"]
+        stack = [(row, "", idx == len(children.get(0, [])) - 1) for idx, row in enumerate(children.get(0, []))]
+        stack.reverse()
+
+        while stack:
+            row, prefix, is_last = stack.pop()
+            lines.append(prefix + ("`--" if is_last else "|--") + row[3])
+
+            subs = children.get(row[0], [])
+            child_prefix = prefix + ("   " if is_last else "|  ")
+            stack.extend((sub, child_prefix, idx == len(subs) - 1) for idx, sub in reversed(list(enumerate(subs))))
+
+        return lines
+
+    def explain(self, command: str, params: Any = None) -> dict[str, list[str]]:
+        """
+        Return the plan tree of `command` (with its bound `params`), the
+        flags (full scans of large tables, temp b-trees, automatic indexes)
+        and the indexes to create.
+        """
+
+        self.catalog = self.my_db.catalog()
+        plan = self.my_db.mydb.execute("EXPLAIN QUERY PLAN " + command, () if params is None else params).fetchall()
+        aliases = self.table_aliases(command)
+
+        flags: list[str] = []
+        scanned: dict[str, set[str]] = {} # table -> columns already in an index suggestion.
+        suggestions: list[str] = []
+
+        def _suggest(table: str, column: str) -> None:
+            if column.upper() in self.indexed_columns(table) or column.upper() in scanned.setdefault(table, set()):
+                return
+
+            scanned[table].add(column.upper())
+            suggestions.append(f"CREATE INDEX idx_{table}_{column} ON {table}({column});")
+
+        for row in plan:
+            detail = row[3]
+            scan = self.SCAN_RE.match(detail)
+            auto_index = self.AUTO_INDEX_RE.match(detail)
+
+            if scan is not None:
+                table = aliases.get(scan.group(1).upper(), scan.group(1))
+                rows = self.row_estimate(table) if table.upper() in aliases else 0
+
+                if rows >= self.large_table:
+                    flags.append(f"full scan of {table} (~{rows} rows): {detail}")
+                    scanned.setdefault(table, set())
+
+            elif auto_index is not None:
+                table = aliases.get(auto_index.group(1).upper(), auto_index.group(1))
+                flags.append(f"automatic index built on {table} at each run: {detail}")
+
+                for column in re.findall(r"(\w+)=\?", auto_index.group(2)):
+                    _suggest(table, column)
+
+            elif detail.startswith("USE TEMP B-TREE"):
+                flags.append(detail.lower())
+
+        for qualifier, column in self.condition_columns(command):
+            for table in list(scanned):
+                if qualifier is not None and aliases.get(qualifier) != table:
+                    continue
+
+                if column.upper() in self.columns_of(table):
+                    _suggest(table, column)
+
+        return {"tree": self.tree(plan), "flags": flags, "suggestions": suggestions}
+
+class PlanStep:
+    """
+    A step of an execution plan: one sql command to run and show.
+    """
+
+    __slots__ = ("request", "parent", "sql", "raw", "sub_request", "caret", "deps", "first", "last", "outer",
+                 "shared")
+
+    def __init__(self, request: int, parent: int | None, sql: str, raw: str, sub_request: int = None,
+                 caret: tuple[int, int] = None, deps: tuple[int, ...] = (), first: bool = False,
+                 last: bool = False, outer: tuple[tuple[str, str, str | None], ...] = (),
+                 shared: tuple[int, ...] = ()) -> None:
+        """
+        init.
+        - `request`, `parent`: number of the request, and of its parent request.
+        - `sql`: the command, with the sub-requests inlined.
+        - `raw`: the command with the `(@n)` placeholders.
+        - `sub_request`, `caret`: the last sub-request, and its position in `sql`.
+        - `deps`: the sub-requests used by the command.
+        - `first`, `last`: first / last step of the request.
+        - `outer`: the columns of the outer requests used by the command (a
+          correlated sub-request): (UPPER qualifier, column, table or None).
+        - `shared`: the sub-requests merged into this request (the same once
+          canonical, see `Interpreter.canonical`), on its last step.
+        """
+
+        self.request = request
+        self.parent = parent
+        self.sql = sql
+        self.raw = raw
+        self.sub_request = sub_request
+        self.caret = caret
+        self.deps = deps
+        self.first = first
+        self.last = last
+        self.outer = outer
+        self.shared = shared
+
+    def to_list(self) -> list[Any]:
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values: list[Any]) -> "PlanStep":
+        step = cls(*values)
+        step.caret = tuple(step.caret) if step.caret is not None else None
+        step.deps = tuple(step.deps)
+        step.outer = tuple(tuple(ref) for ref in step.outer)
+        step.shared = tuple(step.shared)
+        return step
+
+    def __repr__(self) -> str:
+        return f"PlanStep(@{self.request}, {self.sql!r})"
+
+class ExecutionPlan:
+    """
+    The parsed tree and the steps of a request, cached by `Interpreter.interpret`.
+    """
+
+    __slots__ = ("key", "tree", "steps")
+
+    VERSION: int = 3 # of the files on the disk.
+
+    def __init__(self, key: str, tree: dict[str, Any], steps: list[PlanStep]) -> None:
+        """
+        init. (`key`: the normalized request.)
+        """
+
+        self.key = key
+        self.tree = tree
+        self.steps = steps
+
+    def save(self, path: Path) -> None:
+        """
+        Write the plan as json in `path`.
+        """
+
+        data = {
+            "version": self.VERSION,
+            "key": self.key,
+            "tree": self.tree,
+            "steps": [step.to_list() for step in self.steps]
+        }
+
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path, key: str) -> "ExecutionPlan | None":
+        """
+        Read the plan of `key` from `path`, None if there is none (or an old one).
+        """
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != cls.VERSION or data.get("key") != key:
+            return None
+
+        return cls(key, data["tree"], [PlanStep.from_list(values) for values in data["steps"]])
+
+class Interpreter:
+    """
+    An interpreter to serperate commands and run it.
+    """
+
+    PLACEHOLDER_RE = re.compile(r"\(@(\d+)\)")
+
+    # plans of the interpreted requests, shared by the interpreters.
+    PLANS: OrderedDict[str, ExecutionPlan] = OrderedDict()
+    PLANS_SIZE: int = 1024
+
+    SAMPLE_MIN_ROWS: int = 1000 # smaller tables are not sampled by `run(sample=...)`.
+    FAN_OUT_ALERT: float = 10.0 # joins multiplying the rows by more are flagged by `run(joins=True)`.
+
+    def __init__(self, my_db: DatabaseSystem, term: Terminal, plan_dir: str = None):
+        """
+        init. (`plan_dir`: a directory to also keep the plans on the disk.)
+        """
+
+        self.my_db = my_db
+        self.term = term
+        self.commands: list[PlanStep] = []
+        self.plan: ExecutionPlan = None
+        self.plan_dir = Path(plan_dir) if plan_dir is not None else None
+
+        self.timings: dict[str, Any] = {} # of the last interpret.
+        self.profile: dict[str, Any] = None # of the last run with profile=True.
+
+        # outputs of the steps for `run(reuse=True)`: step key -> (columns, rows, row count).
+        self.outputs: OrderedDict[str, tuple[list[str], list[tuple], int]] = OrderedDict()
+        self.outputs_version: tuple[int, int] | None = None # data_version of the outputs.
+        self.outputs_rows: int = 100_000 # max rows kept.
+        self.reused: int = 0 # steps reused by the last run.
+
+        self.params: dict[str, Any] | None = None # bound parameters of the request, by name.
+        self.many: list[tuple] | None = None # rows of an INSERT ... VALUES, run with executemany.
+        self.joins: list[dict[str, Any]] = [] # stages of the joins of the last run(joins=True).
+
+    def __parse(self, element: str) -> dict[str, dict[str, dict | str] | str]:
+        """
+        Create a dict with the parsing elements.
+
+        One pass over the tokens of `element`, a sub-request is a `(`
+        followed by a SELECT (or WITH), other parenthesis (functions,
+        IN lists, VALUES, ...) stay in the request.
+        """
+
+        all_tokens = Tokenizer.tokenize(element, skip=set())
+        clean = Tokenizer.clean(element, all_tokens)
+        tokens = [t for t in all_tokens if t[0] not in Tokenizer.SKIPPED]
+
+        def _new_frame(name: str, seg_start: int) -> dict[str, Any]:
+            return {
+                "node": {
+                    "name": name,
+                    "request": "",
+                    "condition": [],
+                    "sub-request": []
+                },
+                "pieces": [],       # parts of the request (placeholders included).
+                "seg_start": seg_start,
+                "length": 0,        # length of the joined pieces.
+                "depth": 0,         # depth of the other parenthesis.
+                "case": 0,          # depth of CASE ... END.
+                "cond_start": None, # offset of the WHERE / ON in the request.
+                "and_pos": [],      # offsets of the top level AND.
+                "between": False    # BETWEEN x AND y is not a condition.
+            }
+
+        def _close_segment(frame: dict[str, Any], end: int) -> None:
+            piece = clean[frame["seg_start"]:end]
+            frame["pieces"].append(piece)
+            frame["length"] += len(piece)
+            frame["seg_start"] = end
+
+        def _finish(frame: dict[str, Any], end: int) -> dict[str, Any]:
+            _close_segment(frame, end)
+
+            node = frame["node"]
+            request = "".join(frame["pieces"])
+            c_start = frame["cond_start"]
+
+            if c_start is None:
+                node["request"] = request
+            else:
+                node["request"] = request[:c_start]
+                node["condition"] = [request[c_start:a_pos] for a_pos in frame["and_pos"]] + [request[c_start:]]
+
+            return node
+
+        n_sub_request = 0
+        stack = [_new_frame("@0", 0)]
+        n_tokens = len(tokens)
+
+        for t_idx, (kind, start, end) in enumerate(tokens):
+            frame = stack[-1]
+
+            if kind == "lparen":
+                n_idx = t_idx + 1
+
+                if n_idx < n_tokens and tokens[n_idx][0] == "word" and \
+                   element[tokens[n_idx][1]:tokens[n_idx][2]].upper() in SqlInfos.SUB_REQUEST:
+
+                    n_sub_request += 1
+                    name = f"@{n_sub_request}"
+
+                    _close_segment(frame, start)
+                    frame["pieces"].append(f"({name})")
+                    frame["length"] += len(name) + 2
+
+                    stack.append(_new_frame(name, end))
+                else:
+                    frame["depth"] += 1
+
+                continue
+
+            if kind == "rparen":
+                if frame["depth"] > 0:
+                    frame["depth"] -= 1
+
+                elif len(stack) > 1:
+                    node = _finish(stack.pop(), start)
+                    stack[-1]["node"]["sub-request"].append(node)
+                    stack[-1]["seg_start"] = end
+
+                continue
+
+            if kind != "word" or frame["depth"] != 0:
+                continue
+
+            upper = element[start:end].upper()
+
+            if upper == "CASE":
+                frame["case"] += 1
+            elif upper == "END" and frame["case"] > 0:
+                frame["case"] -= 1
+            elif frame["case"] > 0:
+                continue
+            elif upper in SqlInfos.CONDITION and frame["cond_start"] is None:
+                frame["cond_start"] = frame["length"] + start - frame["seg_start"]
+            elif upper == "BETWEEN":
+                frame["between"] = True
+            elif upper == "AND" and frame["cond_start"] is not None:
+                if frame["between"]:
+                    frame["between"] = False
+                else:
+                    frame["and_pos"].append(frame["length"] + start - frame["seg_start"])
+
+        # unclosed parenthesis, close everything at the end.
+        while len(stack) > 1:
+            node = _finish(stack.pop(), len(element))
+            stack[-1]["node"]["sub-request"].append(node)
+            stack[-1]["seg_start"] = len(element)
+
+        return _finish(stack[0], len(element))
+
+    def __getCommands(self, ast: dict[str, dict[str, dict | str] | str]) -> list[PlanStep]:
+        """
+        traduct the dict to a executable list of sql commands.
+        """
+
+        # post-order: sub-requests first, then the base request and one
+        # command per condition.
+        steps: list[tuple[int, int | None, str]] = []
+        stack: list[tuple[dict, int | None, bool]] = [(ast, None, False)]
+
+        # the sub-requests identical once canonical are merged into the first
+        # one: its steps are shown once, and the placeholders of the others
+        # point to it.
+        canonicals: dict[str, int] = {} # canonical sub-request -> request.
+        merged: dict[int, int] = {} # request -> the request it is merged into.
+        shared: dict[int, list[int]] = {} # request -> the requests merged into it.
+
+        def _merged(text: str) -> str:
+            def _request(match: re.Match) -> str:
+                sub_idx = int(match.group(1))
+                return f"(@{merged.get(sub_idx, sub_idx)})"
+
+            return self.PLACEHOLDER_RE.sub(_request, text)
+
+        # for the correlated sub-requests: the tables of each request, its
+        # parent, and the columns it uses from the outer requests.
+        scopes: dict[int, dict[str, str]] = {}
+        parents: dict[int, int | None] = {}
+        unresolved: dict[int, set[tuple[str, str]]] = {}
+
+        while stack:
+            node, parent, visited = stack.pop()
+            idx = int(node["name"][1:])
+
+            if not visited:
+                stack.append((node, parent, True))
+                stack.extend((sub, idx, False) for sub in reversed(node.get("sub-request", [])))
+                continue
+
+            req = node["request"].strip()
+            steps.append((idx, parent, req))
+
+            for cond in node.get("condition", []):
+                steps.append((idx, parent, f"{req} {cond.strip()}"))
+
+            full = " ".join([req] + node.get("condition", []))
+            scope = Explainer.table_aliases(full)
+            aliased = {table.upper() for name, table in scope.items() if name != table.upper()}
+
+            # an aliased table is only seen by its alias, `HEROS.Id` in
+            # `FROM HEROS AS H2` is the one of an outer request.
+            scope = scopes[idx] = {name: table for name, table in scope.items() if name not in aliased}
+            parents[idx] = parent
+            unresolved[idx] = {ref for ref in Explainer.column_refs(full) if ref[0] not in scope}
+
+            for sub in node.get("sub-request", []):
+                unresolved[idx] |= {ref for ref in unresolved[int(sub["name"][1:])] if ref[0] not in scope}
+
+            if parent is not None and not unresolved[idx]: # a correlated one depends on its outer row.
+                first = canonicals.setdefault(self.canonical(_merged(full)), idx)
+
+                if first != idx:
+                    merged[idx] = first
+                    shared.setdefault(first, []).append(idx)
+
+        def _outer(idx: int, raw_command: str, deps: list[int]) -> tuple[tuple[str, str, str], ...]:
+            refs = set(Explainer.column_refs(raw_command)).union(*(unresolved[dep] for dep in deps))
+            outer: list[tuple[str, str, str]] = []
+
+            for qualifier, column in refs:
+                if qualifier in scopes[idx]:
+                    continue
+
+                ancestor = parents[idx]
+
+                while ancestor is not None and qualifier not in scopes[ancestor]:
+                    ancestor = parents[ancestor]
+
+                if ancestor is not None: # else not a table (a sub-request in a FROM, ...).
+                    outer.append((qualifier, column, scopes[ancestor][qualifier]))
+
+            return tuple(sorted(outer))
+
+        request_commands: dict[int, str] = {}
+        plan: list[PlanStep] = []
+
+        for s_idx, (idx, parent, raw_command) in enumerate(steps):
+            pieces: list[str] = []
+            length = 0
+            last = 0
+            deps: list[int] = []
+            caret = None
+
+            for match in self.PLACEHOLDER_RE.finditer(raw_command):
+                key_el = int(match.group(1))
+
+                try:
+                    sub_com = request_commands[key_el]
+                except KeyError:
+                    print(f"ERROR while running the {raw_command} at @{idx}, key = @{key_el} !")
+                    exit()
+
+                before = raw_command[last:match.start()] + "("
+                pieces.append(before)
+                pieces.append(sub_com)
+                length += len(before)
+
+                deps.append(key_el)
+                caret = (length, length + len(sub_com))
+
+                length += len(sub_com)
+                last = match.end() - 1 # keep the ")".
+
+            pieces.append(raw_command[last:])
+            command = "".join(pieces)
+
+            request_commands[idx] = command # the sql of a merged request is still its own.
+
+            if idx in merged:
+                continue
+
+            deps = [merged.get(dep, dep) for dep in deps]
+            is_last = s_idx == len(steps) - 1 or steps[s_idx + 1][0] != idx
+
+            plan.append(PlanStep(
+                request=idx,
+                parent=parent,
+                sql=command,
+                raw=_merged(raw_command),
+                sub_request=deps[-1] if deps else None,
+                caret=caret,
+                deps=tuple(dict.fromkeys(deps)),
+                first=s_idx == 0 or steps[s_idx - 1][0] != idx,
+                last=is_last,
+                outer=_outer(idx, raw_command, deps) if parent is not None else (),
+                shared=tuple(shared.get(idx, ())) if is_last else ()
+            ))
+
+        return plan
+
+    @staticmethod
+    def canonical(command: str) -> str:
+        """
+        Return the canonical form of `command`: normalized (see
+        `Tokenizer.normalize`), and its table aliases renamed in order
+        (`#1`, `#2`, ..., not a valid name), so two sub-requests differing
+        only by their spaces, case or aliases have the same one.
+
+        Only the alias after its table (the optional AS is dropped) and
+        before a `.` is renamed, a column with the same name stays.
+        """
+
+        aliases = Explainer.table_aliases(command)
+        names: dict[str, str] = {} # UPPER alias -> new name.
+
+        for alias, table in aliases.items():
+            if alias != table.upper():
+                names[alias] = f"#{len(names) + 1}"
+
+        tokens = [token for token in Tokenizer.tokenize(command) if token[0] != "semicolon"]
+        texts = [command[start:end] for _, start, end in tokens]
+        parts: list[str] = []
+
+        for t_idx, (kind, _, _) in enumerate(tokens):
+            token = texts[t_idx]
+            name = names.get(token.strip('"`[]').upper()) if kind in {"word", "quoted"} else None
+
+            if name is not None and (
+                (t_idx + 1 < len(tokens) and texts[t_idx + 1] == ".") or
+                (t_idx > 0 and texts[t_idx - 1].strip('"`[]').upper() in {"AS", aliases[token.strip('"`[]').upper()].upper()})
+            ):
+                token = name
+
+                if parts and parts[-1] == "AS" and t_idx > 1 and \
+                   texts[t_idx - 2].strip('"`[]').upper() == aliases[texts[t_idx].strip('"`[]').upper()].upper():
+                    parts.pop() # FROM HEROS AS H2 is FROM HEROS H2.
+            elif kind == "word":
+                token = token.upper()
+
+            parts.append(token)
+
+        return " ".join(parts)
+
+    def correlated_sql(self, step: PlanStep, command: str = None) -> str | None:
+        """
+        Return the command showing a correlated step (see `PlanStep.outer`)
+        for all the outer keys at once, every key shown (instead of one
+        query per outer row), from the distinct keys of the outer tables:
+        the step is LEFT JOINed to the keys, its WHERE as the ON clause:
+        - a step aggregating (without GROUP BY) is grouped by the keys, one
+          row per key (without a match: 0 for a COUNT, NULL for the others).
+        - the others give their rows for each key (NULLs without a match),
+          a GROUP BY is grouped by the keys too (only the keys with a group).
+
+        The unqualified columns of the step named like a key are qualified
+        with the table of the step having them (else ambiguous).
+
+        return None if the step is not correlated, or can't be batched (a
+        LIMIT, a UNION, ... applied to each outer row). (`command`: the sql
+        of the step to use, `step.sql` by default.)
+        """
+
+        if not step.outer:
+            return None
+
+        command, qualifiers = self.__qualify(step, step.sql if command is None else command)
+        tokens = Tokenizer.tokenize(command)
+        clauses: dict[str, tuple[int, int]] = {} # top level clause -> (start of the word, end of the clause words)
+        aggregated = False
+        depth = 0
+
+        for t_idx, (kind, start, end) in enumerate(tokens):
+            depth += (kind == "lparen") - (kind == "rparen")
+            word = command[start:end].upper() if kind == "word" else None
+
+            if depth == 0 and word in {"LIMIT", "UNION", "EXCEPT", "INTERSECT", "WINDOW"}:
+                return None
+
+            if depth == 0 and word in {"SELECT", "FROM", "WHERE", "GROUP", "HAVING", "ORDER"} and word not in clauses:
+                skip = 1 if word in {"GROUP", "ORDER"} else 0 # BY.
+                clauses[word] = (start, tokens[min(t_idx + skip, len(tokens) - 1)][2])
+
+            if depth == 0 and word in {"COUNT", "SUM", "AVG", "MIN", "MAX", "TOTAL", "GROUP_CONCAT"} \
+               and t_idx + 1 < len(tokens) and tokens[t_idx + 1][0] == "lparen":
+                aggregated = True
+
+        if "SELECT" not in clauses or "FROM" not in clauses:
+            return None
+
+        order = sorted(clauses.items(), key=lambda item: item[1][0])
+        parts: dict[str, str] = {} # clause -> its text, without the clause words.
+
+        for o_idx, (word, (start, end)) in enumerate(order):
+            stop = order[o_idx + 1][1][0] if o_idx + 1 < len(order) else len(command)
+            parts[word] = command[end:stop].strip().rstrip(";").strip()
+
+        keys: dict[str, tuple[str, list[str]]] = {} # qualifier -> table, columns.
+
+        for qualifier, column, table in step.outer:
+            keys.setdefault(qualifier, (table, []))[1].append(column)
+
+        key_columns: list[str] = []
+        key_tables: list[str] = []
+
+        for qualifier, (table, columns) in keys.items():
+            quoted = [f'"{column}"' for column in columns]
+            key_columns.extend(f"{qualifier}.{column}" for column in quoted)
+            key_tables.append(f'(SELECT DISTINCT {", ".join(quoted)} FROM "{table}") AS {qualifier}')
+
+        select = parts["SELECT"]
+        distinct = ""
+
+        for word in ("DISTINCT", "ALL"):
+            if select.upper().startswith(word + " "):
+                distinct, select = word + " ", select[len(word) + 1:].strip()
+
+        if aggregated and "GROUP" not in parts and "HAVING" in parts:
+            return None # a row or none for each outer row.
+
+        from_clause = parts["FROM"]
+        depth = 0
+
+        for kind, start, end in Tokenizer.tokenize(from_clause):
+            depth += (kind == "lparen") - (kind == "rparen")
+
+            if depth == 0 and (kind == "comma" or from_clause[start:end].upper() in SqlInfos.JOINS):
+                from_clause = f"({from_clause})" # a join clause, its aliases are still seen (not a lone table).
+                break
+
+        if aggregated and "GROUP" not in parts: # one row per key.
+            # a row of the step is matched if its marker isn't NULL, an empty
+            # group is still a row of NULLs for the LEFT JOIN (COUNT(*) = 1).
+            from_clause = f"({from_clause} CROSS JOIN (SELECT 1 AS _sqlv_match) AS _sqlv_m)"
+            columns: list[str] = []
+            item_start = 0
+            depth = 0
+
+            for kind, start, end in Tokenizer.tokenize(select + ","):
+                depth += (kind == "lparen") - (kind == "rparen")
+
+                if kind == "comma" and depth == 0:
+                    item = expression = select[item_start:start].strip()
+                    item_tokens = Tokenizer.tokenize(item)
+                    name = item
+
+                    if len(item_tokens) > 2 and item[item_tokens[-2][1]:item_tokens[-2][2]].upper() == "AS":
+                        name = item[item_tokens[-1][1]:].strip('"`[]')
+                        expression = item[:item_tokens[-2][1]].strip()
+                        item_tokens = item_tokens[:-2]
+
+                    elif len(item_tokens) > 1 and item_tokens[-1][0] in {"word", "quoted"} \
+                         and item_tokens[-2][0] in {"rparen", "word", "quoted", "number", "string"} \
+                         and item[item_tokens[-1][1]:].upper() not in SqlInfos.WORDS | {"END"}: # without AS.
+                        name = item[item_tokens[-1][1]:].strip('"`[]')
+                        expression = item[:item_tokens[-1][1]].strip()
+                        item_tokens = item_tokens[:-1]
+
+                    # a lone COUNT(...) counts 0 rows, any other value is NULL.
+                    counted = (len(item_tokens) > 3 and expression[:item_tokens[0][2]].upper() == "COUNT"
+                               and item_tokens[1][0] == "lparen")
+                    count_depth = 0
+
+                    for i_idx, (i_kind, i_start, i_end) in enumerate(item_tokens[1:], 1):
+                        count_depth += (i_kind == "lparen") - (i_kind == "rparen")
+
+                        if count_depth == 0: # the end of COUNT(...).
+                            counted = counted and i_idx == len(item_tokens) - 1
+                            break
+
+                    for qualifier in qualifiers: # the name of the column in the step.
+                        name = name.replace(qualifier, "")
+
+                    name = name.replace('"', '""')
+                    columns.append(f"CASE WHEN COUNT(_sqlv_m._sqlv_match) THEN {expression} "
+                                   f'ELSE {"0" if counted else "NULL"} END AS "{name}"')
+                    item_start = end
+
+            return (f"SELECT {', '.join(key_columns)}, {', '.join(columns)} "
+                    f"FROM {', '.join(key_tables)} LEFT JOIN {from_clause} ON {parts.get('WHERE', '1')} "
+                    f"GROUP BY {', '.join(key_columns)} ORDER BY {', '.join(key_columns)}")
+
+        join = "JOIN" if "GROUP" in parts else "LEFT JOIN" # no empty group for the keys without a match.
+        batched = (f"SELECT {distinct}{', '.join(key_columns)}, {select} "
+                   f"FROM {', '.join(key_tables)} {join} {from_clause} ON {parts.get('WHERE', '1')}")
+
+        if "GROUP" in parts:
+            batched += f" GROUP BY {', '.join(key_columns)}, {parts['GROUP']}"
+
+        if "HAVING" in parts:
+            batched += f" HAVING {parts['HAVING']}"
+
+        batched += f" ORDER BY {', '.join(key_columns)}" + (f", {parts['ORDER']}" if "ORDER" in parts else "")
+
+        return batched
+
+    def __qualify(self, step: PlanStep, command: str) -> tuple[str, set[str]]:
+        names = {column.upper() for qualifier, column, table in step.outer}
+        tokens = Tokenizer.tokenize(command)
+        nested: list[int] = [] # depth of each sub-request in `command`, its columns are its own.
+        top: list[tuple[int, int]] = [] # tokens outside of the sub-requests: (index, start).
+        cleaned = list(command) # without the sub-requests, for its tables.
+        depth = 0
+
+        for t_idx, (kind, start, end) in enumerate(tokens):
+            depth += (kind == "lparen") - (kind == "rparen")
+
+            if kind == "lparen" and t_idx + 1 < len(tokens) and command[tokens[t_idx + 1][1]:tokens[t_idx + 1][2]].upper() == "SELECT":
+                nested.append(depth)
+
+            if nested:
+                cleaned[start:end] = " " * (end - start)
+            else:
+                top.append((t_idx, start))
+
+            if nested and kind == "rparen" and depth < nested[-1]:
+                nested.pop()
+
+        scope = Explainer.table_aliases("".join(cleaned))
+        aliased = {table.upper() for name, table in scope.items() if name != table.upper()}
+        catalog = self.my_db.catalog()
+        pieces: list[str] = []
+        qualifiers: set[str] = set() # the texts added.
+        last = 0
+
+        def _text(t_idx: int) -> str:
+            return command[tokens[t_idx][1]:tokens[t_idx][2]] if 0 <= t_idx < len(tokens) else ""
+
+        for t_idx, start in top:
+            if tokens[t_idx][0] not in {"word", "quoted"} or _text(t_idx).strip('"`[]').upper() not in names \
+               or _text(t_idx - 1) == "." or _text(t_idx - 1).upper() == "AS" or _text(t_idx + 1) in {".", "("}:
+                continue
+
+            column = _text(t_idx).strip('"`[]').upper()
+            owner = next((alias for alias, table in scope.items()
+                          if alias not in aliased and column in catalog.columns_of(table)), None)
+
+            if owner is not None: # else a column of the outer request.
+                qualifiers.add(f'"{owner}".')
+                pieces.append(command[last:start] + f'"{owner}".')
+                last = start
+
+        return "".join(pieces) + command[last:], qualifiers
+
+    def step_keys(self) -> list[str]:
+        """
+        Return a key per step of the plan: the hash of the request subtree
+        it runs (its request, the conditions until it, and the keys of the
+        sub-requests it uses). A key changes only when its step changes.
+        """
+
+        if self.plan is None:
+            return []
+
+        hashes: dict[int, str] = {} # request -> key of its last step.
+        keys: list[str] = []
+
+        params = repr(sorted(self.params.items())) if self.params else ""
+
+        def _key(text: str) -> str:
+            text = self.PLACEHOLDER_RE.sub(lambda match: f"(#{hashes[int(match.group(1))]})", text)
+            return sha1((Tokenizer.normalize(text) + params).encode("utf-8")).hexdigest()
+
+        for step in self.plan.steps: # post-order, the merged sub-requests point to the first one.
+            keys.append(_key(step.raw))
+
+            if step.last:
+                hashes[step.request] = keys[-1]
+
+        return keys
+
+    def __resolve(self, raw_command: str, resolved: dict[str, str]) -> str:
+        """
+        Replace the `(@n)` placeholders of `raw_command` with the sql in
+        `resolved` (a temp table or the inlined sub-request).
+        """
+
+        return self.PLACEHOLDER_RE.sub(lambda match: resolved["@" + match.group(1)], raw_command)
+
+    def __run(self, commands: list[PlanStep], materialize: bool = False, parallel: int = 0,
+              profile: bool = False, explain: bool = False, reuse: bool = False,
+              sample: tuple[str, dict[str, float]] = None, diff: bool = False, joins: bool = False) -> None:
+        """
+        Run the commands and show in the terminal.
+
+        With `materialize`, each sub-request is executed once into a TEMP
+        table, and the other requests read that table instead of running
+        the sub-request again.
+
+        With `parallel` > 1, the steps (independent once inlined) run on
+        that many read only connections, and are printed in order.
+
+        With `profile`, the measures of each step are kept in `self.profile`.
+
+        With `explain`, the EXPLAIN QUERY PLAN of each step is printed
+        after its result.
+
+        With `reuse`, the steps kept in `self.outputs` are not run again.
+
+        With `diff`, each condition step also shows the rows removed by its
+        condition (`DatabaseSystem.diff`, computed by sqlite).
+
+        With `joins`, the requests with joins first show the `COUNT(*)` of
+        their FROM clause, one join added at a time, see `__print_joins`.
+
+        With `sample` (cache prefix, UPPER table -> scale), the tables are
+        sampled: the results are cached apart and the row counts are
+        extrapolated.
+        """
+
+        records: list[dict[str, Any]] = []
+        explainer = Explainer(self.my_db) if explain else None
+
+        if profile:
+            self.my_db.enable_monitor()
+
+        self.my_db.start_run()
+        self.term.catalog = self.my_db.catalog()
+
+        keys: list[str] = []
+        self.reused = 0
+
+        if reuse and sample is None:
+            keys = self.step_keys()
+            version = self.my_db.data_version()
+
+            if version != self.outputs_version: # the data has changed.
+                self.outputs.clear()
+                self.outputs_version = version
+
+        finals = {step.request: step.sql for step in commands if step.last and not step.outer} # whole sql of each request.
+
+        # with `joins`, the step of a JOIN before its ON clause (a cross join,
+        # that can be huge) is not run, the stages count its rows instead.
+        unjoined = {s_idx for s_idx, (step, next_step) in enumerate(zip(commands, commands[1:]))
+                    if joins and step.request in finals and next_step.request == step.request
+                    and next_step.raw.startswith(step.raw)
+                    and next_step.raw[len(step.raw):].lstrip()[:3].upper() == "ON "}
+
+        futures = None
+
+        if parallel > 1 and materialize:
+            warn("The TEMP tables are only seen by the main connection, the steps will run one by one.")
+
+        elif parallel > 1 and self.many is None and self.my_db.open_pool(parallel):
+            futures = {s_idx: self.my_db.submit(self.correlated_sql(step) or step.sql, params=self.params)
+                       for s_idx, step in enumerate(commands)
+                       if (not keys or keys[s_idx] not in self.outputs) and (not step.outer or self.correlated_sql(step))
+                       and s_idx not in unjoined}
+
+        self.joins = []
+
+        old_command = None
+        previous = None # executed command and row count of the previous step of the request, for `diff`.
+        resolved: dict[str, str] = {} # placeholder -> sql to execute.
+        temp_tables: list[str] = []
+
+        for s_idx, step in enumerate(commands):
+
+            if step.first:
+                old_command = None
+                previous = None
+
+                if joins and step.request in finals:
+                    self.__print_joins(step.request, finals[step.request], sample[0] if sample is not None else None)
+
+            start = perf_counter()
+            exec_command = step.sql
+
+            if materialize and step.deps:
+                exec_command = self.__resolve(step.raw, resolved)
+
+            if materialize and step.last and step.outer: # run for each outer row, stays inlined.
+                resolved[f"@{step.request}"] = f"({exec_command})"
+
+            elif materialize and step.last and step.parent is not None:
+                table = f"_sqlv_{step.request}"
+
+                try:
+                    self.my_db.materialize(table, exec_command, self.params)
+                    temp_tables.append(table)
+                    resolved[f"@{step.request}"] = f"(SELECT * FROM temp.{table})"
+                    exec_command = f"SELECT * FROM temp.{table}"
+                except (sql.OperationalError, StepAborted) as e: # correlated sub-request, ...
+                    warn(f"Can't materialize the request {step.request} ({e}), it will be inlined.")
+                    resolved[f"@{step.request}"] = f"({exec_command})"
+
+            materialize_time = perf_counter() - start
+
+            request_idx = str(step.request)
+            sub_request = str(step.sub_request) if step.sub_request is not None else None
+
+            start = perf_counter()
+            old_command = self.term.print_step(request_idx, step.sql, old_command, sub_request, step.caret)
+            render_time = perf_counter() - start
+            start = perf_counter()
+
+            if s_idx in unjoined:
+                self.term.print_info("(join without its ON clause: not run, its rows are counted by the joins above)")
+                previous = None
+                continue
+
+            correlated = ", ".join(f"{qualifier}.{column}" for qualifier, column, _ in step.outer)
+
+            if step.outer: # the outer columns are unknown alone.
+                batched = self.correlated_sql(step, exec_command)
+
+                if batched is None:
+                    self.term.print_info(f"(correlated with {correlated}: runs for each outer row, can't be shown alone)")
+                    previous = None
+                    continue
+
+                exec_command = batched
+
+            key = keys[s_idx] if keys else None
+            kept = self.outputs.get(key) if key is not None else None
+
+            try:
+                if kept is not None:
+                    colums, rows, total = kept
+                    result = ResultStream(colums, rows=rows, preview_limit=self.my_db.preview_limit,
+                                          fetch_size=self.my_db.fetch_size, row_count=total)
+                    self.outputs.move_to_end(key)
+                    self.reused += 1
+                elif futures is not None:
+                    colums, result = futures[s_idx].result()
+                elif self.many is not None:
+                    colums, result = self.my_db.execute_many(exec_command, self.many)
+                else:
+                    colums, result = self.my_db.execute(command=exec_command,
+                                                        cache_key=step.sql if sample is None else
+                                                        f"{sample[0]} {step.sql}",
+                                                        keep_rows=self.outputs_rows if keys else 0,
+                                                        params=self.params)
+            except sql.OperationalError as e:
+                if not step.outer: # a real error.
+                    raise
+
+                # the batched command isn't valid (an unqualified column of both sides, ...).
+                self.term.print_info(f"(correlated with {correlated}: can't be run for all the outer keys at once "
+                                     f"({e}), runs for each outer row, can't be shown alone)")
+                previous = None
+                continue
+            except StepAborted as e: # the other steps go on.
+                self.term.print_info(f"(aborted: {e})")
+
+                if profile:
+                    records.append({
+                        "step": s_idx,
+                        "request": step.request,
+                        "sql": step.sql,
+                        "execute": materialize_time + perf_counter() - start,
+                        "fetch": 0.0,
+                        "render": render_time,
+                        "diff": 0.0,
+                        "total": materialize_time + perf_counter() - start + render_time,
+                        "rows": 0,
+                        "vm_steps": 0,
+                        "statement_cache_hit": None,
+                        "result_cache_hit": None,
+                        "aborted": str(e)
+                    })
+                continue
+
+            if kept is not None:
+                self.term.print_info("(unchanged, reused)")
+
+            elif result.cache_hit is not None:
+                self.term.print_info("(cache hit)" if result.cache_hit else "(cache miss)")
+
+            if step.outer:
+                self.term.print_info(f"(correlated with {correlated}: run once for all the outer keys, by key)")
+
+            if step.shared:
+                merged = ", ".join(str(request) for request in step.shared)
+                self.term.print_info(f"(shared with request {merged}: same sub-request, shown once"
+                                     + (", run once into its TEMP table)" if materialize else ")"))
+
+            if result.changes is not None:
+                self.term.print_info(f"({len(self.many)} row(s) by executemany, in one transaction: "
+                                     f"{result.changes} change(s))")
+            else:
+                fetch_before = result.fetch_time
+                start = perf_counter()
+                self.term.print_table(result, colums)
+                render_time += perf_counter() - start - (result.fetch_time - fetch_before) # without fetching.
+
+            if result.truncated:
+                self.term.print_info(f"(first {result.preview_limit} of {result.row_count} row(s))")
+
+            if result.aborted is not None:
+                self.term.print_info(f"(aborted: {result.aborted}, after {result.row_count} row(s))")
+
+            if sample is not None:
+                scale = 1.0
+
+                for table in {table.upper() for table in Explainer.table_aliases(step.raw).values()}:
+                    scale *= sample[1].get(table, 1.0)
+
+                if self.__aggregated(step.raw):
+                    self.term.print_info(f"(sampled: {result.row_count} row(s), aggregated, not extrapolated)")
+                else:
+                    self.term.print_info(f"(sampled: {result.row_count} row(s), ~{round(result.row_count * scale)} "
+                                         f"extrapolated to the full tables)")
+
+            if key is not None and kept is None:
+                self.__keep_output(key, colums, result)
+
+            diff_time = 0.0
+
+            if diff and previous is not None and previous[2] == step.outer and result.aborted is None:
+                start = perf_counter()
+                self.__print_diff(previous[0], exec_command, sample[0] if sample is not None else None,
+                                  self.__aggregated(step.raw), (previous[1], result.row_count), self.params)
+                diff_time = perf_counter() - start
+
+            previous = (exec_command, result.row_count, step.outer) if diff and result.aborted is None else None
+
+            if explainer is not None:
+                self.term.print_plan(explainer.explain(exec_command, self.params))
+
+            if profile:
+                row_count = result.row_count # fetch the rows left.
+
+                records.append({
+                    "step": s_idx,
+                    "request": step.request,
+                    "sql": step.sql,
+                    "execute": materialize_time + result.exec_time,
+                    "fetch": result.fetch_time,
+                    "render": render_time,
+                    "diff": diff_time,
+                    "total": materialize_time + result.exec_time + result.fetch_time + render_time + diff_time,
+                    "rows": row_count,
+                    "vm_steps": result.vm_steps,
+                    "statement_cache_hit": result.statement_hit,
+                    "result_cache_hit": result.cache_hit,
+                    "aborted": result.aborted
+                })
+
+        for table in temp_tables:
+            self.my_db.drop_temp(table)
+
+        cache = self.my_db.cache
+
+        if cache.enabled:
+            self.term.print_info(f"result cache: {cache.hits} hit(s), {cache.misses} miss(es), "
+                                 f"{len(cache.entries)} result(s), {cache.rows} row(s).")
+
+        if profile:
+            self.profile = {
+                "query": self.plan.key if self.plan is not None else None,
+                **self.timings,
+                "steps": records,
+                **({"joins": self.joins} if joins else {})
+            }
+            self.term.print_profile(self.profile)
+
+    def __run_sampled(self, fraction: float, cap: int, method: str, **options: Any) -> None:
+        """
+        Run the commands on TEMP samples of the tables they read, see `run`.
+        """
+
+        catalog = self.my_db.catalog()
+        tables: dict[str, str] = {} # UPPER -> name, the real tables only.
+
+        for step in self.commands:
+            for table in Explainer.table_aliases(step.sql).values():
+                name = catalog.table(table)
+
+                if name is not None and catalog.kinds[name.upper()] == "table":
+                    tables[name.upper()] = name
+
+        scales: dict[str, float] = {} # UPPER table -> full rows / sampled rows.
+        infos: list[str] = []
+        samples: list[str] = [] # the TEMP tables created.
+
+        for key, name in list(tables.items()):
+            if catalog.row_estimate(name) <= self.SAMPLE_MIN_ROWS: # small, kept whole.
+                del tables[key]
+
+        try:
+            for key, name in tables.items():
+                full = catalog.row_estimate(name)
+
+                try:
+                    sampled = self.my_db.shadow_sample(name, fraction, cap, method)
+                except (sql.OperationalError, StepAborted) as e: # query_only connection, ...
+                    warn(f"Can't sample the table {name} ({e}), it will be read whole.")
+                    continue
+
+                samples.append(name)
+                scales[key] = full / sampled if sampled else 1.0
+                infos.append(f"{name} {sampled}/{full}")
+
+            self.term.print_info(f"SAMPLED RUN ({method}, {fraction:g}, at most {cap} rows per table): "
+                                 + (", ".join(infos) or "no table sampled") + ".")
+
+            if options.get("parallel", 0) > 1:
+                warn("The samples are TEMP tables, only seen by the main connection, the steps will run one by one.")
+                options["parallel"] = 0
+
+            self.__run(commands=self.commands, sample=(f"SAMPLE {method} {fraction:g} {cap}", scales), **options)
+        finally:
+            for name in samples:
+                self.my_db.drop_temp(f'"{name}"')
+
+    def __print_joins(self, request: int, command: str, cache_prefix: str = None) -> None:
+        """
+        Print the `COUNT(*)` and the time of each stage of the joins of
+        `command` (`Explainer.join_stages`), and its fan-out: the rows of
+        the stage / the rows of the stage before. Only the counts are
+        fetched. The trace stops at the first stage over a budget.
+        """
+
+        stages = Explainer.join_stages(command)
+
+        if not stages:
+            return
+
+        prefix = "" if cache_prefix is None else f"{cache_prefix} "
+        before = None
+
+        self.term.print_info(f"JOINS OF REQUEST {request}:")
+
+        for idx, (clause, join) in enumerate(stages):
+            count = f"SELECT COUNT(*) FROM {clause}"
+            start = perf_counter()
+
+            try:
+                _, result = self.my_db.execute(count, cache_key=prefix + count, params=self.params)
+                rows = list(result)[0][0]
+            except StepAborted as e: # the next stages are bigger.
+                self.term.print_info(f"  {join}: (aborted: {e})")
+                break
+            except sql.Error as e:
+                self.term.print_info(f"  {join}: (error: {e})")
+                break
+
+            seconds = perf_counter() - start
+
+            if result.aborted is not None:
+                self.term.print_info(f"  {join}: (aborted: {result.aborted})")
+                break
+
+            fan_out = rows / before if before else None
+            self.joins.append({"request": request, "stage": idx, "join": join, "rows": rows,
+                               "fan_out": fan_out, "seconds": seconds})
+
+            text = f"  {join}: {rows} row(s)"
+
+            if fan_out is not None:
+                text += f", fan-out x{fan_out:.2f}" + (" (!)" if fan_out >= self.FAN_OUT_ALERT else "")
+
+            self.term.print_info(text + f", {seconds * 1000:.3f} ms" + (" (cache hit)" if result.cache_hit else ""))
+            before = rows
+
+    @staticmethod
+    def __aggregated(command: str) -> bool:
+        """
+        True if `command` uses an aggregate function (its rows are not rows of the tables).
+        """
+
+        return any(kind == "word" and command[start:end].upper() in SqlInfos.AGGREGATES
+                   for kind, start, end in Tokenizer.tokenize(command))
+
+    def __print_diff(self, before: str, after: str, cache_prefix: str = None, aggregated: bool = False,
+                     counts: tuple[int, int] = None, params: dict[str, Any] = None) -> None:
+        """
+        Print the rows of the step `before` removed by the condition of the
+        step `after` (`aggregated`: changed, the aggregates are computed
+        again on the rows left).
+        """
+
+        try:
+            total, left, removed, columns, rows = self.my_db.diff(before, after, cache_prefix, counts, params)
+        except (sql.Error, StepAborted) as e: # GROUP BY changing the columns, budget, ...
+            self.term.print_info(f"(no diff with the previous step: {e})")
+            return
+
+        what = "changed" if aggregated else "removed"
+        self.term.print_info(f"(condition: {total} -> {left} row(s), {removed} distinct row(s) {what})")
+
+        if removed:
+            self.term.print_table(rows, columns)
+
+            if self.my_db.preview_limit is not None and removed > self.my_db.preview_limit:
+                self.term.print_info(f"(first {self.my_db.preview_limit} of {removed} {what} row(s))")
+
+    def __keep_output(self, key: str, columns: list[str], result: ResultStream) -> None:
+        """
+        Keep the output of a step for the next `run(reuse=True)`, if all the
+        rows to show are known (LRU of `outputs_rows` rows).
+        """
+
+        total = result.row_count
+        shown = total if result.preview_limit is None else min(total, result.preview_limit)
+
+        if result.aborted is not None or len(result.rows) < shown or shown > self.outputs_rows:
+            return
+
+        self.outputs[key] = (columns, result.rows[:shown], total)
+
+        while sum(len(rows) for _, rows, _ in self.outputs.values()) > self.outputs_rows:
+            self.outputs.popitem(last=False)
+
+    def write_report(self, path: str, profile: dict[str, Any] = None) -> None:
+        """
+        Write the profile of the last run (or `profile`) in `path`: json,
+        or one json line per step if `path` ends with `.ndjson`.
+
+        The profile: "query" (key of the plan), the "plan_cached", "parse"
+        and "flatten" timings, "steps" and "joins" (with `joins`). A step:
+        "step", "request", "sql", "execute", "fetch", "render", "diff" and
+        "total" (their sum, in seconds), "rows", "vm_steps",
+        "statement_cache_hit", "result_cache_hit" and "aborted". A line of
+        ndjson is a step with the keys of the profile but "steps".
+        """
+
+        profile = self.profile if profile is None else profile
+
+        if profile is None:
+            warn("Nothing to write, run the interpreter with profile=True first.")
+            return
+
+        with open(path, "w", encoding="utf-8") as file:
+            if not path.endswith(".ndjson"):
+                json.dump(profile, file, ensure_ascii=False, indent=4)
+                return
+
+            infos = {key: value for key, value in profile.items() if key != "steps"}
+
+            for record in profile["steps"]:
+                file.write(json.dumps({**infos, **record}, ensure_ascii=False) + "\n")
+
+    def run(self, materialize: bool = False, parallel: int = 0, profile: bool = False,
+            report: str = None, explain: bool = False, reuse: bool = False, sample: float = None,
+            sample_cap: int = 10_000, sample_method: str = "stride", then_full: bool = False,
+            diff: bool = False, joins: bool = False) -> None:
+        """
+        Run the sql command.
+
+        `materialize`: run each sub-request once into a TEMP table.
+        `parallel`: number of read only connections running the steps.
+        `profile`: measure each step, print a summary, and write it in
+        `report` (json or ndjson) if given.
+        `explain`: print the EXPLAIN QUERY PLAN of each step, with the full
+        scans, temp b-trees and the indexes to create.
+        `reuse`: the outputs of the steps that haven't changed since the
+        last run (see `step_keys`) are shown again without running them,
+        unless the data has changed (`PRAGMA data_version`).
+        `sample`: a quick walk-through on samples of the tables (TEMP
+        copies, a `sample` fraction of the rows, at most `sample_cap`,
+        `sample_method` "stride" or "random"), with the row counts
+        extrapolated to the full tables. `then_full`: run on the full
+        tables after it.
+        `diff`: show, after each condition step, the rows its condition
+        removed from the previous step (computed by sqlite with `EXCEPT`).
+        `joins`: show the `COUNT(*)` of the FROM clause of each request, one
+        join added at a time, with the fan-out of each join (kept in
+        `self.joins`).
+        """
+
+        if self.commands == []:
+            warn("The Interpreter.command is empty ! Because it has received" \
+            " nothing to interpret first.")
+            return
+
+        options = {"materialize": materialize, "parallel": parallel, "profile": profile or report is not None,
+                   "explain": explain, "diff": diff, "joins": joins}
+
+        if sample is not None and self.many is not None:
+            warn("An INSERT is not sampled, it runs on the full tables.")
+            sample = None
+
+        if sample is not None:
+            self.__run_sampled(sample, sample_cap, sample_method, **options)
+
+            if not then_full:
+                if report is not None:
+                    self.write_report(report)
+                return
+
+        self.__run(commands=self.commands, reuse=reuse, **options)
+
+        if report is not None:
+            self.write_report(report)
+
+    def interpret(self, arg: str, params: Any = None) -> None:
+        """
+        interpret a sql command.
+
+        `params`: the values of its parameters, a sequence for the `?` or a
+        dict for the `:name` (the plan and the compiled statements are the
+        same for all the values). An `INSERT ... VALUES` of literals is
+        interpreted as one prepared statement run with `executemany`.
+        """
+
+        if arg is None or arg == "":
+            warn("The variable arg from Interpreter.interpret is None or empty !")
+            return
+
+        self.params = None
+        self.many = None
+        bulk = Tokenizer.values_rows(arg) if params is None else None
+
+        if bulk is not None:
+            arg, self.many = bulk
+        elif params is not None:
+            arg, self.params = Tokenizer.bind(arg, params)
+
+        start = perf_counter()
+        key = Tokenizer.normalize(arg)
+        plan = self.__get_plan(key)
+        self.timings = {"plan_cached": plan is not None, "parse": 0.0, "flatten": 0.0}
+
+        if plan is None:
+            parsed_dict = self.__parse(arg)
+            self.timings["parse"] = perf_counter() - start
+
+            start = perf_counter()
+            plan = ExecutionPlan(key, parsed_dict, self.__getCommands(parsed_dict))
+            self.timings["flatten"] = perf_counter() - start
+
+            self.__keep_plan(plan)
+        else:
+            self.timings["parse"] = perf_counter() - start # only the normalization.
+
+        self.plan = plan
+        self.commands = plan.steps
+
+    def __plan_path(self, key: str) -> Path:
+        return self.plan_dir / (sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def __get_plan(self, key: str) -> ExecutionPlan | None:
+        """
+        Return the plan of `key` from the memory or from the disk, or None.
+        """
+
+        plan = self.PLANS.get(key)
+
+        if plan is not None:
+            self.PLANS.move_to_end(key)
+            return plan
+
+        if self.plan_dir is None:
+            return None
+
+        plan = ExecutionPlan.load(self.__plan_path(key), key)
+
+        if plan is not None:
+            self.__keep_plan(plan, save=False)
+
+        return plan
+
+    def __keep_plan(self, plan: ExecutionPlan, save: bool = True) -> None:
+        """
+        Keep `plan` in memory (LRU of `PLANS_SIZE` plans), and on the disk.
+        """
+
+        self.PLANS[plan.key] = plan
+
+        while len(self.PLANS) > self.PLANS_SIZE:
+            self.PLANS.popitem(last=False)
+
+        if save and self.plan_dir is not None:
+            try:
+                self.plan_dir.mkdir(parents=True, exist_ok=True)
+                plan.save(self.__plan_path(plan.key))
+            except OSError as e:
+                warn(f"Can't save the plan in {self.plan_dir} ({e}).")
+
+class AsyncInterpreter(Interpreter):
+    """
+    An `Interpreter` for asyncio, with an `AsyncDatabaseSystem`.
+    """
+
+    async def run_async(self, render: bool = False) -> Any:
+        """
+        Run the steps (all at once on the pool of `my_db`), and yield them
+        in order when they are ready, as dicts: step, request, sql,
+        sub_request, caret, columns and result (a `ResultStream` with the
+        preview rows already fetched).
+
+        With `render`, each step is also printed, in a thread.
+
+        Cancelling the task (or closing the iterator) interrupts the
+        statements still running.
+        """
+
+        if self.commands == []:
+            warn("The Interpreter.command is empty ! Because it has received" \
+            " nothing to interpret first.")
+            return
+
+        loop = asyncio.get_running_loop()
+        self.my_db.start_run()
+        self.term.catalog = self.my_db.catalog()
+        tasks = [asyncio.ensure_future(self.my_db.execute_async(self.correlated_sql(step) or step.sql,
+                                                                params=self.params))
+                 for step in self.commands]
+        old_command = None
+
+        try:
+            for s_idx, (step, task) in enumerate(zip(self.commands, tasks)):
+                try:
+                    columns, result = await task
+                    aborted = result.aborted
+                except StepAborted as e: # the other steps go on.
+                    columns, result, aborted = [], None, str(e)
+                except sql.OperationalError as e:
+                    if not step.outer:
+                        raise
+
+                    columns, result, aborted = [], None, f"correlated, can't be run for all the outer keys at once ({e})"
+
+                if render and result is None:
+                    await loop.run_in_executor(None, self.term.print_info, f"(aborted: {aborted})")
+
+                elif render:
+                    if step.first:
+                        old_command = None
+
+                    old_command = await loop.run_in_executor(None, self.__render, step, columns, result,
+                                                             old_command)
+
+                yield {
+                    "step": s_idx,
+                    "request": step.request,
+                    "sql": step.sql,
+                    "sub_request": step.sub_request,
+                    "caret": step.caret,
+                    "columns": columns,
+                    "result": result,
+                    "aborted": aborted
+                }
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def __render(self, step: PlanStep, columns: list[str], result: ResultStream, old_command: str | None) -> str:
+        """
+        Print a step, return the "cleaned" request.
+        """
+
+        sub_request = str(step.sub_request) if step.sub_request is not None else None
+        old_command = self.term.print_step(str(step.request), step.sql, old_command, sub_request, step.caret)
+
+        if result.cache_hit is not None:
+            self.term.print_info("(cache hit)" if result.cache_hit else "(cache miss)")
+
+        self.term.print_table(result, columns)
+
+        if result.truncated:
+            self.term.print_info(f"(first {result.preview_limit} of {result.row_count} row(s))")
+
+        if result.aborted is not None:
+            self.term.print_info(f"(aborted: {result.aborted}, after {result.row_count} row(s))")
+
+        return old_command
+
+class Watcher:
+    """
+    Run the request of a .sql file again each time the file is saved.
+    Only the steps whose request subtree has changed are executed again,
+    the others are reused (see `Interpreter.run`, `reuse`), unless the
+    data has changed.
+    """
+
+    def __init__(self, interpreter: Interpreter, path: str, interval: float = 0.5, **options: Any) -> None:
+        """
+        init. (`interval`: seconds between two checks of the file, `options`:
+        given to `Interpreter.run`.)
+        """
+
+        self.interpreter = interpreter
+        self.path = Path(path)
+        self.interval = interval
+        self.options = options
+
+        self.mtime: float | None = None
+        self.text: str | None = None
+        self.runs: int = 0
+
+    def check(self) -> bool:
+        """
+        Run the request if the file has changed, return True if it ran.
+        """
+
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError as e:
+            warn(f"Can't read {self.path} ({e}).")
+            return False
+
+        if mtime == self.mtime:
+            return False
+
+        self.mtime = mtime
+        statements, rest = Tokenizer.split(self.path.read_text(encoding="utf-8") + ";")
+
+        if statements == []:
+            return False
+
+        if len(statements) > 1:
+            warn(f"{self.path} has {len(statements)} statements, only the first one is watched.")
+
+        if statements[0] == self.text: # saved without change.
+            return False
+
+        self.text = statements[0]
+        self.runs += 1
+
+        start = perf_counter()
+        self.interpreter.interpret(self.text)
+        self.interpreter.run(reuse=True, **self.options)
+
+        steps = len(self.interpreter.commands)
+        self.interpreter.term.print_info(f"run {self.runs}: {steps - self.interpreter.reused} step(s) executed, "
+                                         f"{self.interpreter.reused} reused, in {perf_counter() - start:.3f} s.")
+
+        return True
+
+    def watch(self, runs: int = None) -> None:
+        """
+        Check the file every `interval` seconds, until Ctrl+C (or `runs` runs).
+        """
+
+        try:
+            while runs is None or self.runs < runs:
+                self.check()
+                sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+
+# state of a BatchRunner worker process (see `BatchRunner.run`).
+_WORKER: dict[str, Any] = {}
+
+def _batch_init(path: str, sink: str, options: dict[str, Any], governor: ResourceGovernor = None,
+                profile: str = "readonly", cached_statements: int = 128, colors: bool = False) -> None:
+    """
+    Open the read only connection of a worker. (`colors`: of the "text"
+    output, written in a buffer.)
+    """
+
+    db = DatabaseSystem(cached_statements=cached_statements)
+    db.connect(path, profile=profile)
+    db.set_governor(governor)
+
+    _WORKER.update(db=db, sink=sink, options=options, colors=colors)
+
+def _batch_run(item: tuple[int, str]) -> tuple[int, str, list[float], str | None]:
+    """
+    Run one statement with its own interpreter, in a worker.
+
+    return the index of the statement, its output, the step latencies
+    and the error (or None).
+    """
+
+    index, statement = item
+    out = StringIO()
+    if _WORKER["sink"] == "text":
+        term = Terminal(out, colors=_WORKER["colors"])
+    else:
+        term = BatchRunner.TERMINALS[_WORKER["sink"]](out)
+
+    interpreter = Interpreter(_WORKER["db"], term)
+
+    try:
+        interpreter.interpret(statement)
+        interpreter.run(profile=True, **_WORKER["options"])
+    except Exception as e: # one bad statement must not stop the corpus.
+        return index, out.getvalue(), [], f"{type(e).__name__}: {e}"
+
+    steps = interpreter.profile["steps"] if interpreter.profile is not None else []
+
+    return index, out.getvalue(), [record["total"] for record in steps], None
+
+class BatchRunner:
+    """
+    Run a corpus of requests (a .sql script or a query log), one
+    statement at a time, on a pool of processes with one read only
+    connection each.
+    """
+
+    TERMINALS: dict[str, type[Terminal]] = {"text": Terminal, **SINKS}
+
+    def __init__(self, path: str, workers: int = 1, sink: str = "ndjson", chunk_size: int = 16,
+                 governor: ResourceGovernor = None, profile: str = "readonly", cached_statements: int = 128,
+                 **options: Any) -> None:
+        """
+        init. (`governor`: budgets of the steps of each statement, `profile`:
+        a read only connection profile of `File.PROFILES`, `cached_statements`:
+        compiled statements kept by each connection, for the logs replaying
+        the same requests, `options`: given to `Interpreter.run`, as
+        `materialize`.)
+        """
+
+        if sink not in self.TERMINALS:
+            warn(f"Unknown sink {sink!r} in BatchRunner, ndjson is used.")
+            sink = "ndjson"
+
+        self.path = path
+        self.workers = workers
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.governor = governor
+        self.profile = profile
+        self.cached_statements = cached_statements
+        self.options = options
+        self.summary: dict[str, Any] = None
+
+    def run(self, statements: Any, out: Any) -> dict[str, Any]:
+        """
+        Run the `statements` (an iterable, see `Tokenizer.statements`), and
+        write the output of each one in `out`, in order, as they end.
+
+        return the summary: queries, errors, queries/s, p50 and p99 of the
+        step latencies (in seconds).
+        """
+
+        items = enumerate(statements)
+        colors = hasattr(out, "isatty") and out.isatty()
+        latencies: list[float] = []
+        queries = errors = 0
+        start = perf_counter()
+
+        if self.workers > 1:
+            pool = Pool(self.workers, _batch_init, (self.path, self.sink, self.options, self.governor,
+                                                     self.profile, self.cached_statements, colors))
+            results = pool.imap(_batch_run, items, self.chunk_size)
+        else:
+            pool = None
+            _batch_init(self.path, self.sink, self.options, self.governor, self.profile, self.cached_statements,
+                        colors)
+            results = map(_batch_run, items)
+
+        try:
+            for index, output, steps, error in results:
+                queries += 1
+                latencies.extend(steps)
+
+                out.write(self.__mark(index, "statement"))
+                out.write(output)
+
+                if error is not None:
+                    errors += 1
+                    out.write(self.__mark(index, "error", error))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            else:
+                _WORKER["db"].close()
+
+        elapsed = perf_counter() - start
+        latencies.sort()
+
+        def _quantile(q: float) -> float:
+            return latencies[int(q * (len(latencies) - 1))] if latencies else 0.0
+
+        self.summary = {
+            "queries": queries,
+            "errors": errors,
+            "steps": len(latencies),
+            "seconds": elapsed,
+            "queries_per_second": queries / elapsed if elapsed else 0.0,
+            "p50": _quantile(0.50),
+            "p99": _quantile(0.99)
+        }
+
+        return self.summary
+
+    def __mark(self, index: int, event: str, text: str = None) -> str:
+        """
+        return the line marking the start (`event`="statement") or the
+        error (`event`="error") of the statement `index`, in the sink format.
+        """
+
+        if self.sink == "ndjson":
+            return json.dumps({"event": event, "statement": index, "text": text}, ensure_ascii=False,
+                              separators=(",", ":")) + "\n"
+
+        if self.sink == "csv":
+            line = StringIO()
+            csv.writer(line, lineterminator="\n").writerow([f"#{event}", index] + ([text] if text else []))
+            return line.getvalue()
+
+        return f"{event.upper()} {index}" + (f": {text}" if text else "") + "\n\n"
 
 if __name__ == "__main__":
 
     def main():
+        import argparse
+        from sys import stdin, stderr
+
         command = """
     SELECT ENNEMIS.Titre FROM ENNEMIS 
     WHERE ENNEMIS.Age < (
@@ -609,17 +4572,93 @@ if __name__ == "__main__":
     );
         """
 
-        db = DatabaseSystem()
-        db.connect("dbSuperHeros_eleve.db")
+        parser = argparse.ArgumentParser(description="Show how sql requests are executed, step by step.")
+        parser.add_argument("script", nargs="?", default=None,
+                            help="a .sql script or a query log (- for stdin). The example request if not given.")
+        parser.add_argument("--db", default="dbSuperHeros_eleve.db")
+        parser.add_argument("--profile", choices=sorted(File.PROFILES), default=None,
+                            help="connection profile (default: \"default\", \"readonly\" for a script).")
+        parser.add_argument("--workers", type=int, default=1, help="processes running the statements.")
+        parser.add_argument("--out", default=None, help="file for the results (stdout by default).")
+        parser.add_argument("--sink", choices=sorted(BatchRunner.TERMINALS), default=None,
+                            help="output format (default: text on a terminal, else ndjson, or csv for a .csv out).")
+        parser.add_argument("--timeout", type=float, default=None, help="seconds per step.")
+        parser.add_argument("--vm-steps", type=int, default=None, help="VM instructions per step.")
+        parser.add_argument("--max-rows", type=int, default=None, help="rows fetched per step.")
+        parser.add_argument("--watch", action="store_true",
+                            help="run the script again at each save, only the changed steps are executed.")
+        parser.add_argument("--sample", type=float, default=None,
+                            help="quick run on TEMP samples of the tables (fraction of the rows).")
+        parser.add_argument("--split", choices=["auto", "semicolon", "line"], default="auto",
+                            help="statements of the script: on the `;`, one per line (a query log), or found.")
+        parser.add_argument("--cached-statements", type=int, default=128,
+                            help="compiled statements kept by each connection.")
+        parser.add_argument("--joins", action="store_true",
+                            help="show the COUNT(*) and the fan-out of each join.")
+        parser.add_argument("--diff", action="store_true",
+                            help="show the rows removed by each condition (computed by sqlite).")
+        parser.add_argument("--materialize", action="store_true")
+        parser.add_argument("--explain", action="store_true")
+        args = parser.parse_args()
+
+        governor = None
+
+        if args.timeout is not None or args.vm_steps is not None or args.max_rows is not None:
+            governor = ResourceGovernor(timeout=args.timeout, vm_steps=args.vm_steps, max_rows=args.max_rows)
+
+        if args.db != ":memory:" and not Path(args.db).exists() and args.profile != "create":
+            parser.error(f"the database {args.db} doesn't exist.")
+
+        if args.script is None: # the example.
+            db = DatabaseSystem(cached_statements=args.cached_statements)
+            db.connect(args.db, profile=args.profile)
+            db.set_governor(governor)
+
+            term = Terminal.auto()
+
+            inter = Interpreter(db, term)
+
+            inter.interpret(command)
+            inter.run(materialize=args.materialize, explain=args.explain, sample=args.sample, diff=args.diff,
+                      joins=args.joins)
+            return
+
+        if args.watch and args.script not in {None, "-"}:
+            db = DatabaseSystem(cached_statements=args.cached_statements)
+            db.connect(args.db, profile=args.profile)
+            db.set_governor(governor)
+
+            Watcher(Interpreter(db, Terminal.auto()), args.script,
+                    materialize=args.materialize, explain=args.explain, diff=args.diff,
+                    joins=args.joins).watch()
+            return
+
+        out = stdout if args.out is None else open(args.out, "w", encoding="utf-8")
+        sink = args.sink
+
+        if sink is None:
+            sink = "csv" if str(args.out).endswith(".csv") else "text" if out.isatty() else "ndjson"
 
-        term = Terminal()
+        lines = stdin if args.script == "-" else open(args.script, encoding="utf-8")
+        runner = BatchRunner(args.db, workers=args.workers, sink=sink, governor=governor,
+                             profile=args.profile or "readonly", cached_statements=args.cached_statements,
+                             materialize=args.materialize, explain=args.explain, sample=args.sample,
+                             diff=args.diff, joins=args.joins)
 
-        inter = Interpreter(db, term)
+        try:
+            per_line = {"auto": None, "semicolon": False, "line": True}[args.split]
+            summary = runner.run(Tokenizer.statements(lines, per_line), out)
+        finally:
+            if lines is not stdin:
+                lines.close()
+            if out is not stdout:
+                out.close()
 
-        inter.interpret(command)
-        inter.run()
+        print(f"{summary['queries']} request(s), {summary['errors']} error(s), {summary['steps']} step(s) "
+              f"in {summary['seconds']:.2f} s: {summary['queries_per_second']:.1f} requests/s, "
+              f"p50 {summary['p50'] * 1000:.3f} ms, p99 {summary['p99'] * 1000:.3f} ms per step.", file=stderr)
 
     #import cProfile
     #cProfile.run("main()")
     
-    main()
\ No newline at end of file
+    main()
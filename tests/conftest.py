@@ -0,0 +1,34 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def heros_db(tmp_path: Path) -> str:
+    """
+    A small database with the tables of the examples.
+    """
+
+    path = tmp_path / "heros.db"
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE HEROS (Id INTEGER PRIMARY KEY, Titre TEXT, Age INTEGER, Force INTEGER, Ville TEXT);
+        CREATE TABLE ARMES (Id INTEGER PRIMARY KEY, Id_Heros INTEGER, Type TEXT, Puissance INTEGER);
+        CREATE TABLE t (id INTEGER);
+        CREATE TABLE t2 (id INTEGER);
+        INSERT INTO t VALUES (1), (2);
+        INSERT INTO t2 VALUES (1), (3);
+    """)
+    connection.executemany("INSERT INTO HEROS VALUES (?, ?, ?, ?, ?)",
+                           [(i, f"Hero{i}", 20 + i % 40, 10 + i * 7 % 90, "Paris" if i % 2 else "Lyon")
+                            for i in range(1, 1201)])
+    connection.executemany("INSERT INTO ARMES VALUES (?, ?, ?, ?)",
+                           [(i, i % 5 + 1, "Epee", i * 3) for i in range(1, 9)])
+    connection.commit()
+    connection.close()
+
+    return str(path)
@@ -0,0 +1,116 @@
+import asyncio
+from time import perf_counter
+
+import pytest
+
+from SQLviewer import AsyncDatabaseSystem, ConnectionProfile
+
+COUNT = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < {n}) SELECT COUNT(*) FROM c"
+
+
+async def _wait_running(db: AsyncDatabaseSystem) -> None:
+    # until the statement runs on a connection of the pool.
+    while not db.running or next(iter(db.running.values()))[1].connection is None:
+        await asyncio.sleep(0.01)
+
+
+def test_cancel_one_caller_of_a_shared_statement(heros_db):
+    async def main() -> None:
+        db = AsyncDatabaseSystem(workers=2)
+        db.connect(heros_db)
+        command = COUNT.format(n=3_000_000)
+
+        first = asyncio.ensure_future(db.execute_async(command))
+        await _wait_running(db)
+        second = asyncio.ensure_future(db.execute_async(command))
+        await asyncio.sleep(0.05)
+
+        first.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        columns, result = await second
+        assert list(result) == [(3_000_000,)]
+        assert result.cache_hit
+
+    asyncio.run(main())
+
+
+def test_cancel_all_callers_interrupts(heros_db):
+    async def main() -> None:
+        db = AsyncDatabaseSystem(workers=2)
+        db.connect(heros_db)
+        command = COUNT.format(n=100_000_000)
+
+        tasks = [asyncio.ensure_future(db.execute_async(command))]
+        await _wait_running(db)
+        tasks.append(asyncio.ensure_future(db.execute_async(command)))
+        await asyncio.sleep(0.05)
+
+        start = perf_counter()
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        while db.running: # interrupted, not run to the end.
+            await asyncio.sleep(0.01)
+            assert perf_counter() - start < 2.0
+
+    asyncio.run(main())
+
+
+def test_connect_keeps_profile_and_warm_up(heros_db, monkeypatch):
+    warmed: list[int] = []
+    warm = ConnectionProfile.warm
+
+    def _warm(profile: ConnectionProfile, path: str, chunk_size: int = 1024 * 1024, warm_up: int = None) -> int:
+        warmed.append(warm_up)
+        return warm(profile, path, chunk_size, warm_up)
+
+    monkeypatch.setattr(ConnectionProfile, "warm", _warm)
+
+    db = AsyncDatabaseSystem(workers=1)
+    db.connect(heros_db, profile="readonly", warm_up=4096)
+
+    assert db.profile.mode == "ro"
+    assert warmed == [4096]
+    db.close()
+
+
+def test_in_memory_doesnt_block_the_loop():
+    async def main() -> None:
+        db = AsyncDatabaseSystem()
+        db.connect(":memory:")
+        assert db.pool is None
+
+        ticks = 0
+
+        async def _tick() -> None:
+            nonlocal ticks
+
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.ensure_future(_tick())
+        columns, result = await db.execute_async(COUNT.format(n=1_000_000))
+        ticker.cancel()
+
+        assert list(result) == [(1_000_000,)]
+        assert ticks > 1 # the loop went on during the statement.
+
+        task = asyncio.ensure_future(db.execute_async(COUNT.format(n=100_000_000)))
+        await asyncio.sleep(0.05)
+        start = perf_counter()
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        db.close() # waits for the statement, interrupted.
+        assert perf_counter() - start < 2.0
+
+    asyncio.run(main())
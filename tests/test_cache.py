@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+
+from SQLviewer import DatabaseSystem, ResultCache
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_rows=3)
+
+    cache.put("a", ["x"], [(1,), (2,)])
+    cache.put("b", ["x"], [(3,)])
+    assert cache.get("a") is not None # "b" is now the oldest.
+
+    cache.put("c", ["x"], [(4,)])
+    assert cache.get("b") is None
+    assert cache.get("a") == (["x"], [(1,), (2,)])
+    assert cache.rows == 3
+
+    cache.put("d", ["x"], [(5,)] * 4) # bigger than the cache, not kept.
+    assert cache.get("d") is None and cache.rows == 3
+
+
+def test_clear_takes_the_lock():
+    cache = ResultCache()
+    cache.put("a", ["x"], [(1,)])
+
+    with cache.lock: # a thread of the pool adding a result.
+        clearing = threading.Thread(target=cache.clear)
+        clearing.start()
+        clearing.join(0.1)
+        assert clearing.is_alive() and cache.rows == 1
+
+    clearing.join()
+    assert cache.entries == {} and cache.rows == 0 and cache.bytes == 0
+
+
+def test_same_step_is_a_hit(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+
+    columns, result = db.execute("SELECT COUNT(*) FROM HEROS")
+    assert (result.cache_hit, list(result)) == (False, [(1200,)])
+
+    columns, result = db.execute("select  count(*)\nfrom HEROS -- the key is normalized.")
+    assert (result.cache_hit, list(result)) == (True, [(1200,)])
+
+    columns, result = db.execute("SELECT COUNT(*) FROM HEROS WHERE Id > 600")
+    assert result.cache_hit is False
+
+
+def test_cleared_when_the_data_changes(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    list(db.execute("SELECT COUNT(*) FROM t")[1])
+
+    db.execute("INSERT INTO t VALUES (3)") # this connection.
+    db.mydb.commit()
+    columns, result = db.execute("SELECT COUNT(*) FROM t")
+    assert (result.cache_hit, list(result)) == (False, [(3,)])
+
+    other = sqlite3.connect(heros_db) # another connection.
+    other.execute("INSERT INTO t VALUES (4)")
+    other.commit()
+    other.close()
+
+    columns, result = db.execute("SELECT COUNT(*) FROM t")
+    assert (result.cache_hit, list(result)) == (False, [(4,)])
+
+
+def test_temp_tables_keep_the_cache(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    list(db.execute("SELECT COUNT(*) FROM t")[1])
+
+    db.materialize("_sqlv_1", "SELECT * FROM t")
+    db.drop_temp("_sqlv_1")
+
+    assert db.execute("SELECT COUNT(*) FROM t")[1].cache_hit is True
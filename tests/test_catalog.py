@@ -0,0 +1,36 @@
+import sqlite3
+
+from SQLviewer import DatabaseSystem, SchemaCatalog
+
+
+def test_cached_until_the_schema_changes(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+
+    catalog = db.catalog()
+    columns, version = catalog.columns, catalog.version
+
+    assert catalog.columns_of("heros") == {"ID", "TITRE", "AGE", "FORCE", "VILLE"}
+    assert db.catalog() is catalog and catalog.columns is columns # not rebuilt.
+    assert catalog.indexed_columns("HEROS") == {"ID"} # the rowid.
+
+    db.mydb.execute("CREATE INDEX idx_HEROS_Age ON HEROS(Age)")
+    db.mydb.execute("CREATE TABLE TYPES (Id INTEGER PRIMARY KEY, Nom TEXT)")
+
+    assert db.catalog() is catalog
+    assert catalog.version != version and catalog.columns is not columns
+    assert catalog.indexed_columns("HEROS") == {"ID", "AGE"}
+    assert catalog.table("types") == "TYPES"
+
+
+def test_rebuilt_after_ddl_of_another_connection(heros_db):
+    connection = sqlite3.connect(heros_db)
+    catalog = SchemaCatalog.of(connection)
+    assert catalog.table("ENNEMIS") is None
+
+    other = sqlite3.connect(heros_db)
+    other.execute("CREATE TABLE ENNEMIS (Id INTEGER)")
+    other.commit()
+
+    assert SchemaCatalog.of(connection).table("ENNEMIS") == "ENNEMIS"
+    SchemaCatalog.forget(connection)
@@ -0,0 +1,32 @@
+import sqlite3
+
+import pytest
+
+from SQLviewer import DatabaseSystem, File
+
+
+def test_no_warm_up_by_default(heros_db):
+    assert File.PROFILES["analytics-readonly"].warm_up == 0
+    assert File.PROFILES["analytics-readonly"].warm(heros_db) == 0
+    assert File.PROFILES["analytics-readonly"].warm(heros_db, warm_up=-1) > 0
+
+
+def test_shared_connection_and_temp_tables(heros_db):
+    first, second = DatabaseSystem(), DatabaseSystem()
+    first.connect(heros_db, profile="readonly")
+    second.connect(heros_db, profile="readonly")
+
+    assert first.mydb is second.mydb
+
+    first.materialize("_sqlv_1", "SELECT Id FROM HEROS")
+
+    assert first.mydb is not second.mydb
+    assert list(first.execute("SELECT COUNT(*) FROM temp._sqlv_1")[1]) == [(1200,)]
+
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        second.execute("SELECT * FROM temp._sqlv_1")
+
+    assert second.data_version()[1] == 0 # its cache isn't cleared by the other one.
+
+    first.close()
+    second.close()
@@ -0,0 +1,59 @@
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal
+
+
+def _run(heros_db: str, request: str) -> tuple[Interpreter, DatabaseSystem, str]:
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    out = StringIO()
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret(request)
+    interpreter.run()
+
+    return interpreter, db, out.getvalue()
+
+
+def test_every_outer_key_is_shown(heros_db):
+    interpreter, db, text = _run(heros_db, "SELECT H.Titre, (SELECT COUNT(Id) FROM ARMES "
+                                           "WHERE ARMES.Id_Heros = H.Id) AS n FROM HEROS AS H")
+    step = interpreter.commands[1]
+    assert step.outer == (("H", "Id", "HEROS"),)
+
+    rows = list(db.execute(interpreter.correlated_sql(step))[1])
+    assert len(rows) == 1200
+    assert rows[:6] == [(1, 1), (2, 2), (3, 2), (4, 2), (5, 1), (6, 0)]
+
+    interpreter, db, text = _run(heros_db, "SELECT H.Titre, (SELECT ARMES.Type FROM ARMES "
+                                           "WHERE ARMES.Id_Heros = H.Id) AS t FROM HEROS AS H")
+    rows = list(db.execute(interpreter.correlated_sql(interpreter.commands[1]))[1])
+    assert len(rows) == 1200 + 3 # the heros with several weapons.
+    assert (6, None) in rows
+
+
+def test_aggregated_is_one_query(heros_db):
+    for aggregate, empty in (("COUNT(*)", 0), ("MAX(Puissance)", None)):
+        sub_request = f"SELECT {aggregate} FROM ARMES WHERE ARMES.Id_Heros = H.Id AND Id > 3"
+        interpreter, db, text = _run(heros_db, f"SELECT H.Titre, ({sub_request}) AS n FROM HEROS AS H")
+        batched = interpreter.correlated_sql(interpreter.commands[2])
+
+        assert batched.upper().count("SELECT") == 3 # the keys, the marker, no sub-select per key.
+        assert "LEFT JOIN" in batched and "GROUP BY" in batched
+        assert '"ARMES".Id > 3' in batched # else ambiguous with the key H.Id.
+
+        rows = list(db.execute(batched)[1])
+
+        assert rows == list(db.execute(f"SELECT H.Id, ({sub_request}) FROM HEROS AS H ORDER BY H.Id")[1])
+        assert rows[5] == (6, empty) # no weapon: COUNT(*) is 0, not 1.
+        assert "can't be run for all the outer keys at once" not in text
+
+
+def test_ambiguous_column(heros_db):
+    interpreter, db, text = _run(heros_db, "SELECT H.Titre, (SELECT ARMES.Type FROM ARMES "
+                                           "WHERE ARMES.Id_Heros = H.Id AND Id > 3) AS t FROM HEROS AS H")
+    rows = list(db.execute(interpreter.correlated_sql(interpreter.commands[2]))[1])
+
+    assert "can't be run for all the outer keys at once" not in text
+    assert rows[:3] == [(1, "Epee"), (2, "Epee"), (3, "Epee")]
+    assert len(rows) == 1200
@@ -0,0 +1,34 @@
+from SQLviewer import DatabaseSystem, Explainer
+
+
+def _explainer(heros_db: str) -> Explainer:
+    db = DatabaseSystem()
+    db.connect(heros_db)
+
+    return Explainer(db, large_table=1000)
+
+
+def test_scan_forms():
+    for detail in ("SCAN HEROS", "SCAN TABLE HEROS", "SCAN TABLE HEROS AS H"):
+        assert Explainer.SCAN_RE.match(detail).group(1) == "HEROS"
+
+    for detail in ("SEARCH H USING AUTOMATIC COVERING INDEX (Id=?)",
+                   "SEARCH TABLE H USING AUTOMATIC COVERING INDEX (Id=?)"):
+        assert Explainer.AUTO_INDEX_RE.match(detail).groups() == ("H", "Id=?")
+
+
+def test_full_scan_and_index_suggestion(heros_db):
+    explained = _explainer(heros_db).explain("SELECT Titre FROM HEROS WHERE Age = 30")
+
+    assert any(flag.startswith("full scan of HEROS (~1200 rows)") for flag in explained["flags"])
+    assert explained["suggestions"] == ["CREATE INDEX idx_HEROS_Age ON HEROS(Age);"]
+
+    explained = _explainer(heros_db).explain("SELECT Type FROM ARMES WHERE Puissance = 3")
+    assert explained["flags"] == [] # a small table.
+
+
+def test_temp_b_tree(heros_db):
+    explained = _explainer(heros_db).explain("SELECT Titre FROM HEROS WHERE Id < 10 ORDER BY Age")
+
+    assert "use temp b-tree for order by" in explained["flags"]
+    assert not any(flag.startswith("full scan") for flag in explained["flags"]) # the rowid is searched.
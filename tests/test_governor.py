@@ -0,0 +1,53 @@
+from io import StringIO
+
+import pytest
+
+from SQLviewer import DatabaseSystem, Interpreter, ResourceGovernor, StepAborted, Terminal
+
+SLOW = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) SELECT COUNT(*) FROM c"
+
+
+def _db(heros_db: str, governor: ResourceGovernor) -> DatabaseSystem:
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    db.set_governor(governor)
+
+    return db
+
+
+def test_vm_steps(heros_db):
+    db = _db(heros_db, ResourceGovernor(vm_steps=100_000))
+
+    with pytest.raises(StepAborted, match="VM"):
+        list(db.execute(SLOW, use_cache=False)[1])
+
+    assert list(db.execute("SELECT COUNT(*) FROM t", use_cache=False)[1]) == [(2,)] # the next step runs.
+
+
+def test_timeout(heros_db):
+    db = _db(heros_db, ResourceGovernor(timeout=0.05))
+
+    with pytest.raises(StepAborted, match="timeout"):
+        list(db.execute(SLOW, use_cache=False)[1])
+
+
+def test_max_rows(heros_db):
+    db = _db(heros_db, ResourceGovernor(max_rows=10))
+    columns, result = db.execute("SELECT Id FROM HEROS", use_cache=False)
+
+    assert len(list(result)) == 10
+    assert result.aborted is not None
+
+
+def test_aborted_step_in_a_run(heros_db):
+    db = _db(heros_db, ResourceGovernor(timeout=0.05))
+    out = StringIO()
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret("SELECT Titre FROM HEROS WHERE Id < 3 AND Age > "
+                          "(SELECT COUNT(*) FROM HEROS AS A, HEROS AS B, HEROS AS C)")
+    interpreter.run()
+    text = out.getvalue()
+
+    assert "(aborted: " in text
+    assert "Hero1" in text # the steps before it.
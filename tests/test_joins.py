@@ -0,0 +1,35 @@
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Explainer, Interpreter, Terminal
+
+
+def test_join_stages():
+    stages = Explainer.join_stages("SELECT H.Titre FROM HEROS AS H LEFT OUTER JOIN ARMES AS A ON A.Id_Heros = H.Id, "
+                                   "t WHERE t.id = 1 ORDER BY H.Titre")
+
+    assert stages == [("HEROS AS H", "HEROS AS H"),
+                      ("HEROS AS H LEFT OUTER JOIN ARMES AS A ON A.Id_Heros = H.Id",
+                       "LEFT OUTER JOIN ARMES AS A ON A.Id_Heros = H.Id"),
+                      ("HEROS AS H LEFT OUTER JOIN ARMES AS A ON A.Id_Heros = H.Id, t", ", t")]
+    assert Explainer.join_stages("SELECT Titre FROM HEROS WHERE Id IN (SELECT Id_Heros FROM ARMES, t)") == []
+
+
+def test_fan_out(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    out = StringIO()
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret("SELECT H.Titre FROM HEROS AS H JOIN HEROS AS H2 ON H2.Ville = H.Ville "
+                          "JOIN ARMES AS A ON A.Id_Heros = H2.Id")
+    interpreter.run(joins=True)
+    text = out.getvalue()
+
+    assert [(stage["rows"], stage["fan_out"]) for stage in interpreter.joins] == [(1200, None), (720000, 600.0),
+                                                                                 (4800, 4800 / 720000)]
+    assert "fan-out x600.00 (!)" in text
+    assert "fan-out x0.01," in text # not flagged.
+
+    # the step of the JOIN before its ON is a cross join (1.44M rows here), not run.
+    assert text.count("(join without its ON clause: not run") == 1
+    assert "result cache: 0 hit(s), 4 miss(es)" in text # the 3 counts, and the whole request.
@@ -0,0 +1,59 @@
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal
+
+REUSED = ("SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS WHERE Ville = 'Lyon') "
+          "AND Force > (SELECT AVG(Age) FROM HEROS WHERE Ville = 'Lyon')")
+
+
+def _run(heros_db: str, request: str, materialize: bool) -> tuple[DatabaseSystem, list[str], str]:
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    out = StringIO()
+    tables: list[str] = []
+    materialize_table = db.materialize
+
+    def _materialize(table: str, command: str, params=None) -> None:
+        tables.append(table)
+        materialize_table(table, command, params)
+
+    db.materialize = _materialize
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret(request)
+    interpreter.run(materialize=materialize)
+
+    return db, tables, out.getvalue()
+
+
+def _tables(text: str) -> list[str]:
+    return [line for line in text.splitlines() if not line.startswith("(")] # without the notes.
+
+
+def test_same_output_as_inline(heros_db):
+    db, tables, materialized = _run(heros_db, REUSED, True)
+    inline = _run(heros_db, REUSED, False)[2]
+
+    assert tables == ["_sqlv_1"] # the second use is merged, run once.
+    assert _tables(materialized) == _tables(inline)
+    assert "run once into its TEMP table" in materialized
+
+
+def test_temp_tables_dropped(heros_db):
+    db, tables, text = _run(heros_db, REUSED, True)
+    left = db.mydb.execute("SELECT name FROM temp.sqlite_master WHERE name LIKE '\\_sqlv\\_%' ESCAPE '\\'").fetchall()
+
+    assert tables and left == []
+
+
+def test_correlated_stays_inlined(heros_db):
+    request = ("SELECT H.Titre FROM HEROS AS H WHERE EXISTS "
+               "(SELECT ARMES.Id FROM ARMES WHERE ARMES.Id_Heros = H.Id)")
+    db, tables, text = _run(heros_db, request, True)
+
+    assert tables == []
+    assert _tables(text) == _tables(_run(heros_db, request, False)[2])
+
+    last = text[text.rindex("FOR REQUEST 0"):]
+    assert [line.strip() for line in last.splitlines() if line.strip().startswith("Hero")] == \
+           [f"Hero{idx}" for idx in range(1, 6)] # the heros with a weapon.
@@ -0,0 +1,38 @@
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal
+
+REQUEST = ("SELECT HEROS.Titre FROM HEROS WHERE HEROS.Force > (SELECT AVG(H2.Force) FROM HEROS AS H2) "
+           "AND HEROS.Age > (SELECT AVG(H3.Age) FROM HEROS AS H3 WHERE H3.Ville = 'Paris') ORDER BY HEROS.Titre")
+
+
+def _output(heros_db: str, **options) -> str:
+    db = DatabaseSystem(cache_rows=0)
+    db.connect(heros_db)
+    out = StringIO()
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret(REQUEST)
+    interpreter.run(**options)
+    db.close()
+
+    return out.getvalue()
+
+
+def test_parallel_run_prints_in_order(heros_db):
+    assert _output(heros_db, parallel=3) == _output(heros_db)
+
+
+def test_same_statement_submitted_once(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    assert db.open_pool(2)
+
+    command = "SELECT COUNT(*) FROM HEROS AS A, HEROS AS B WHERE A.Id < 300"
+    futures = [db.submit(command) for _ in range(3)]
+    results = [future.result() for future in futures]
+
+    assert [list(result) for _, result in results] == [[(358800,)]] * 3
+    assert [result.cache_hit for _, result in results] == [False, True, True]
+
+    db.close()
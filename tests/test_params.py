@@ -0,0 +1,47 @@
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal, Tokenizer
+
+
+def _interpreter(heros_db: str) -> tuple[Interpreter, DatabaseSystem, StringIO]:
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    out = StringIO()
+
+    return Interpreter(db, Terminal(out, colors=False)), db, out
+
+
+def test_values_rows():
+    command, rows = Tokenizer.values_rows("INSERT INTO t VALUES (1), (-2), ('it''s'), (NULL), (x'00');")
+
+    assert command.split() == ["INSERT", "INTO", "t", "VALUES", "(?)"]
+    assert rows == [(1,), (-2,), ("it's",), (None,), (b"\x00",)]
+    assert Tokenizer.values_rows("INSERT INTO t VALUES (1 + 1)") is None # an expression.
+    assert Tokenizer.values_rows("INSERT INTO t SELECT id FROM t2") is None
+
+
+def test_multi_row_insert_by_executemany(heros_db):
+    interpreter, db, out = _interpreter(heros_db)
+    interpreter.interpret("INSERT INTO t2 (id) VALUES (10), (11), (12)")
+
+    assert interpreter.many == [(10,), (11,), (12,)]
+
+    interpreter.run()
+
+    assert "(3 row(s) by executemany, in one transaction: 3 change(s))" in out.getvalue()
+    assert db.mydb.execute("SELECT id FROM t2 ORDER BY id").fetchall() == [(1,), (3,), (10,), (11,), (12,)]
+
+
+def test_positional_and_named_parameters(heros_db):
+    assert Tokenizer.bind("SELECT ? + ?2 + ?", (1, 2, 3)) == ("SELECT :_1 + :_2 + :_3", {"_1": 1, "_2": 2, "_3": 3})
+
+    for request, params in (("SELECT Titre FROM HEROS WHERE Age = ? AND Ville = ?", (30, "Lyon")),
+                            ("SELECT Titre FROM HEROS WHERE Age = :age AND Ville = :city", {"age": 30, "city": "Lyon"})):
+        interpreter, db, out = _interpreter(heros_db)
+        interpreter.interpret(request, params)
+        interpreter.run()
+        text = out.getvalue()
+
+        last = text[text.rindex("FOR REQUEST 0"):]
+        assert [line.strip() for line in last.splitlines() if line.strip().startswith("Hero")] == \
+               [f"Hero{idx}" for idx in range(10, 1201, 40)] # Age = 20 + Id % 40, even Id in Lyon.
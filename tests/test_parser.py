@@ -0,0 +1,52 @@
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal
+
+
+def _interpret(request: str) -> Interpreter:
+    db = DatabaseSystem()
+    db.connect(":memory:")
+
+    interpreter = Interpreter(db, Terminal(StringIO(), colors=False))
+    interpreter.interpret(request)
+
+    return interpreter
+
+
+def test_conditions_and_sub_requests():
+    interpreter = _interpret("SELECT HEROS.Titre FROM HEROS WHERE HEROS.Age BETWEEN 10 AND 40 "
+                             "AND HEROS.Ville = 'a(b' AND HEROS.Id IN (SELECT ARMES.Id_Heros FROM ARMES) -- (SELECT")
+    steps = interpreter.commands
+
+    assert [step.request for step in steps] == [1, 0, 0, 0, 0]
+    assert steps[0].sql == "SELECT ARMES.Id_Heros FROM ARMES"
+    assert steps[2].sql == "SELECT HEROS.Titre FROM HEROS WHERE HEROS.Age BETWEEN 10 AND 40"
+    assert steps[3].sql.endswith("AND HEROS.Ville = 'a(b'")
+    assert steps[-1].raw.endswith("HEROS.Id IN (@1)")
+    assert steps[-1].sql[slice(*steps[-1].caret)] == "SELECT ARMES.Id_Heros FROM ARMES"
+    assert (steps[1].first, steps[-1].last, steps[1].last) == (True, True, False)
+
+
+def test_functions_and_case_stay_in_the_request():
+    interpreter = _interpret("SELECT COUNT(*), CASE WHEN Age > 3 AND Age < 9 THEN 1 END FROM HEROS "
+                             "WHERE Ville IN ('a', 'b') AND Age > (SELECT AVG(Age) FROM HEROS)")
+    steps = interpreter.commands
+
+    assert len(steps) == 4 # the sub-request, the request, and its two conditions.
+    assert steps[2].sql.endswith("WHERE Ville IN ('a', 'b')")
+
+
+def test_nested_sub_requests_in_post_order():
+    interpreter = _interpret("SELECT A FROM T WHERE B > (SELECT MAX(B) FROM T WHERE C < (SELECT MIN(C) FROM U))")
+
+    assert [(step.request, step.parent) for step in interpreter.commands] == [
+        (2, 1), (1, 0), (1, 0), (0, None), (0, None)
+    ]
+    assert interpreter.commands[-1].sql == \
+        "SELECT A FROM T WHERE B > (SELECT MAX(B) FROM T WHERE C < (SELECT MIN(C) FROM U))"
+
+
+def test_unclosed_parenthesis():
+    interpreter = _interpret("SELECT A FROM T WHERE B IN (SELECT B FROM U")
+
+    assert interpreter.commands[-1].sql == "SELECT A FROM T WHERE B IN (SELECT B FROM U)"
@@ -0,0 +1,61 @@
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, ExecutionPlan, Interpreter, Terminal
+
+
+def _interpret(request: str, **run) -> tuple[Interpreter, str]:
+    db = DatabaseSystem()
+    db.connect(":memory:")
+    db.execute("CREATE TABLE HEROS (Id INTEGER PRIMARY KEY, Titre TEXT, Age INTEGER, Force INTEGER)")
+    db.execute("INSERT INTO HEROS VALUES (1, 'a', 30, 10), (2, 'b', 40, 90)")
+    out = StringIO()
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret(request)
+
+    if run:
+        interpreter.run(**run)
+
+    return interpreter, out.getvalue()
+
+
+def test_canonical():
+    assert Interpreter.canonical("select avg(X.Force)   FROM HEROS X") == \
+           Interpreter.canonical("SELECT AVG(Y.Force) FROM HEROS AS Y")
+    assert Interpreter.canonical("SELECT X FROM HEROS AS X") != Interpreter.canonical("SELECT Y FROM HEROS AS Y")
+    assert Interpreter.canonical("SELECT 'a' FROM HEROS") != Interpreter.canonical("SELECT 'A' FROM HEROS")
+
+
+def test_same_sub_requests_merged():
+    interpreter, text = _interpret(
+        "SELECT HEROS.Titre FROM HEROS WHERE HEROS.Force > (SELECT AVG(H2.Force) FROM HEROS AS H2) "
+        "AND HEROS.Age > (select avg(X.Force) from HEROS X)",
+        materialize=True
+    )
+    steps = interpreter.commands
+
+    assert [step.request for step in steps] == [1, 0, 0, 0]
+    assert steps[0].shared == (2,)
+    assert steps[-1].raw.endswith("(@1)") and steps[-1].deps == (1,)
+    assert steps[-1].sql.endswith("(select avg(X.Force) from HEROS X)") # its own text.
+    assert "(shared with request 2: same sub-request, shown once, run once into its TEMP table)" in text
+    assert len(interpreter.step_keys()) == len(steps)
+
+
+def test_correlated_sub_requests_not_merged():
+    interpreter, _ = _interpret(
+        "SELECT HEROS.Titre FROM HEROS WHERE HEROS.Age < (SELECT MAX(Z.Age) FROM HEROS AS Z WHERE Z.Id = HEROS.Id) "
+        "AND HEROS.Age < (SELECT MAX(Z.Age) FROM HEROS AS Z WHERE Z.Id = HEROS.Id)"
+    )
+
+    assert {step.request for step in interpreter.commands} == {0, 1, 2}
+    assert interpreter.commands[1].outer == (("HEROS", "Id", "HEROS"),)
+
+
+def test_plan_round_trip(tmp_path):
+    interpreter, _ = _interpret("SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS) "
+                                "AND Force > (SELECT AVG(Age) FROM HEROS)")
+    interpreter.plan.save(tmp_path / "plan.json")
+    plan = ExecutionPlan.load(tmp_path / "plan.json", interpreter.plan.key)
+
+    assert [step.to_list() for step in plan.steps] == [step.to_list() for step in interpreter.commands]
@@ -0,0 +1,45 @@
+import json
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal
+
+STEP_KEYS = {"step", "request", "sql", "execute", "fetch", "render", "diff", "total", "rows", "vm_steps",
+             "statement_cache_hit", "result_cache_hit", "aborted"}
+
+
+def _profile(heros_db: str, tmp_path, report: str) -> Interpreter:
+    db = DatabaseSystem()
+    db.connect(heros_db)
+
+    interpreter = Interpreter(db, Terminal(StringIO(), colors=False))
+    interpreter.interpret("SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS) AND Ville = 'Paris'")
+    interpreter.run(profile=True, report=str(tmp_path / report), diff=True)
+
+    return interpreter
+
+
+def test_json_report(heros_db, tmp_path):
+    interpreter = _profile(heros_db, tmp_path, "profile.json")
+    report = json.loads((tmp_path / "profile.json").read_text(encoding="utf-8"))
+
+    assert {"query", "plan_cached", "parse", "flatten", "steps"} <= set(report)
+    assert len(report["steps"]) == len(interpreter.commands)
+    assert [record["rows"] for record in report["steps"]] == [1, 1200, 600, 300]
+
+    for record in report["steps"]:
+        assert set(record) == STEP_KEYS
+        assert min(record["execute"], record["fetch"], record["render"], record["diff"]) >= 0
+        assert abs(record["execute"] + record["fetch"] + record["render"] + record["diff"] - record["total"]) < 1e-9
+
+    assert report["steps"][0]["diff"] == 0.0 # nothing before it.
+    assert report["steps"][-1]["diff"] > 0
+
+
+def test_ndjson_report(heros_db, tmp_path):
+    interpreter = _profile(heros_db, tmp_path, "profile.ndjson")
+    lines = (tmp_path / "profile.ndjson").read_text(encoding="utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+
+    assert len(records) == len(interpreter.commands)
+    assert all(set(record) == STEP_KEYS | {"query", "plan_cached", "parse", "flatten"} for record in records)
+    assert [record["step"] for record in records] == list(range(len(records)))
@@ -0,0 +1,53 @@
+import os
+import sqlite3
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal, Watcher
+
+
+def _interpreter(heros_db: str) -> Interpreter:
+    db = DatabaseSystem()
+    db.connect(heros_db)
+
+    return Interpreter(db, Terminal(StringIO(), colors=False))
+
+
+def test_step_keys(heros_db):
+    interpreter = _interpreter(heros_db)
+    interpreter.interpret("SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS)")
+    keys = interpreter.step_keys()
+
+    interpreter.interpret("select Titre from HEROS where Age > (select avg(Age) from HEROS) and Ville = 'Lyon'")
+    changed = interpreter.step_keys()
+
+    assert len(set(keys)) == len(keys)
+    assert changed[:len(keys)] == keys # same steps once normalized.
+    assert changed[-1] not in keys
+
+
+def test_watcher_reuses_unchanged_steps(heros_db, tmp_path):
+    path = tmp_path / "query.sql"
+    interpreter = _interpreter(heros_db)
+    watcher = Watcher(interpreter, str(path))
+
+    def _save(text: str, mtime: int) -> bool:
+        path.write_text(text, encoding="utf-8")
+        os.utime(path, (mtime, mtime))
+        return watcher.check()
+
+    assert _save("SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS)", 1)
+    assert interpreter.reused == 0
+
+    assert _save("SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS) AND Ville = 'Lyon'", 2)
+    assert interpreter.reused == len(interpreter.commands) - 1 # only the new condition runs.
+
+    assert not _save("SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS) AND Ville = 'Lyon'", 3)
+
+    other = sqlite3.connect(heros_db)
+    other.execute("INSERT INTO HEROS (Titre, Age, Force, Ville) VALUES ('New', 50, 50, 'Lyon')")
+    other.commit()
+    other.close()
+
+    assert _save("SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS) AND Ville = 'Paris'", 4)
+    assert interpreter.reused == 0 # the data has changed, everything runs again.
+    assert "run 3: 4 step(s) executed, 0 reused" in interpreter.term.out.getvalue()
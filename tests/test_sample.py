@@ -0,0 +1,36 @@
+from io import StringIO
+
+import pytest
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal
+
+REQUEST = "SELECT HEROS.Titre FROM HEROS WHERE HEROS.Age > (SELECT AVG(H2.Age) FROM HEROS AS H2)"
+
+
+def test_sample(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    out = StringIO()
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret(REQUEST)
+    interpreter.run(sample=0.1)
+
+    assert "SAMPLED RUN (stride, 0.1, at most 10000 rows per table): HEROS 120/1200." in out.getvalue()
+    assert "extrapolated to the full tables" in out.getvalue()
+
+
+def test_sample_on_a_query_only_connection(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db, profile="analytics-readonly")
+    out = StringIO()
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret(REQUEST)
+
+    with pytest.warns(UserWarning, match="Can't sample the table HEROS"):
+        interpreter.run(sample=0.1)
+
+    text = out.getvalue()
+    assert "no table sampled" in text
+    assert "FOR REQUEST 0: SELECT HEROS.Titre FROM HEROS WHERE" in text
@@ -0,0 +1,43 @@
+import csv
+import json
+from io import StringIO
+
+from SQLviewer import CsvSink, DatabaseSystem, Interpreter, NdjsonSink
+
+ROWS = [(1, 'a, "quoted" b', None), (2, "é\nline", 1.5), (3, b"\x01\xff", None)]
+
+
+def test_ndjson_one_object_per_line():
+    out = StringIO()
+    NdjsonSink(out).print_table(ROWS, ["id", "text", "value"])
+    lines = out.getvalue().splitlines()
+
+    assert len(lines) == 1 + len(ROWS) # the new line of a value is escaped.
+    assert json.loads(lines[0]) == {"event": "columns", "columns": ["id", "text", "value"]}
+    assert [json.loads(line) for line in lines[1:]] == [[1, 'a, "quoted" b', None], [2, "é\nline", 1.5],
+                                                        [3, "01ff", None]]
+
+
+def test_ndjson_run(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    out = StringIO()
+
+    interpreter = Interpreter(db, NdjsonSink(out))
+    interpreter.interpret("SELECT id FROM t2 WHERE id IN (SELECT id FROM t)")
+    interpreter.run()
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert all(isinstance(event, (dict, list)) for event in events)
+    assert events[-1]["event"] == "info" # the result cache.
+    assert [1] in events and [3] in events
+
+
+def test_csv_quoting_and_null():
+    out = StringIO()
+    CsvSink(out).print_table(ROWS[:2], ["id", "text", "value"])
+    text = out.getvalue()
+
+    assert '"a, ""quoted"" b"' in text
+    assert list(csv.reader(StringIO(text))) == [["id", "text", "value"], ["1", 'a, "quoted" b', ""],
+                                                ["2", "é\nline", "1.5"], []]
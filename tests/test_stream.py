@@ -0,0 +1,59 @@
+import gc
+import sqlite3
+import weakref
+
+import pytest
+
+from SQLviewer import DatabaseSystem, ResultStream
+
+
+def _stream(heros_db: str, **options) -> tuple[ResultStream, sqlite3.Cursor]:
+    cursor = sqlite3.connect(heros_db).execute("SELECT Id FROM HEROS ORDER BY Id")
+    return ResultStream(["Id"], cursor, **options), cursor
+
+
+def test_row_count_past_the_preview(heros_db):
+    stream, cursor = _stream(heros_db, preview_limit=10, fetch_size=4, keep_limit=100)
+
+    assert list(stream) == [(idx,) for idx in range(1, 11)]
+    assert stream.total is None # the rest isn't fetched by the preview.
+    assert stream.row_count == 1200
+    assert stream.truncated
+    assert stream.rows == [] # more than keep_limit, nothing kept.
+
+
+def test_only_the_preview_is_shown(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    columns, result = db.execute("SELECT Id FROM HEROS ORDER BY Id", use_cache=False, preview_limit=25)
+
+    assert sum(len(chunk) for chunk in result.chunks()) == 25
+    assert result.row_count == 1200
+    assert result.rows == []
+
+
+def test_cursor_closed_when_exhausted(heros_db):
+    stream, cursor = _stream(heros_db, fetch_size=500)
+    assert len(list(stream)) == 1200
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        cursor.fetchone()
+
+    stream, cursor = _stream(heros_db, preview_limit=3)
+    list(stream)
+
+    assert stream.row_count == 1200 # the cursor is read until its end.
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        cursor.fetchone()
+
+
+def test_cursor_released_when_dropped(heros_db):
+    stream, cursor = _stream(heros_db, preview_limit=3)
+    list(stream)
+    released = weakref.ref(cursor)
+
+    del stream, cursor
+    gc.collect()
+
+    assert released() is None
@@ -0,0 +1,61 @@
+from io import StringIO
+
+from SQLviewer import DatabaseSystem, Interpreter, Terminal
+
+
+def test_cut_after_last_request_inside_a_token(heros_db):
+    db = DatabaseSystem()
+    db.connect(heros_db)
+    out = StringIO()
+
+    interpreter = Interpreter(db, Terminal(out, colors=False))
+    interpreter.interpret("SELECT id FROM t2 WHERE id IN (SELECT id FROM t)")
+    interpreter.run()
+    text = out.getvalue()
+
+    assert "FOR REQUEST 0: SELECT id FROM t2\n" in text
+    assert "FOR REQUEST 0: SELECT id FROM t2 WHERE id IN ( SELECT id FROM t )\n" in text
+    assert "FROM REQUEST 1" in text
+
+
+def test_cut_inside_a_token():
+    term = Terminal(StringIO(), colors=False)
+
+    term.print_request("SELECT ab")
+    assert term.print_request("SELECT abc FROM t") == "SELECT abc FROM t"
+
+    term.print_request("SELECT 12")
+    assert term.print_request("SELECT 123, 'x' FROM t") == "SELECT 123 , 'x' FROM t"
+
+    term.print_request("SELECT t")
+    assert term.print_request("SELECT t.id FROM t") == "SELECT t.id FROM t"
+
+
+def test_caret_under_the_sub_request():
+    out = StringIO()
+    term = Terminal(out, colors=False)
+    request = "SELECT Titre FROM HEROS WHERE Age > (SELECT AVG(Age) FROM HEROS)"
+    start = request.index("SELECT AVG")
+
+    old = term.print_request("SELECT Titre FROM HEROS")
+    term.print_request(request, old, "1", (start, len(request) - 1))
+    lines = out.getvalue().splitlines()
+
+    printed = lines[-3]
+    carets = lines[-2]
+    assert carets.lstrip().startswith("^")
+    assert len(carets) == len(printed)
+    assert printed[carets.index("^"):].startswith("WHERE")
+    assert "FROM REQUEST 1" in lines[-1]
+
+
+def test_widths_of_a_list_use_every_row():
+    out = StringIO()
+    rows = [(idx, "x") for idx in range(1500)]
+    rows[1200] = (1200, "a much wider value")
+
+    Terminal(out, colors=False).print_table(rows, ["n", "v"])
+    lines = [line for line in out.getvalue().splitlines() if " | " in line]
+
+    assert len({len(line) for line in lines}) == 1 # all aligned.
+    assert lines[0] == "   n |                  v"
@@ -0,0 +1,51 @@
+from SQLviewer import Tokenizer
+
+
+def test_statements_of_a_script():
+    script = [
+        "SELECT HEROS.Titre\n",
+        "FROM HEROS;\n",
+        "SELECT 'a;b' AS x; -- c;d\n",
+        "SELECT 1 /* ;\n",
+        "; */ + 2\n",
+    ]
+
+    assert list(Tokenizer.statements(script)) == [
+        "SELECT HEROS.Titre\nFROM HEROS",
+        "SELECT 'a;b' AS x",
+        "-- c;d\nSELECT 1 /* ;\n; */ + 2",
+    ]
+
+
+def test_statements_of_a_multi_line_string():
+    script = ["SELECT 'a;\n"] + ["b;\n"] * 50 + ["' AS x; SELECT 2\n"]
+
+    statements = list(Tokenizer.statements(script))
+    assert statements == ["SELECT 'a;\n" + "b;\n" * 50 + "' AS x", "SELECT 2"]
+
+
+def test_statements_of_a_query_log():
+    log = [
+        "SELECT COUNT(*) FROM HEROS\n",
+        "select Titre from HEROS where Id = 3\n",
+        "-- a comment\n",
+        "\n",
+        "SELECT 'x;y';\n",
+    ]
+
+    assert list(Tokenizer.statements(log)) == [
+        "SELECT COUNT(*) FROM HEROS",
+        "select Titre from HEROS where Id = 3",
+        "SELECT 'x;y'",
+    ]
+    assert len(list(Tokenizer.statements(log, per_line=False))) == 1
+
+
+def test_statements_found_as_a_script():
+    script = ["SELECT Titre\n", "FROM HEROS\n", "WHERE Id IN (\n", "SELECT 1);\n", "SELECT 2\n"]
+    assert len(list(Tokenizer.statements(script))) == 2
+
+    script = ["SELECT Titre FROM HEROS WHERE Id IN (\n", "SELECT 1);\n"]
+    assert len(list(Tokenizer.statements(script))) == 1
+
+    assert list(Tokenizer.statements(["SELECT 1\n", "SELECT 2\n"], per_line=True)) == ["SELECT 1", "SELECT 2"]